@@ -0,0 +1,320 @@
+from __future__ import annotations
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Iterator
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import scripts.generate_data as gd
+from scripts.train_ltr import NUM, CAT, choose_estimator
+from src.config import ARTIFACTS_DIR, ARMS, BANDIT_D
+from src.features.persona_clustering import PersonaAssigner, assign_personas, fit_kmeans_personas
+from src.models.bandit import LinTSBandit
+from src.models.compiled_ltr import CompiledLTR
+from src.models.ltr import LTRModel, build_candidate_features, build_batch_candidate_features
+from src.models.recommender import rank_content
+from src.service import api
+from src.service.bundle import ModelBundle
+from src.service.schemas import RecommendationRequest
+from src.service.user_store import UserStore
+
+# Microbenchmarks for the serving and training hot paths on synthetic data (generate_data's
+# generators, a scorer trained the way train_ltr does). Every case is a stage at one size:
+#   <stage>[catalog=..,users=..,d=..] -> n, mean/min/max and p50/p90/p99 in milliseconds
+# `run` writes the cases as JSON; `compare` fails when a case got slower than a stored baseline
+# by more than --threshold (relative) and --floor-ms (absolute, so sub-noise cases never fail).
+
+BENCH_DIR = ARTIFACTS_DIR / "bench"
+SEED = 7
+GRID = {"catalog": (300, 3_000, 30_000), "users": (1, 64, 1_024), "d": (6, BANDIT_D, 32)}
+QUICK_GRID = {"catalog": (300,), "users": (1, 64), "d": (BANDIT_D,)}
+MAX_ROWS = 1_000_000  # skip batch cases scoring more (user, candidate) rows than this per call
+MIN_REPEAT = 5
+STAGES = ("rank_content", "candidate_features", "batch_candidate_features", "ltr_predict_catalog",
+          "compiled_predict_catalog", "assign_personas", "persona_assigner", "bandit_choose",
+          "bandit_choose_batch", "bandit_update", "recommend", "recommend_cached")
+
+def measure(fn: Callable[[], object], repeat: int = 200, budget_s: float = 1.0, warmup: int = 3) -> dict:
+    """Time `fn` up to `repeat` times (at least MIN_REPEAT, then until `budget_s` runs out), GC off."""
+    for _ in range(warmup):
+        fn()
+    times: list[float] = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + budget_s
+        while len(times) < repeat and (len(times) < MIN_REPEAT or time.perf_counter() < deadline):
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+    finally:
+        if enabled:
+            gc.enable()
+    ms = np.array(times) * 1e3
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {"n": len(ms), "mean_ms": round(float(ms.mean()), 4), "min_ms": round(float(ms.min()), 4),
+            "p50_ms": round(float(p50), 4), "p90_ms": round(float(p90), 4), "p99_ms": round(float(p99), 4),
+            "max_ms": round(float(ms.max()), 4)}
+
+class Fixture:
+    """Synthetic users/catalogs and models trained on them; built lazily, per stage that needs them."""
+    def __init__(self, seed: int = SEED, n_users: int = 2_048):
+        self.seed, self.n_users = seed, n_users
+        self._catalogs: dict[int, pd.DataFrame] = {}
+        self._tmp = tempfile.TemporaryDirectory(prefix="bench-")
+
+    @cached_property
+    def users(self) -> pd.DataFrame:
+        gd.rng = np.random.default_rng(self.seed)
+        return gd.gen_users(self.n_users)
+
+    def catalog(self, n: int) -> pd.DataFrame:
+        if n not in self._catalogs:
+            gd.rng = np.random.default_rng(self.seed + n)
+            content = gd.gen_content(n)
+            content["popularity"] = np.round(gd.rng.beta(2, 8, size=n), 4)
+            self._catalogs[n] = content
+        return self._catalogs[n]
+
+    @cached_property
+    def persona(self) -> tuple:
+        return fit_kmeans_personas(self.users.iloc[:600], k=4)
+
+    @cached_property
+    def pipe(self) -> Pipeline:
+        """Learned scorer trained like scripts/train_ltr.py on the default-size synthetic dataset."""
+        users, content = self.users.iloc[:600], self.catalog(300)
+        inter = gd.gen_interactions(users, content.drop(columns="popularity"), 9_000, seed=self.seed)
+        pop = inter.groupby("content_id")["reward"].mean().rename("popularity").reset_index()
+        content = content.drop(columns="popularity").merge(pop, on="content_id", how="left").fillna({"popularity": 0.0})
+        personas = assign_personas(users, *self.persona)[["user_id", "persona"]]
+        df = inter.merge(users, on="user_id").merge(content, on="content_id").merge(personas, on="user_id")
+        X = df[NUM + CAT].astype({"premium": bool, "push_opt_in": bool, "persona": str})
+        y = df["reward"].astype(int).to_numpy()
+        pre = ColumnTransformer([("num", StandardScaler(), NUM), ("cat", OneHotEncoder(handle_unknown="ignore"), CAT)])
+        clf, _ = choose_estimator(y)
+        return Pipeline([("pre", pre), ("clf", clf)]).fit(X, y)
+
+    def ltr(self, compiled: bool = False) -> LTRModel | CompiledLTR:
+        if compiled:
+            return CompiledLTR.from_pipeline(self.pipe)
+        path = Path(self._tmp.name) / "ltr_model.joblib"
+        if not path.exists():
+            joblib.dump(self.pipe, path)
+        return LTRModel(path)
+
+    def requests(self) -> Iterator[RecommendationRequest]:
+        """Endless stream of requests for the fixture users over every context."""
+        rng = np.random.default_rng(self.seed)
+        recs = self.users.to_dict(orient="records")
+        while True:
+            i = int(rng.integers(len(recs)))
+            yield RecommendationRequest(user=recs[i], context={"day_of_week": int(rng.integers(7)),
+                                        "hour_bucket": ("morning", "evening")[int(rng.integers(2))]})
+
+def _goal_pool(content: pd.DataFrame, goal: str = "fitness") -> pd.DataFrame:
+    return content[content["goal_tag"] == goal]
+
+def _users_pools(fx: Fixture, content: pd.DataFrame, n: int) -> tuple[pd.DataFrame, list[np.ndarray]]:
+    users = fx.users.iloc[:n]
+    rows = {g: np.flatnonzero(content["goal_tag"].to_numpy() == g) for g in gd.GOALS}
+    return users, [rows[g] for g in users["primary_goal"]]
+
+def cases(fx: Fixture, grid: dict) -> Iterator[tuple[str, str, Callable[[], Callable[[], object]]]]:
+    """(stage, case name, setup) for every stage x size; setup() returns the callable to time."""
+    user = fx.users.iloc[0]
+    for n in grid["catalog"]:
+        def rank(n=n):
+            content = fx.catalog(n)
+            return lambda: rank_content(content, "fitness", 1, top_k=5)
+
+        def features(n=n):
+            pool = _goal_pool(fx.catalog(n))
+            return lambda: build_candidate_features(pool, user, 3, "morning", 1)
+
+        yield "rank_content", f"rank_content[catalog={n}]", rank
+        yield "candidate_features", f"candidate_features[catalog={n}]", features
+
+    for n in grid["catalog"]:
+        for u in grid["users"]:
+            if u * n // len(gd.GOALS) > MAX_ROWS:
+                continue
+            size = f"catalog={n},users={u}"
+
+            def batch_features(n=n, u=u):
+                content = fx.catalog(n)
+                users, rows = _users_pools(fx, content, u)
+                pools = [content.iloc[r] for r in rows]
+                return lambda: build_batch_candidate_features(pools, users, [3] * u, ["morning"] * u, [1] * u)
+
+            def predict(n=n, u=u, compiled=False):
+                model = fx.ltr(compiled)
+                model.prepare_catalog(fx.catalog(n))
+                users, pools = _users_pools(fx, fx.catalog(n), u)
+                return lambda: model.predict_catalog(pools, users, [3] * u, ["morning"] * u, [1] * u)
+
+            yield "batch_candidate_features", f"batch_candidate_features[{size}]", batch_features
+            yield "ltr_predict_catalog", f"ltr_predict_catalog[{size}]", predict
+            yield "compiled_predict_catalog", f"compiled_predict_catalog[{size}]", \
+                lambda predict=predict: predict(compiled=True)
+
+    for u in grid["users"]:
+        def sklearn_personas(u=u):
+            users, persona = fx.users.iloc[:u], fx.persona
+            return lambda: assign_personas(users, *persona)
+
+        def compiled_personas(u=u):
+            assigner, profiles = PersonaAssigner(*fx.persona), fx.users.iloc[:u].to_dict(orient="records")
+            return lambda: assigner.predict(profiles)
+
+        yield "assign_personas", f"assign_personas[users={u}]", sklearn_personas
+        yield "persona_assigner", f"persona_assigner[users={u}]", compiled_personas
+
+    for d in grid["d"]:
+        def trained(d=d) -> tuple[LinTSBandit, np.ndarray]:
+            rng = np.random.default_rng(fx.seed)
+            bandit = LinTSBandit(ARMS, d=d)
+            X = rng.normal(size=(2_000, d))
+            bandit.update_batch(rng.choice(ARMS, size=len(X)), (rng.random(len(X)) < 0.3).astype(float), X)
+            return bandit, X
+
+        def update(d=d):
+            bandit, X = trained(d)
+            xs = iter(np.tile(X, (64, 1)))
+            return lambda: bandit.update(ARMS[0], 1.0, next(xs))
+
+        def choose(d=d):
+            bandit, X = trained(d)
+            return lambda: bandit.choose(X[0])
+
+        def choose_batch(d=d, u=1):
+            bandit, X = trained(d)
+            return lambda: bandit.choose_batch(X[:u])
+
+        yield "bandit_choose", f"bandit_choose[d={d}]", choose
+        for u in grid["users"]:
+            yield "bandit_choose_batch", f"bandit_choose_batch[d={d},users={u}]", \
+                lambda choose_batch=choose_batch, u=u: choose_batch(u=u)
+        yield "bandit_update", f"bandit_update[d={d}]", update
+
+def _serve(fx: Fixture, n: int, cached: bool) -> Callable[[], object]:
+    """POST /recommendations handler (no HTTP transport) on an in-memory bundle of catalog size n."""
+    api._install_bundle(ModelBundle(fx.persona, fx.catalog(n), fx.ltr(compiled=True), {"benchmark": f"catalog={n}"}))
+    api._bandit, api._users = LinTSBandit(ARMS, d=BANDIT_D), UserStore(fx.users)
+    loop = asyncio.new_event_loop()
+    reqs = fx.requests()
+    pinned = next(reqs)
+
+    def call():
+        if cached:
+            return loop.run_until_complete(api.recommend(pinned))
+        api._rank_cache.clear()
+        return loop.run_until_complete(api.recommend(next(reqs)))
+    return call
+
+def run(grid: dict, only: list[str] | None = None, repeat: int = 200, budget_s: float = 1.0,
+        seed: int = SEED, log=print) -> dict:
+    fx = Fixture(seed)
+    selected = [s for s in STAGES if not only or s in only]
+    results: dict[str, dict] = {}
+
+    def record(name: str, setup: Callable[[], Callable[[], object]]) -> None:
+        results[name] = stats = measure(setup(), repeat=repeat, budget_s=budget_s)
+        log(f"{name:<58} p50 {stats['p50_ms']:>10.3f} ms  p99 {stats['p99_ms']:>10.3f} ms  (n={stats['n']})")
+
+    for stage, name, setup in cases(fx, grid):
+        if stage in selected:
+            record(name, setup)
+    if "recommend" in selected or "recommend_cached" in selected:
+        try:
+            for n in grid["catalog"]:
+                for stage, cached in (("recommend", False), ("recommend_cached", True)):
+                    if stage in selected:
+                        record(f"{stage}[catalog={n}]", lambda n=n, cached=cached: _serve(fx, n, cached))
+        finally:
+            api._shutdown()
+            api._bundle = api._bandit = api._users = None
+            api._recent_bundles.clear()
+    return {
+        "meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+                 "numpy": np.__version__, "pandas": pd.__version__, "sklearn": sklearn.__version__,
+                 "machine": platform.machine(), "cpus": os.cpu_count(), "seed": seed,
+                 "grid": {k: list(v) for k, v in grid.items()}, "budget_s": budget_s},
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float = 0.25, metric: str = "p50_ms",
+            floor_ms: float = 0.05) -> list[dict]:
+    """
+    One row per case present in both runs. A case regressed when it is slower than the baseline
+    by more than `threshold` (relative) AND by more than `floor_ms` (absolute).
+    """
+    rows = []
+    base, cur = baseline["results"], current["results"]
+    for name in sorted(set(base) & set(cur)):
+        b, c = float(base[name][metric]), float(cur[name][metric])
+        ratio = c / b if b > 0 else float("inf")
+        rows.append({"case": name, "baseline": b, "current": c, "ratio": round(ratio, 3),
+                     "regressed": ratio > 1.0 + threshold and c - b > floor_ms})
+    return rows
+
+def _load(path: Path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Microbenchmarks for the serving/training hot paths.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="run the benchmarks and write JSON results")
+    r.add_argument("--out", type=Path, default=BENCH_DIR / "latest.json")
+    r.add_argument("--quick", action="store_true", help="smallest sizes only (smoke run)")
+    r.add_argument("--only", default="", help=f"comma-separated stages out of: {', '.join(STAGES)}")
+    r.add_argument("--repeat", type=int, default=200, help="max timed calls per case")
+    r.add_argument("--budget", type=float, default=1.0, help="seconds per case (at least 5 calls)")
+    r.add_argument("--seed", type=int, default=SEED)
+    c = sub.add_parser("compare", help="fail if a case slowed down against a baseline")
+    c.add_argument("--baseline", type=Path, default=BENCH_DIR / "baseline.json")
+    c.add_argument("--current", type=Path, default=BENCH_DIR / "latest.json")
+    c.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (0.25 = +25%%)")
+    c.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p90_ms", "p99_ms", "mean_ms", "min_ms"])
+    c.add_argument("--floor-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    return ap.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv if argv is not None else [])
+    if args.cmd == "run":
+        only = [s.strip() for s in args.only.split(",") if s.strip()]
+        unknown = sorted(set(only) - set(STAGES))
+        if unknown:
+            print(f"unknown stage(s): {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        report = run(QUICK_GRID if args.quick else GRID, only, args.repeat, args.budget, args.seed)
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Benchmark results → {args.out}")
+        return 0
+
+    rows = compare(_load(args.baseline), _load(args.current), args.threshold, args.metric, args.floor_ms)
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else "ok"
+        print(f"{row['case']:<58} {row['baseline']:>10.3f} → {row['current']:>10.3f} ms  x{row['ratio']:<6} {flag}")
+    bad = [r for r in rows if r["regressed"]]
+    print(f"{len(bad)} of {len(rows)} cases slower than +{args.threshold:.0%} ({args.metric})")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
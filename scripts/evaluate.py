@@ -1,47 +1,93 @@
 from __future__ import annotations
-import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import argparse
+import json
+import sys
 import numpy as np
 import pandas as pd
 
-from src.config import DATA_DIR, ARTIFACTS_DIR, ARMS, BANDIT_D, BANDIT_PATH, ENCODER_PATH, PERSONA_MODEL_PATH
+from src.config import DATA_DIR, ARTIFACTS_DIR, ARMS, BANDIT_D, ENCODER_PATH, PERSONA_MODEL_PATH
+from src.data_store import read_table
 from src.models.bandit import LinTSBandit
-from src.models.ltr import LTRModel, build_candidate_features
+from src.models.ltr import LTRModel
+from src.models.recommender import top_positions
 from src.features.persona_clustering import load as load_persona, assign_personas
 from src.features.preprocess import select_user_features
+from src.features.bandit_context import context_matrix, fit_dim
 
 METRICS_PATH = ARTIFACTS_DIR / "metrics.json"
 RNG = np.random.default_rng(42)
 
+def _hits_and_aps(ranked: np.ndarray, truth: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Per row of `ranked`: precision@k and AP@k of the single relevant item truth[i]."""
+    match = np.asarray(ranked)[:, :k] == np.asarray(truth)[:, None]
+    hit = match.any(axis=1)
+    return hit.astype(float), np.where(hit, 1.0 / (match.argmax(axis=1) + 1), 0.0)
+
 def precision_at_k(ranked_ids, true_id, k):
-    return 1.0 if true_id in ranked_ids[:k] else 0.0
+    return float(_hits_and_aps(np.asarray([ranked_ids]), np.asarray([true_id]), k)[0][0])
 
 def average_precision_at_k(ranked_ids, true_id, k):
-    if true_id in ranked_ids[:k]:
-        return 1.0 / (ranked_ids.index(true_id) + 1)
-    return 0.0
-
-def _user_vec(u: pd.Series, dow: int, bucket: str) -> np.ndarray:
-    return np.array([
-        1.0,
-        float(u.age)/60.0,
-        float(u.baseline_activity_min_per_day)/60.0,
-        1.0 if bool(u.premium) else 0.0,
-        1.0 if bool(u.push_opt_in) else 0.0,
-        1.0 if str(u.chronotype)=="morning" else 0.0,
-        1.0 if str(u.primary_goal)=="stress" else 0.0,
-        1.0 if str(u.primary_goal)=="weight_loss" else 0.0,
-        1.0 if bucket=="morning" else 0.0,
-        float(dow)/6.0,
-    ], dtype=float)
-
-def evaluate(top_k: int = 5) -> dict:
-    users = pd.read_csv(DATA_DIR / "users.csv")
-    content = pd.read_csv(DATA_DIR / "content_catalog.csv")
-    inter = pd.read_csv(DATA_DIR / "interactions.csv").sample(frac=1.0, random_state=42).reset_index(drop=True)
+    return float(_hits_and_aps(np.asarray([ranked_ids]), np.asarray([true_id]), k)[1][0])
+
+# ---- batched ranking (optionally sharded over processes) ----
+
+_ltr: LTRModel | None = None
+
+def _init_ranker(ltr_path: Path, content: pd.DataFrame) -> None:
+    global _ltr
+    _ltr = LTRModel(ltr_path)
+    _ltr.prepare_catalog(content)
+
+def _rank_shard(shard: tuple) -> np.ndarray:
+    """Top-k catalog positions for queries that share one goal pool (rows)."""
+    rows, users, dows, buckets, personas, k = shard
+    assert _ltr is not None
+    scores, _ = _ltr.predict_catalog([rows] * len(users), users, dows, buckets, personas)
+    top = np.full((len(users), k), -1, dtype=np.int64)
+    kk = min(k, len(rows))
+    top[:, :kk] = rows[top_positions(scores.reshape(len(users), len(rows)), kk)]
+    return top
+
+def rank_queries(ltr_path: Path, content: pd.DataFrame, users: pd.DataFrame, day_of_week, hour_bucket,
+                 personas, k: int, workers: int = 1, chunk_size: int = 2048) -> np.ndarray:
+    """
+    (n_queries, k) top-k content positions (-1 padded) per (user, context) query; the candidate
+    pool is the user's goal (all content if that goal has none), as in the API.
+    """
+    goals = users["primary_goal"].astype(str).to_numpy()
+    tags = content["goal_tag"].astype(str).to_numpy()
+    shards, targets = [], []
+    for goal in np.unique(goals):
+        rows = np.flatnonzero(tags == goal)
+        if rows.size == 0:
+            rows = np.arange(len(content))
+        idx = np.flatnonzero(goals == goal)
+        for s in range(0, len(idx), chunk_size):
+            part = idx[s:s + chunk_size]
+            shards.append((rows, users.iloc[part], np.asarray(day_of_week)[part], np.asarray(hour_bucket)[part],
+                           [int(p) for p in np.asarray(personas)[part]], k))
+            targets.append(part)
+    top = np.full((len(users), k), -1, dtype=np.int64)
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_ranker, initargs=(ltr_path, content)) as pool:
+            results = list(pool.map(_rank_shard, shards))
+    else:
+        _init_ranker(ltr_path, content)
+        results = [_rank_shard(shard) for shard in shards]
+    for part, res in zip(targets, results):
+        top[part] = res
+    return top
+
+def evaluate(top_k: int = 5, workers: int = 1, chunk_size: int = 2048) -> dict:
+    users = read_table(DATA_DIR, "users", categorical=False)
+    content = read_table(DATA_DIR, "content_catalog", categorical=False)
+    inter = read_table(DATA_DIR, "interactions").sample(frac=1.0, random_state=42).reset_index(drop=True)
 
     # popularity for content
-    pop = inter.groupby("content_id")["reward"].mean().rename("popularity").reset_index()
+    pop = inter.groupby("content_id", observed=True)["reward"].mean().rename("popularity").reset_index()
+    pop["content_id"] = pop["content_id"].astype(str)
     content = content.merge(pop, on="content_id", how="left")
     content["popularity"] = content["popularity"].fillna(0.0)
 
@@ -49,6 +95,8 @@ def evaluate(top_k: int = 5) -> dict:
     pre, km = load_persona(ENCODER_PATH, PERSONA_MODEL_PATH)
     users_p = assign_personas(select_user_features(users), pre, km).set_index("user_id")
 
+    content = content.reset_index(drop=True)
+
     # split
     n = len(inter); split = int(0.8 * n)
     train_inter = inter.iloc[:split].copy()
@@ -57,47 +105,48 @@ def evaluate(top_k: int = 5) -> dict:
     # bandit
     bandit = LinTSBandit(ARMS, d=BANDIT_D, alpha=0.5)
     users_idx = users.set_index("user_id")
-    for _, r in train_inter.iterrows():
-        u = users_idx.loc[r.user_id]
-        x = _user_vec(u, int(r.day_of_week), str(r.hour_bucket))
-        bandit.update(str(r.arm), float(r.reward), x)
-
-    matches, match_rewards, test_rewards = [], [], []
-    for _, r in test_inter.iterrows():
-        u = users_idx.loc[r.user_id]
-        x = _user_vec(u, int(r.day_of_week), str(r.hour_bucket))
-        arm = bandit.choose(x)
-        matches.append(1 if arm == r.arm else 0)
-        if arm == r.arm: match_rewards.append(float(r.reward))
-        test_rewards.append(float(r.reward))
+    X_train = context_matrix(users_idx.loc[train_inter["user_id"]],
+                             train_inter["day_of_week"].to_numpy(), train_inter["hour_bucket"].astype(str).to_numpy())
+    X_train = fit_dim(X_train, bandit.d)
+    bandit.update_batch(train_inter["arm"].astype(str).to_numpy(), train_inter["reward"].to_numpy(dtype=float), X_train)
+
+    # test replay: one vectorized choose over all test contexts
+    X_test = context_matrix(users_idx.loc[test_inter["user_id"]],
+                            test_inter["day_of_week"].to_numpy(), test_inter["hour_bucket"].astype(str).to_numpy())
+    X_test = fit_dim(X_test, bandit.d)
+    chosen = np.asarray(bandit.choose_batch(X_test)) if len(test_inter) else np.array([], dtype=object)
+    logged = test_inter["arm"].astype(str).to_numpy()
+    rewards = test_inter["reward"].to_numpy(dtype=float)
+    matches = (chosen == logged).astype(int).tolist()
+    match_rewards = rewards[chosen == logged].tolist()
+    test_rewards = rewards.tolist()
     bandit_metrics = {
         "policy_match_rate": round(float(np.mean(matches)), 4) if matches else 0.0,
         "matched_ctr": round(float(np.mean(match_rewards)), 4) if match_rewards else 0.0,
         "overall_ctr_baseline": round(float(np.mean(test_rewards)), 4) if test_rewards else 0.0,
     }
 
-    # learned scorer (LTR)
+    # learned scorer (LTR): each test positive is a (user, context) query; queries are ranked
+    # once, in stacked per-goal batches, and only the top-k positions are kept
     ltr_path = ARTIFACTS_DIR / "ltr_model.joblib"
     if not ltr_path.exists():
         raise RuntimeError("artifacts/ltr_model.joblib not found. Run `make train-ltr` or `make train`.")
-    ltr = LTRModel(ltr_path)
 
-    hits, aps = [], []
-    pos = test_inter[test_inter["reward"] == 1].copy()
-    for _, r in pos.iterrows():
-        u = users_idx.loc[r.user_id]
-        persona = int(users_p.loc[r.user_id]["persona"]) if r.user_id in users_p.index else 0
-
-        pool = content[content["goal_tag"] == str(u.primary_goal)].copy()
-        if pool.empty: pool = content.copy()
-
-        feats = build_candidate_features(pool, u, int(r.day_of_week), str(r.hour_bucket), persona)
-        scores = ltr.predict_proba(feats)
-        pool = pool.assign(score=scores.values)
-        ranked_ids = pool.sort_values("score", ascending=False).head(max(top_k, 20))["content_id"].astype(str).tolist()
-
-        hits.append(precision_at_k(ranked_ids, str(r.content_id), top_k))
-        aps.append(average_precision_at_k(ranked_ids, str(r.content_id), top_k))
+    pos = test_inter[test_inter["reward"] == 1]
+    keys = pd.MultiIndex.from_arrays([pos["user_id"].astype(str).to_numpy(), pos["day_of_week"].to_numpy(dtype=int),
+                                      pos["hour_bucket"].astype(str).to_numpy()])
+    query_of, queries = keys.factorize()
+    q_users = users_idx.loc[queries.get_level_values(0)].reset_index()
+    q_personas = users_p["persona"].reindex(queries.get_level_values(0)).fillna(0).astype(int).to_numpy()
+    top = rank_queries(ltr_path, content, q_users, queries.get_level_values(1).to_numpy(),
+                       queries.get_level_values(2).to_numpy(), q_personas, top_k,
+                       workers=workers, chunk_size=chunk_size)
+
+    content_pos = pd.Series(np.arange(len(content)), index=content["content_id"].astype(str))
+    # content missing from the catalog gets a position no ranking holds (-1 pads short rankings)
+    true_pos = content_pos.reindex(pos["content_id"].astype(str)).fillna(len(content)).astype(int).to_numpy()
+    hit, ap = _hits_and_aps(top[query_of], true_pos, top_k)
+    hits, aps = hit.tolist(), ap.tolist()
 
     rec_metrics = {
         "hit_rate@k": round(float(np.mean(hits)), 4) if hits else 0.0,
@@ -113,5 +162,13 @@ def evaluate(top_k: int = 5) -> dict:
         json.dump(metrics, f, indent=2)
     return metrics
 
+def main(argv: list[str] | None = None) -> dict:
+    ap = argparse.ArgumentParser(description="Offline evaluation → artifacts/metrics.json")
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=1, help="processes scoring query shards")
+    ap.add_argument("--chunk-size", type=int, default=2048, help="queries per scoring shard")
+    args = ap.parse_args(argv if argv is not None else [])
+    return evaluate(top_k=args.top_k, workers=args.workers, chunk_size=args.chunk_size)
+
 if __name__ == "__main__":
-    m = evaluate(top_k=5)
+    main(sys.argv[1:])
@@ -0,0 +1,23 @@
+from __future__ import annotations
+import joblib
+
+from src.config import ARTIFACTS_DIR
+from src.models.compiled_ltr import CompiledLTR, artifact_fingerprint
+
+LTR_PATH = ARTIFACTS_DIR / "ltr_model.joblib"
+OUT_PATH = ARTIFACTS_DIR / "ltr_compiled.npz"
+
+def export(src=LTR_PATH, out=OUT_PATH) -> CompiledLTR:
+    pipe = joblib.load(src)
+    compiled = CompiledLTR.from_pipeline(pipe, source=artifact_fingerprint(src))
+    compiled.save(out)
+    return compiled
+
+def main():
+    if not LTR_PATH.exists():
+        raise RuntimeError("artifacts/ltr_model.joblib not found. Run `make train-ltr` first.")
+    compiled = export()
+    print(f"Compiled {compiled.kind} scorer ({compiled.n_features} features) → {OUT_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -1,133 +1,213 @@
 # scripts/generate_data.py
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import random
+from typing import Iterator, Mapping
+import argparse
+import sys
+import time
 import numpy as np
 import pandas as pd
 
-rng = np.random.default_rng(42)
-random.seed(42)
+from src.data_store import TableWriter, write_table
+
+SEED = 42
+rng = np.random.default_rng(SEED)
 
 BASE = Path("data")
-BASE.mkdir(parents=True, exist_ok=True)
 
 N_USERS = 600
 N_CONTENT = 300
 N_INTERACTIONS = 9000
+CHUNK_SIZE = 1_000_000  # interactions generated (and written) per chunk
 
 GENDERS = ["male", "female", "other"]
 WORK = ["9-5", "shift", "flex"]
 GOALS = ["weight_loss", "fitness", "stress"]
+GOAL_WEIGHTS = [0.45, 0.35, 0.20]
 CHRONO = ["morning", "evening"]
 LANGS = ["en", "de", "fr"]
 TYPES = ["yoga", "walk", "strength", "meditation", "hiit"]
 INTENS = ["low", "medium", "high"]
 DIFF = ["beginner", "intermediate", "all"]
+ARMS = ["push_morning", "push_evening", "email_morning", "email_evening", "inapp_morning", "inapp_evening"]
+BUCKETS = ["morning", "evening"]
+INTERACTION_COLS = ["user_id", "content_id", "arm", "reward", "day_of_week", "hour_bucket"]
+
+def _pick(options: list[str], n: int, p=None) -> np.ndarray:
+    return np.asarray(options, dtype=object)[rng.choice(len(options), size=n, p=p)]
 
 def gen_users(n=N_USERS):
-    users = []
-    for i in range(n):
-        users.append(
-            dict(
-                user_id=f"u{i:04d}",
-                age=int(rng.integers(18, 65)),
-                gender=random.choice(GENDERS),
-                work_pattern=random.choice(WORK),
-                primary_goal=random.choices(GOALS, weights=[0.45, 0.35, 0.20])[0],
-                baseline_activity_min_per_day=int(rng.integers(5, 50)),
-                premium=bool(rng.integers(0, 2)),
-                push_opt_in=True if rng.random() < 0.8 else False,
-                chronotype=random.choices(CHRONO, weights=[0.6, 0.4])[0],
-                language=random.choices(LANGS, weights=[0.7, 0.2, 0.1])[0],
-            )
-        )
-    return pd.DataFrame(users)
+    return pd.DataFrame(dict(
+        user_id=[f"u{i:04d}" for i in range(n)],
+        age=rng.integers(18, 65, size=n),
+        gender=_pick(GENDERS, n),
+        work_pattern=_pick(WORK, n),
+        primary_goal=_pick(GOALS, n, GOAL_WEIGHTS),
+        baseline_activity_min_per_day=rng.integers(5, 50, size=n),
+        premium=rng.integers(0, 2, size=n).astype(bool),
+        push_opt_in=rng.random(n) < 0.8,
+        chronotype=_pick(CHRONO, n, [0.6, 0.4]),
+        language=_pick(LANGS, n, [0.7, 0.2, 0.1]),
+    ))
 
 def gen_content(n=N_CONTENT):
-    items = []
-    for j in range(n):
-        goal = random.choices(GOALS, weights=[0.45, 0.35, 0.20])[0]
-        ctype = random.choice(TYPES)
-        intensity = random.choice(INTENS)
-        duration = int(rng.integers(8, 35))
-        difficulty = random.choice(DIFF)
-        items.append(
-            dict(
-                content_id=f"c{j:04d}",
-                type=ctype,
-                duration_min=duration,
-                intensity=intensity,
-                goal_tag=goal,
-                difficulty=difficulty,
-            )
-        )
-    return pd.DataFrame(items)
-
-def prop(u, c, dow, bucket):
-    p = 0.08
+    return pd.DataFrame(dict(
+        content_id=[f"c{j:04d}" for j in range(n)],
+        type=_pick(TYPES, n),
+        duration_min=rng.integers(8, 35, size=n),
+        intensity=_pick(INTENS, n),
+        goal_tag=_pick(GOALS, n, GOAL_WEIGHTS),
+        difficulty=_pick(DIFF, n),
+    ))
+
+def prop_batch(u: Mapping[str, np.ndarray], c: Mapping[str, np.ndarray], bucket: np.ndarray) -> np.ndarray:
+    """Reward propensity for aligned arrays of user fields, content fields and hour buckets."""
+    goal, ctype, intensity = u["primary_goal"], c["type"], c["intensity"]
+    duration = np.asarray(c["duration_min"], dtype=float)
+    p = np.full(len(goal), 0.08)
     # goal alignment (primary positive signal)
-    if u["primary_goal"] == c["goal_tag"]:
-        p += 0.40
+    p += np.where(goal == c["goal_tag"], 0.40, 0.0)
     # simple tailored boosts per goal
-    if u["primary_goal"] == "weight_loss":
-        if c["intensity"] == "low" and c["duration_min"] <= 20: p += 0.15
-        if c["type"] in ["walk", "yoga"]: p += 0.07
-    if u["primary_goal"] == "fitness":
-        if c["intensity"] == "medium" and 15 <= c["duration_min"] <= 30: p += 0.12
-        if c["type"] in ["hiit", "strength"]: p += 0.07
-    if u["primary_goal"] == "stress":
-        if c["type"] in ["yoga", "meditation"] and c["intensity"] == "low": p += 0.18
+    wl, fit = goal == "weight_loss", goal == "fitness"
+    p += np.where(wl & (intensity == "low") & (duration <= 20), 0.15, 0.0)
+    p += np.where(wl & np.isin(ctype, ["walk", "yoga"]), 0.07, 0.0)
+    p += np.where(fit & (intensity == "medium") & (duration >= 15) & (duration <= 30), 0.12, 0.0)
+    p += np.where(fit & np.isin(ctype, ["hiit", "strength"]), 0.07, 0.0)
+    p += np.where((goal == "stress") & np.isin(ctype, ["yoga", "meditation"]) & (intensity == "low"), 0.18, 0.0)
 
     # light preferences
-    if c["difficulty"] in ["beginner", "all"]: p += 0.03
-    if (u["chronotype"] == "morning" and bucket == "morning") or (u["chronotype"] == "evening" and bucket == "evening"):
-        p += 0.03
+    p += np.where(np.isin(c["difficulty"], ["beginner", "all"]), 0.03, 0.0)
+    chrono = u["chronotype"]
+    p += np.where(((chrono == "morning") & (bucket == "morning")) | ((chrono == "evening") & (bucket == "evening")),
+                  0.03, 0.0)
 
     # duration closeness
-    p += max(0, 0.08 - abs(c["duration_min"] - u["baseline_activity_min_per_day"]) / 200.0)
-
-    return float(np.clip(p, 0.01, 0.95))
-
-def gen_interactions(users: pd.DataFrame, items: pd.DataFrame, n=N_INTERACTIONS):
-    rows = []
-    ARMS = ["push_morning","push_evening","email_morning","email_evening","inapp_morning","inapp_evening"]
-    for _ in range(n):
-        u = users.sample(1, random_state=rng.integers(0, 1e9)).iloc[0].to_dict()
-        # pick within-goal 70% of time → clearer pattern for eval
-        if rng.random() < 0.7:
-            pool = items[items["goal_tag"] == u["primary_goal"]]
-            c = pool.sample(1, random_state=rng.integers(0, 1e9)).iloc[0].to_dict() if not pool.empty else \
-                items.sample(1, random_state=rng.integers(0, 1e9)).iloc[0].to_dict()
-        else:
-            c = items.sample(1, random_state=rng.integers(0, 1e9)).iloc[0].to_dict()
-
-        dow = int(rng.integers(0, 7))
-        bucket = "morning" if rng.random() < 0.55 else "evening"
-        p = prop(u, c, dow, bucket)
-        p = float(np.clip(rng.normal(p, 0.04), 0.01, 0.99))
-        reward = 1 if rng.random() < p else 0
-
-        rows.append(
-            dict(
-                user_id=u["user_id"],
-                content_id=c["content_id"],
-                arm=random.choice(ARMS),
-                reward=reward,
-                day_of_week=dow,
-                hour_bucket=bucket,
-            )
-        )
-    return pd.DataFrame(rows)
-
-def main():
-    users = gen_users()
-    content = gen_content()
-    inter = gen_interactions(users, content)
-
-    users.to_csv(BASE / "users.csv", index=False)
-    content.to_csv(BASE / "content_catalog.csv", index=False)
-    inter.to_csv(BASE / "interactions.csv", index=False)
-    print(f"Mock data written to {BASE}")
+    p += np.maximum(0, 0.08 - np.abs(duration - np.asarray(u["baseline_activity_min_per_day"], dtype=float)) / 200.0)
+    return np.clip(p, 0.01, 0.95)
+
+def prop(u, c, dow, bucket):
+    """Single-row prop_batch (u, c: dicts)."""
+    u1 = {k: np.array([u[k]], dtype=object) for k in ("primary_goal", "chronotype", "baseline_activity_min_per_day")}
+    c1 = {k: np.array([c[k]], dtype=object) for k in ("goal_tag", "type", "intensity", "difficulty", "duration_min")}
+    return float(prop_batch(u1, c1, np.array([bucket], dtype=object))[0])
+
+# ---- interactions: independent, seeded chunks (same output for any worker count) ----
+
+_tables: tuple[dict, dict, list[np.ndarray]] | None = None  # users, content, content rows per goal
+
+def _set_tables(users: dict, content: dict) -> None:
+    global _tables
+    pools = [np.flatnonzero(content["goal_tag"] == g) for g in GOALS]
+    _tables = users, content, pools
+
+def _columns(users: pd.DataFrame, content: pd.DataFrame) -> tuple[dict, dict]:
+    u = {k: users[k].to_numpy() for k in ("primary_goal", "chronotype", "baseline_activity_min_per_day")}
+    c = {k: content[k].to_numpy() for k in ("goal_tag", "type", "intensity", "difficulty", "duration_min")}
+    return u, c
+
+def _chunk(spec: tuple[int, np.random.SeedSequence]) -> dict[str, np.ndarray]:
+    """One chunk of interactions as arrays (user/content as row positions)."""
+    n, seed = spec
+    assert _tables is not None
+    u, c, pools = _tables
+    r = np.random.default_rng(seed)
+    ui = r.integers(0, len(u["primary_goal"]), size=n)
+    ci = r.integers(0, len(c["goal_tag"]), size=n)
+    # pick within-goal 70% of time → clearer pattern for eval
+    within = r.random(n) < 0.7
+    goal = u["primary_goal"][ui]
+    for g, pool in zip(GOALS, pools):
+        m = within & (goal == g)
+        if pool.size and m.any():
+            ci[m] = pool[r.integers(0, pool.size, size=int(m.sum()))]
+
+    dow = r.integers(0, 7, size=n)
+    bucket = np.where(r.random(n) < 0.55, "morning", "evening").astype(object)
+    p = prop_batch({k: v[ui] for k, v in u.items()}, {k: v[ci] for k, v in c.items()}, bucket)
+    p = np.clip(r.normal(p, 0.04), 0.01, 0.99)
+    reward = (r.random(n) < p).astype(np.int64)
+    arm = r.integers(0, len(ARMS), size=n)
+    return {"user": ui, "content": ci, "arm": arm, "reward": reward, "day_of_week": dow,
+            "hour_bucket": (bucket == "evening").astype(np.int8)}
+
+def _frame(arrays: dict[str, np.ndarray], user_ids, content_ids) -> pd.DataFrame:
+    """Chunk arrays → interactions frame with categorical string columns (codes, no copies)."""
+    def cat(codes, cats):
+        return pd.Categorical.from_codes(codes, categories=pd.Index(cats, dtype=object))
+    return pd.DataFrame({
+        "user_id": cat(arrays["user"], user_ids),
+        "content_id": cat(arrays["content"], content_ids),
+        "arm": cat(arrays["arm"], ARMS),
+        "reward": arrays["reward"],
+        "day_of_week": arrays["day_of_week"],
+        "hour_bucket": cat(arrays["hour_bucket"], BUCKETS),
+    })
+
+def iter_interactions(users: pd.DataFrame, items: pd.DataFrame, n=N_INTERACTIONS, seed: int | None = None,
+                      chunk_size: int = CHUNK_SIZE, workers: int = 1) -> Iterator[pd.DataFrame]:
+    """
+    Interactions in chunks of `chunk_size`, in order. Chunk i draws from its own child of
+    SeedSequence(seed), so the output only depends on the seed, never on `workers`.
+    """
+    if seed is None:
+        seed = int(rng.integers(0, 2**63 - 1))
+    sizes = [min(chunk_size, n - s) for s in range(0, n, chunk_size)]
+    specs = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+    u, c = _columns(users, items)
+    user_ids = users["user_id"].astype(str).tolist()
+    content_ids = items["content_id"].astype(str).tolist()
+    if workers > 1 and len(specs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_tables, initargs=(u, c)) as pool:
+            for arrays in pool.map(_chunk, specs):
+                yield _frame(arrays, user_ids, content_ids)
+        return
+    _set_tables(u, c)
+    for spec in specs:
+        yield _frame(_chunk(spec), user_ids, content_ids)
+
+def gen_interactions(users: pd.DataFrame, items: pd.DataFrame, n=N_INTERACTIONS, **kwargs):
+    chunks = list(iter_interactions(users, items, n, **kwargs))
+    if not chunks:
+        return pd.DataFrame(columns=INTERACTION_COLS)
+    return pd.concat(chunks, ignore_index=True).astype(
+        {"user_id": object, "content_id": object, "arm": object, "hour_bucket": object})
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Generate the synthetic users / content / interactions datasets.")
+    ap.add_argument("--users", type=int, default=N_USERS)
+    ap.add_argument("--content", type=int, default=N_CONTENT)
+    ap.add_argument("--interactions", type=int, default=N_INTERACTIONS)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--workers", type=int, default=1, help="processes generating interaction chunks")
+    ap.add_argument("--out", type=Path, default=None, help="output directory (default: ./data)")
+    ap.add_argument("--no-csv", action="store_true", help="columnar tables only (large runs)")
+    return ap.parse_args(argv)
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv if argv is not None else [])
+    global rng
+    rng = np.random.default_rng(args.seed)
+    base = args.out or BASE
+    base.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+
+    users = gen_users(args.users)
+    content = gen_content(args.content)
+    # CSV for interchange + typed columnar copy that the training scripts and API read
+    write_table(users, base, "users", csv=not args.no_csv)
+    write_table(content, base, "content_catalog", csv=not args.no_csv)
+
+    # interactions are streamed to disk chunk by chunk
+    writer = TableWriter(base, "interactions", INTERACTION_COLS, categories={
+        "user_id": users["user_id"].tolist(), "content_id": content["content_id"].tolist(),
+        "arm": ARMS, "hour_bucket": BUCKETS}, csv=not args.no_csv)
+    for chunk in iter_interactions(users, content, args.interactions, seed=args.seed,
+                                   chunk_size=args.chunk_size, workers=args.workers):
+        writer.append(chunk)
+    writer.close()
+    print(f"Mock data written to {base} ({writer.rows:,} interactions in {time.perf_counter() - t0:.1f}s)")
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,229 @@
+from __future__ import annotations
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from src.config import ARTIFACTS_DIR, ARMS, DATA_DIR
+from src.data_store import has_table, read_table
+from src.service.schemas import Feedback, UserProfile
+from src.service.user_store import PROFILE_COLS
+
+# Local load generator for the API: replays a mix of /recommendations and /feedback traffic
+# from `--concurrency` clients, either closed-loop (each client sends its next request as soon as
+# the previous one returns) or open-loop at `--rate` requests/s. In open-loop mode latency is
+# measured from the moment a request was due, so a saturated server shows up as queueing delay
+# instead of a silently lower send rate. Without --url the app is served in-process (ASGI, no
+# sockets): quick to run, but client and server then share one interpreter.
+
+OUT_PATH = ARTIFACTS_DIR / "load_test.json"
+HOUR_BUCKETS = ("morning", "evening")
+
+
+def load_users(data_dir: Path = DATA_DIR) -> list[dict]:
+    """Profiles from users.csv (falls back to the schema example when there is no dataset)."""
+    if not has_table(data_dir, "users"):
+        return [UserProfile.Config.json_schema_extra["example"]]
+    users = read_table(data_dir, "users", categorical=False)
+    out = []
+    for rec in users[[c for c in PROFILE_COLS if c in users.columns]].to_dict(orient="records"):
+        try:
+            out.append(json.loads(UserProfile(**{**rec, "user_id": str(rec["user_id"])}).model_dump_json()))
+        except ValueError:
+            continue
+    return out
+
+
+def load_content_ids(data_dir: Path = DATA_DIR) -> list[str]:
+    if not has_table(data_dir, "content_catalog"):
+        return [Feedback.Config.json_schema_extra["example"]["content_id"]]
+    return read_table(data_dir, "content_catalog", columns=["content_id"])["content_id"].astype(str).tolist()
+
+
+class Traffic:
+    """
+    Request mix. Feedback goes to an item/arm the API recently recommended to that user when
+    there is one (like a client reporting an outcome), otherwise to a random catalog item.
+    """
+    def __init__(self, users: list[dict], content_ids: list[str], feedback_ratio: float = 0.2,
+                 reward_rate: float = 0.3, top_k: int = 5, seed: int = 0):
+        if not users:
+            raise ValueError("no users to replay")
+        self.users, self.content_ids = users, content_ids or ["c0000"]
+        self.feedback_ratio, self.reward_rate, self.top_k = feedback_ratio, reward_rate, top_k
+        self.rng = np.random.default_rng(seed)
+        self.recent: deque[dict] = deque(maxlen=1_000)
+
+    def _context(self) -> dict:
+        return {"day_of_week": int(self.rng.integers(7)), "hour_bucket": HOUR_BUCKETS[int(self.rng.integers(2))]}
+
+    def next(self) -> tuple[str, str, dict]:
+        """(endpoint name, path, JSON payload)."""
+        if self.rng.random() < self.feedback_ratio:
+            if self.recent:
+                shown = self.recent[int(self.rng.integers(len(self.recent)))]
+            else:
+                user = self.users[int(self.rng.integers(len(self.users)))]
+                shown = {"user_id": user["user_id"], "arm": ARMS[int(self.rng.integers(len(ARMS)))],
+                         "content_id": self.content_ids[int(self.rng.integers(len(self.content_ids)))],
+                         **self._context()}
+            return "feedback", "/feedback", {**shown, "reward": int(self.rng.random() < self.reward_rate)}
+        user = self.users[int(self.rng.integers(len(self.users)))]
+        return "recommendations", "/recommendations", {"user": user, "context": self._context(),
+                                                       "top_k": self.top_k}
+
+    def observe(self, payload: dict, response: dict) -> None:
+        """Remember a served recommendation so later feedback refers to it."""
+        items = response.get("items") or []
+        if items and response.get("chosen_arm") in ARMS:
+            self.recent.append({"user_id": payload["user"]["user_id"], "content_id": items[0]["content_id"],
+                                "arm": response["chosen_arm"], **payload["context"]})
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout_s: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"API not ready after {timeout_s:.0f}s")
+        await asyncio.sleep(0.2)
+
+
+async def run_load(client: httpx.AsyncClient, traffic: Traffic, duration_s: float = 10.0,
+                   requests: int | None = None, concurrency: int = 8, rate: float | None = None,
+                   warmup: int = 0) -> tuple[list[tuple], float]:
+    """
+    Drive traffic until `duration_s` elapsed or `requests` were sent. Returns the samples
+    (endpoint, status code or error name, latency seconds) after the first `warmup`
+    requests, and the wall time they span.
+    """
+    samples: list[tuple] = []
+    total = None if requests is None else requests + warmup
+    sent = 0
+    start = time.perf_counter()
+    stop_at = start + duration_s
+    measured_from: list[float] = []
+
+    async def client_loop() -> None:
+        nonlocal sent
+        while True:
+            if (total is not None and sent >= total) or time.perf_counter() >= stop_at:
+                return
+            i, sent = sent, sent + 1
+            due = time.perf_counter()
+            if rate:
+                due = start + i / rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if i == warmup:
+                measured_from.append(due)
+            endpoint, path, payload = traffic.next()
+            try:
+                res = await client.post(path, json=payload)
+                status = str(res.status_code)
+                if endpoint == "recommendations" and res.status_code == 200:
+                    traffic.observe(payload, res.json())
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if i >= warmup:
+                samples.append((endpoint, status, time.perf_counter() - due))
+
+    await asyncio.gather(*(client_loop() for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - (measured_from[0] if measured_from else start)
+    return samples, wall
+
+
+def _stats(samples: list[tuple], wall_s: float) -> dict:
+    codes = Counter(s[1] for s in samples)
+    errors = sum(n for code, n in codes.items() if not code.startswith("2"))
+    ms = np.array([s[2] for s in samples]) * 1e3
+    out = {"requests": len(samples), "errors": errors,
+           "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+           "throughput_rps": round(len(samples) / wall_s, 2) if wall_s > 0 else 0.0,
+           "status": dict(sorted(codes.items()))}
+    if ms.size:
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        out.update(mean_ms=round(float(ms.mean()), 3), p50_ms=round(float(p50), 3), p95_ms=round(float(p95), 3),
+                   p99_ms=round(float(p99), 3), max_ms=round(float(ms.max()), 3))
+    return out
+
+
+def summarize(samples: list[tuple], wall_s: float) -> dict:
+    """Overall and per-endpoint latency percentiles, throughput and error rate."""
+    endpoints = sorted({s[0] for s in samples})
+    return {"wall_s": round(wall_s, 3), "overall": _stats(samples, wall_s),
+            "endpoints": {e: _stats([s for s in samples if s[0] == e], wall_s) for e in endpoints}}
+
+
+@asynccontextmanager
+async def target(url: str | None, timeout_s: float = 30.0) -> AsyncIterator[httpx.AsyncClient]:
+    """HTTP client for `url`, or for the app served in-process (lifespan included) when url is None."""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout_s, limits=limits) as client:
+            yield client
+        return
+    from src.service.api import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://in-process", timeout=timeout_s) as client:
+            yield client
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Replay /recommendations + /feedback traffic and report latency.")
+    ap.add_argument("--url", default=None, help="running API, e.g. http://127.0.0.1:8000 (default: in-process)")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    ap.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    ap.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    ap.add_argument("--rate", type=float, default=None, help="open-loop arrival rate in requests/s")
+    ap.add_argument("--feedback-ratio", type=float, default=0.2, help="share of /feedback requests")
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=50, help="initial requests left out of the report")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--data-dir", type=Path, default=DATA_DIR, help="users.csv / content_catalog.csv to draw from")
+    ap.add_argument("--out", type=Path, default=OUT_PATH)
+    return ap.parse_args(argv)
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    traffic = Traffic(load_users(args.data_dir), load_content_ids(args.data_dir), args.feedback_ratio,
+                      top_k=args.top_k, seed=args.seed)
+    async with target(args.url) as client:
+        await wait_ready(client)
+        samples, wall = await run_load(client, traffic, args.duration, args.requests, args.concurrency,
+                                       args.rate, args.warmup)
+    report = summarize(samples, wall)
+    report["config"] = {"target": args.url or "in-process", "concurrency": args.concurrency, "rate": args.rate,
+                        "duration_s": args.duration, "feedback_ratio": args.feedback_ratio, "warmup": args.warmup}
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv if argv is not None else [])
+    report = asyncio.run(_main(args))
+    for name, s in [("overall", report["overall"]), *report["endpoints"].items()]:
+        print(f"{name:<16} {s['requests']:>7} req  {s['throughput_rps']:>8.1f} req/s  "
+              f"p50 {s.get('p50_ms', 0):>8.2f}  p95 {s.get('p95_ms', 0):>8.2f}  p99 {s.get('p99_ms', 0):>8.2f} ms  "
+              f"errors {s['error_rate']:.2%}")
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Load test report → {args.out}")
+    return 1 if report["overall"]["requests"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
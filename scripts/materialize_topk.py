@@ -0,0 +1,21 @@
+from __future__ import annotations
+import json
+import sys
+
+from src.config import DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH, TOPK_DIR, TOPK_DEPTH
+from src.data_store import read_table
+from src.service.bundle import ModelBundle
+from src.service.topk import materialize
+
+def build(full: bool = False) -> dict:
+    """Precompute top-K content for every user in users.csv x every context (incremental by default)."""
+    bundle = ModelBundle.load(DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH)
+    users = read_table(DATA_DIR, "users", categorical=False)
+    return materialize(bundle, users, TOPK_DIR, depth=TOPK_DEPTH, full=full)
+
+def main():
+    summary = build(full="--full" in sys.argv[1:])
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+
+from src.config import ARMS, BANDIT_D, BANDIT_PATH, BANDIT_SYNC_DIR
+from src.models.bandit import LinTSBandit
+from src.models.bandit_sync import init_global, merge_deltas
+
+def merge(sync_dir=BANDIT_SYNC_DIR, seed_path=BANDIT_PATH) -> dict:
+    """Fold pending replica deltas into the global bandit (seeded from the trained snapshot once)."""
+    seed = LinTSBandit.load(seed_path) if Path(seed_path).exists() else LinTSBandit(ARMS, d=BANDIT_D)
+    init_global(sync_dir, seed)
+    return merge_deltas(sync_dir)
+
+def main():
+    summary = merge()
+    print(json.dumps(summary, indent=2))
+    if summary["gaps"]:
+        print("⚠ some replica deltas are missing (see gaps); their updates were lost")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,14 @@
+import os
 import uvicorn
 from pathlib import Path
 
+from src.config import API_WORKERS, ARTIFACTS_DIR
+
 if __name__ == "__main__":
-    uvicorn.run("src.service.api:app", host="127.0.0.1", port=8000, reload=False)
+    if API_WORKERS > 1:
+        # Several worker processes: they share one memory-mapped bandit and catalog via
+        # SHARED_STATE_DIR (each worker imports src.config afresh and reads it from the env)
+        os.environ.setdefault("SHARED_STATE_DIR", str(ARTIFACTS_DIR / "shared"))
+        uvicorn.run("src.service.api:app", host="127.0.0.1", port=8000, reload=False, workers=API_WORKERS)
+    else:
+        uvicorn.run("src.service.api:app", host="127.0.0.1", port=8000, reload=False)
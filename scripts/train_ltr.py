@@ -1,8 +1,6 @@
 from __future__ import annotations
-from pathlib import Path
 import joblib
 import numpy as np
-import pandas as pd
 
 from sklearn.model_selection import train_test_split
 from sklearn.compose import ColumnTransformer
@@ -12,6 +10,7 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score, average_precision_score, log_loss
 
 from src.config import DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH
+from src.data_store import read_table
 from src.features.persona_clustering import load as load_persona, assign_personas
 from src.features.preprocess import select_user_features
 
@@ -24,12 +23,13 @@ CAT = ["premium", "push_opt_in", "chronotype", "primary_goal", "type",
        "intensity", "difficulty", "goal_tag", "hour_bucket", "persona"]
 
 def build_dataset():
-    users = pd.read_csv(DATA_DIR / "users.csv")
-    content = pd.read_csv(DATA_DIR / "content_catalog.csv")
-    inter = pd.read_csv(DATA_DIR / "interactions.csv")
+    users = read_table(DATA_DIR, "users", categorical=False)
+    content = read_table(DATA_DIR, "content_catalog", categorical=False)
+    inter = read_table(DATA_DIR, "interactions", columns=["user_id", "content_id", "reward", "day_of_week", "hour_bucket"])
 
     # popularity prior (CTR per content)
-    pop = inter.groupby("content_id")["reward"].mean().rename("popularity").reset_index()
+    pop = inter.groupby("content_id", observed=True)["reward"].mean().rename("popularity").reset_index()
+    pop["content_id"] = pop["content_id"].astype(str)
     content = content.merge(pop, on="content_id", how="left")
     content["popularity"] = content["popularity"].fillna(0.0)
 
@@ -54,6 +54,7 @@ def build_dataset():
     X["premium"] = X["premium"].astype(bool)
     X["push_opt_in"] = X["push_opt_in"].astype(bool)
     X["persona"] = X["persona"].astype(str)  # categorical
+    X["hour_bucket"] = X["hour_bucket"].astype(str)  # category codes in the columnar table
 
     return X, y
 
@@ -1,11 +1,11 @@
 from __future__ import annotations
 from pathlib import Path
-import pandas as pd
 from src.config import DATA_DIR, ENCODER_PATH, PERSONA_MODEL_PATH
+from src.data_store import read_table
 from src.features.persona_clustering import fit_kmeans_personas, save
 
 def main():
-    dfu = pd.read_csv(DATA_DIR / "users.csv")
+    dfu = read_table(DATA_DIR, "users", categorical=False)
     pre, km = fit_kmeans_personas(dfu, k=4)
     save(pre, km, ENCODER_PATH, PERSONA_MODEL_PATH)
     print("Saved personas to artifacts.")
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
@@ -16,3 +17,58 @@ ARMS = [
 
 # >>> New: dimension of bandit feature vector (incl. hour + day)
 BANDIT_D = 10
+
+# Write-behind bandit persistence: feedback is appended to <BANDIT_PATH>.log/,
+# snapshots are checkpointed in the background after N events or T seconds.
+BANDIT_CHECKPOINT_EVERY = 500
+BANDIT_CHECKPOINT_SECONDS = 30.0
+
+# Segment-keyed ranking cache (persona, goal, user attributes, context) -> ranked content
+RANK_CACHE_SIZE = 10_000
+RANK_CACHE_TTL_SECONDS = 300.0
+
+# Worker pool for CPU-bound scoring (persona assignment, learned scorer, bandit sampling).
+# "thread" shares artifacts in-process; "process" runs scoring in worker processes that
+# load their own copy of the scorer (bandit sampling always stays in the API process).
+SCORING_EXECUTOR = os.getenv("SCORING_EXECUTOR", "thread")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "4"))
+
+# Synthetic requests pushed through the scoring path at startup before /readyz reports ready
+WARMUP_REQUESTS = 16
+
+# Poll ARTIFACTS_DIR / DATA_DIR fingerprints and hot-reload changed models (0 disables;
+# POST /admin/reload is always available)
+MODEL_RELOAD_POLL_SECONDS = float(os.getenv("MODEL_RELOAD_POLL_SECONDS", "0"))
+
+# Multi-worker serving (API_WORKERS=N scripts/run_api.py). When SHARED_STATE_DIR is set, every
+# worker attaches to one memory-mapped bandit (A, b) and one pre-transformed catalog there.
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+SHARED_STATE_DIR = Path(os.environ["SHARED_STATE_DIR"]) if os.getenv("SHARED_STATE_DIR") else None
+
+# Multi-replica bandit: each replica (BANDIT_REPLICA_ID) exports its A/b deltas to
+# BANDIT_SYNC_DIR (shared storage) and rebases on the merged global model; run
+# scripts/merge_bandit.py (e.g. from cron) to fold deltas into the global model.
+BANDIT_REPLICA_ID = os.getenv("BANDIT_REPLICA_ID") or None
+BANDIT_SYNC_DIR = Path(os.getenv("BANDIT_SYNC_DIR", str(ARTIFACTS_DIR / "bandit_sync")))
+BANDIT_SYNC_SECONDS = float(os.getenv("BANDIT_SYNC_SECONDS", "60"))
+
+# Materialized top-K table (scripts/materialize_topk.py): rankings for every user in users.csv
+# x every (day_of_week, hour_bucket), served by lookup; requests deeper than TOPK_DEPTH,
+# unknown users and changed profiles are scored live.
+TOPK_DIR = ARTIFACTS_DIR / "topk"
+TOPK_DEPTH = 20
+
+# Latency budget for recommendation requests in ms (0 = none; a request may set its own
+# `budget_ms`). The learned scorer gets LATENCY_BUDGET_SCORING_SHARE of the budget; past that
+# the response is built from cached / materialized rankings or the heuristic scorer, and for
+# DEGRADE_COOLDOWN_SECONDS further budgeted requests skip the (backlogged) learned scorer.
+LATENCY_BUDGET_MS = float(os.getenv("LATENCY_BUDGET_MS", "0"))
+LATENCY_BUDGET_SCORING_SHARE = 0.8
+DEGRADE_COOLDOWN_SECONDS = float(os.getenv("DEGRADE_COOLDOWN_SECONDS", "1.0"))
+
+# Micro-batching of concurrent /recommendations calls: a request arriving while no batch is
+# being scored goes at once; otherwise it waits for the running batch to finish, at most
+# MICROBATCH_MAX_WAIT_MS, and the waiting requests are scored as one batch (flushed early at
+# MICROBATCH_MAX_SIZE requests). MICROBATCH_MAX_SIZE <= 1 or a zero wait disables it.
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2.0"))
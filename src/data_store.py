@@ -0,0 +1,203 @@
+from __future__ import annotations
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Sequence
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Typed columnar copies of the datasets, next to the CSVs in DATA_DIR:
+#   <data_dir>/<name>.cols/schema.json   rows, source CSV fingerprint, per column: name, kind, categories
+#   <data_dir>/<name>.cols/<i:03d>.npy   one array per column (strings stored as category codes)
+# Columns are memory-mapped and only the requested ones are touched. The CSV stays the
+# interchange format: a table is used only while it still matches its CSV, otherwise (or when
+# no table was written) the CSV is parsed.
+
+TABLES = ("users", "content_catalog", "interactions")
+
+
+def csv_path(data_dir: Path, name: str) -> Path:
+    return Path(data_dir) / f"{name}.csv"
+
+
+def table_dir(data_dir: Path, name: str) -> Path:
+    return Path(data_dir) / f"{name}.cols"
+
+
+def _fingerprint(path: Path) -> str:
+    st = Path(path).stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _schema(data_dir: Path, name: str) -> dict | None:
+    path = table_dir(data_dir, name) / "schema.json"
+    if not path.exists():
+        return None
+    schema = json.loads(path.read_text(encoding="utf-8"))
+    csv = csv_path(data_dir, name)
+    if csv.exists() and schema.get("csv") != _fingerprint(csv):
+        return None  # CSV edited or regenerated after the table was written
+    return schema
+
+
+def has_table(data_dir: Path, name: str) -> bool:
+    """True if the dataset exists in either format."""
+    return csv_path(data_dir, name).exists() or (table_dir(data_dir, name) / "schema.json").exists()
+
+
+def source_fingerprint(data_dir: Path, name: str) -> str | None:
+    """size:mtime of what read_table would read for `name` (the table's schema or the CSV)."""
+    if _schema(data_dir, name) is not None:
+        return "cols:" + _fingerprint(table_dir(data_dir, name) / "schema.json")
+    csv = csv_path(data_dir, name)
+    return _fingerprint(csv) if csv.exists() else None
+
+
+def _publish(tmp: Path, out: Path) -> Path:
+    """Swap a fully written table directory in place of the old one."""
+    old = out.with_name(f"{out.name}.{os.getpid()}.old")
+    if out.exists():
+        os.replace(out, old)
+    os.replace(tmp, out)
+    shutil.rmtree(old, ignore_errors=True)
+    return out
+
+
+def write_table(df: pd.DataFrame, data_dir: Path, name: str, csv: bool = True) -> Path:
+    """Write `df` as <name>.csv (unless csv=False) and as a columnar table; returns the table dir."""
+    out = table_dir(data_dir, name)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if csv:
+        df.to_csv(csv_path(data_dir, name), index=False)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    columns = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype) or s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            cat = s.astype("category")
+            np.save(tmp / f"{i:03d}.npy", cat.cat.codes.to_numpy())
+            columns.append({"name": str(col), "kind": "category",
+                            "categories": [str(c) for c in cat.cat.categories]})
+        else:
+            arr = s.to_numpy()
+            np.save(tmp / f"{i:03d}.npy", arr)
+            columns.append({"name": str(col), "kind": "values", "dtype": str(arr.dtype)})
+    source = csv_path(data_dir, name)
+    schema = {"rows": len(df), "columns": columns, "csv": _fingerprint(source) if source.exists() else None}
+    (tmp / "schema.json").write_text(json.dumps(schema), encoding="utf-8")
+    return _publish(tmp, out)
+
+
+def read_table(data_dir: Path, name: str, columns: Sequence[str] | None = None,
+               categorical: bool = True, mmap: bool = True) -> pd.DataFrame:
+    """
+    Dataset `name` (optionally only `columns`). String columns come back as pandas categoricals,
+    or as plain object columns with categorical=False (for small tables fed to models/pydantic).
+    Falls back to parsing the CSV when there is no up-to-date table.
+    """
+    schema = _schema(data_dir, name)
+    if schema is None:
+        df = pd.read_csv(csv_path(data_dir, name))
+        return df if columns is None else df[list(columns)]
+    d = table_dir(data_dir, name)
+    wanted = None if columns is None else set(columns)
+    data = {}
+    for i, col in enumerate(schema["columns"]):
+        if wanted is not None and col["name"] not in wanted:
+            continue
+        arr = np.load(d / f"{i:03d}.npy", mmap_mode="r" if mmap else None)
+        if col["kind"] == "category":
+            values = pd.Categorical.from_codes(arr, categories=col["categories"])
+            data[col["name"]] = values if categorical else np.asarray(values, dtype=object)
+        else:
+            data[col["name"]] = arr
+    df = pd.DataFrame(data, copy=False)
+    if columns is not None:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise KeyError(f"{name}: no column(s) {missing}")
+        df = df[list(columns)]
+    return df
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    for dt in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dt).max:
+            return np.dtype(dt)
+    return np.dtype(np.int64)
+
+
+class TableWriter:
+    """
+    Streaming variant of write_table for datasets that do not fit in memory: chunks are appended
+    to the CSV and to raw per-column files, and `close()` turns those into the .npy columns.
+    String columns need their categories up front (`categories={column: [...]}`) so codes agree
+    across chunks; values outside them are stored as missing.
+    """
+    def __init__(self, data_dir: Path, name: str, columns: Sequence[str],
+                 categories: dict[str, Sequence[str]] | None = None, csv: bool = True):
+        self.data_dir, self.name = Path(data_dir), name
+        self.columns = list(columns)
+        self.categories = {c: [str(v) for v in cats] for c, cats in (categories or {}).items()}
+        self.rows = 0
+        out = table_dir(data_dir, name)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        self._tmp.mkdir()
+        with ExitStack() as stack:  # a failed open closes the files opened before it
+            self._raw = [stack.enter_context(open(self._tmp / f"{i:03d}.raw", "wb")) for i in range(len(self.columns))]
+            self._csv = (stack.enter_context(open(csv_path(data_dir, name), "w", encoding="utf-8", newline=""))
+                         if csv else None)
+            stack.pop_all()
+        self._dtypes: list[np.dtype | None] = [None] * len(self.columns)
+
+    def append(self, df: pd.DataFrame) -> None:
+        df = df[self.columns]
+        if self._csv is not None:
+            df.to_csv(self._csv, index=False, header=self.rows == 0)
+        for i, col in enumerate(self.columns):
+            s = df[col]
+            if col in self.categories:
+                cats = self.categories[col]
+                if isinstance(s.dtype, pd.CategoricalDtype) and list(s.cat.categories) == cats:
+                    codes = s.cat.codes.to_numpy()
+                else:
+                    codes = pd.Categorical(s.astype(str), categories=cats).codes
+                arr = codes.astype(_codes_dtype(len(cats)), copy=False)
+            else:
+                arr = s.to_numpy()
+                if self._dtypes[i] is not None and arr.dtype != self._dtypes[i]:
+                    arr = arr.astype(self._dtypes[i])
+            self._dtypes[i] = arr.dtype
+            self._raw[i].write(np.ascontiguousarray(arr).tobytes())
+        self.rows += len(df)
+
+    def close(self) -> Path:
+        if self._csv is not None:
+            self._csv.close()
+        columns = []
+        for i, (col, f) in enumerate(zip(self.columns, self._raw)):
+            f.close()
+            dtype = self._dtypes[i] or (_codes_dtype(len(self.categories[col])) if col in self.categories
+                                        else np.dtype(float))
+            raw = self._tmp / f"{i:03d}.raw"
+            dst = np.lib.format.open_memmap(self._tmp / f"{i:03d}.npy", mode="w+", dtype=dtype, shape=(self.rows,))
+            if self.rows:
+                dst[:] = np.memmap(raw, dtype=dtype, mode="r", shape=(self.rows,))
+            dst.flush()
+            del dst
+            raw.unlink()
+            if col in self.categories:
+                columns.append({"name": col, "kind": "category", "categories": self.categories[col]})
+            else:
+                columns.append({"name": col, "kind": "values", "dtype": str(dtype)})
+        source = csv_path(self.data_dir, self.name)
+        schema = {"rows": self.rows, "columns": columns, "csv": _fingerprint(source) if source.exists() else None}
+        (self._tmp / "schema.json").write_text(json.dumps(schema), encoding="utf-8")
+        return _publish(self._tmp, table_dir(self.data_dir, self.name))
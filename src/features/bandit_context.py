@@ -0,0 +1,66 @@
+from __future__ import annotations
+from typing import Sequence
+import numpy as np
+import pandas as pd
+
+# Bandit context layout (BANDIT_D = 10):
+#   bias, age/60, baseline/60, premium, push_opt_in, chrono_morning,
+#   goal_is_stress, goal_is_weight_loss | bucket_morning, day_of_week/6
+USER_DIM = 8
+CONTEXT_DIM = USER_DIM + 2
+
+
+def user_block(users: pd.DataFrame) -> np.ndarray:
+    """Per-user part of the bandit context, shape (n_users, USER_DIM)."""
+    n = len(users)
+    out = np.empty((n, USER_DIM), dtype=float)
+    out[:, 0] = 1.0
+    out[:, 1] = users["age"].to_numpy(dtype=float) / 60.0
+    out[:, 2] = users["baseline_activity_min_per_day"].to_numpy(dtype=float) / 60.0
+    out[:, 3] = users["premium"].astype(bool).to_numpy(dtype=float)
+    out[:, 4] = users["push_opt_in"].astype(bool).to_numpy(dtype=float)
+    out[:, 5] = (users["chronotype"].astype(str) == "morning").to_numpy(dtype=float)
+    goal = users["primary_goal"].astype(str)
+    out[:, 6] = (goal == "stress").to_numpy(dtype=float)
+    out[:, 7] = (goal == "weight_loss").to_numpy(dtype=float)
+    return out
+
+
+def user_row(profile: dict) -> np.ndarray:
+    """user_block for a single profile dict, without building a DataFrame (request path)."""
+    goal = str(profile["primary_goal"])
+    return np.array([1.0, float(profile["age"]) / 60.0, float(profile["baseline_activity_min_per_day"]) / 60.0,
+                     float(bool(profile["premium"])), float(bool(profile["push_opt_in"])),
+                     float(str(profile["chronotype"]) == "morning"), float(goal == "stress"),
+                     float(goal == "weight_loss")])
+
+
+def with_context(block: np.ndarray,
+                 day_of_week: int | Sequence[int] | np.ndarray,
+                 hour_bucket: str | Sequence[str] | np.ndarray) -> np.ndarray:
+    """Append (bucket_morning, day_of_week/6) to user blocks; scalars broadcast over rows."""
+    block = np.atleast_2d(block)
+    n = block.shape[0]
+    out = np.empty((n, CONTEXT_DIM), dtype=float)
+    out[:, :USER_DIM] = block
+    out[:, USER_DIM] = np.broadcast_to(np.asarray(hour_bucket) == "morning", (n,))
+    out[:, USER_DIM + 1] = np.broadcast_to(np.asarray(day_of_week, dtype=float) / 6.0, (n,))
+    return out
+
+
+def context_matrix(users: pd.DataFrame,
+                   day_of_week: int | Sequence[int] | np.ndarray,
+                   hour_bucket: str | Sequence[str] | np.ndarray) -> np.ndarray:
+    """Full bandit context rows for users (one row per user / interaction), shape (n, CONTEXT_DIM)."""
+    return with_context(user_block(users), day_of_week, hour_bucket)
+
+
+def fit_dim(X: np.ndarray, d: int) -> np.ndarray:
+    """Zero-pad or truncate context rows to the bandit dimension d."""
+    k = X.shape[-1]
+    if k == d:
+        return X
+    if k < d:
+        pad = [(0, 0)] * (X.ndim - 1) + [(0, d - k)]
+        return np.pad(X, pad)
+    return X[..., :d]
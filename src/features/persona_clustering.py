@@ -1,10 +1,14 @@
 from __future__ import annotations
+from collections import OrderedDict
 from pathlib import Path
+from typing import Sequence
+import threading
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
-from .preprocess import build_user_preprocessor, select_user_features
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from .preprocess import build_user_preprocessor, select_user_features, NUM, CAT
 
 def _ensure_finite(X):
     X = np.array(X, dtype=float, copy=True)
@@ -27,6 +31,95 @@ def assign_personas(df_users: pd.DataFrame, pre, kmeans) -> pd.DataFrame:
     out["persona"] = personas
     return out
 
+class PersonaAssigner:
+    """
+    Compiled nearest-centroid assignment: encodes profile dicts straight into the fitted
+    preprocessor's output space (no pandas) and takes the argmin over KMeans centers using
+    the same ||c||^2 - 2 x.c expansion as KMeans.predict. Memoized per user_id.
+    """
+    def __init__(self, pre, kmeans, memo_size: int = 100_000):
+        self._num: list[tuple[str, int, float, float]] = []       # (col, pos, mean, scale)
+        self._cat: list[tuple[str, dict]] = []                    # (col, {category: pos})
+        names = list(pre.feature_names_in_)
+        pos = 0
+        for _, trans, cols in pre.transformers_:
+            if isinstance(trans, str) and trans == "drop":
+                continue
+            cols = [names[c] if isinstance(c, (int, np.integer)) else c for c in np.atleast_1d(cols)]
+            step = trans.steps[-1][1] if hasattr(trans, "steps") and len(trans.steps) == 1 else trans
+            if isinstance(step, StandardScaler):
+                mean = step.mean_ if step.with_mean else np.zeros(len(cols))
+                scale = step.scale_ if step.with_std and step.scale_ is not None else np.ones(len(cols))
+                for i, c in enumerate(cols):
+                    self._num.append((c, pos, float(mean[i]), float(scale[i])))
+                    pos += 1
+            elif isinstance(step, OneHotEncoder) and step.drop_idx_ is None \
+                    and not getattr(step, "_infrequent_enabled", False):
+                for c, cats in zip(cols, step.categories_):
+                    self._cat.append((c, {v: pos + j for j, v in enumerate(cats.tolist())}))
+                    pos += len(cats)
+            else:
+                raise ValueError(f"cannot compile persona preprocessor step {type(step).__name__}")
+        self.n_features = pos
+        self.centers = np.asarray(kmeans.cluster_centers_, dtype=float)
+        self._centers_sq = (self.centers ** 2).sum(axis=1)
+        self.memo_size = int(memo_size)
+        self._memo: OrderedDict[str, tuple[tuple, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, profiles: Sequence[dict]) -> np.ndarray:
+        """Same values as _ensure_finite(pre.transform(select_user_features(df)))."""
+        X = np.zeros((len(profiles), self.n_features), dtype=float)
+        for i, p in enumerate(profiles):
+            for c, pos, mean, scale in self._num:
+                v = p.get(c)
+                v = 0.0 if v is None or pd.isna(v) else float(v)  # fillna(0)
+                X[i, pos] = (v - mean) / scale
+            for c, vocab in self._cat:
+                v = p.get(c)
+                if c in ("premium", "push_opt_in"):
+                    v = bool(v)
+                elif v is None or pd.isna(v):
+                    v = "unknown"
+                j = vocab.get(v)
+                if j is not None:  # unknown categories encode as all-zeros
+                    X[i, j] = 1.0
+        X[~np.isfinite(X)] = 0.0
+        return X
+
+    def predict(self, profiles: Sequence[dict]) -> np.ndarray:
+        X = self.encode(profiles)
+        dist = self._centers_sq[None, :] - 2.0 * (X @ self.centers.T)
+        return dist.argmin(axis=1)
+
+    def assign(self, profiles: Sequence[dict]) -> list[int]:
+        """Personas for profiles, reusing memoized results when a user_id's features are unchanged."""
+        out: list[int | None] = [None] * len(profiles)
+        todo, sigs = [], []
+        with self._lock:
+            for i, p in enumerate(profiles):
+                uid = p.get("user_id")
+                sig = tuple(p.get(c) for c in NUM + CAT)
+                hit = self._memo.get(uid) if uid is not None else None
+                if uid is not None and hit is not None and hit[0] == sig:
+                    self._memo.move_to_end(uid)
+                    out[i] = hit[1]
+                else:
+                    todo.append(i)
+                    sigs.append(sig)
+        if todo:
+            labels = self.predict([profiles[i] for i in todo])
+            with self._lock:
+                for i, sig, lab in zip(todo, sigs, labels):
+                    out[i] = int(lab)
+                    uid = profiles[i].get("user_id")
+                    if uid is not None and self.memo_size > 0:
+                        self._memo[uid] = (sig, int(lab))
+                        self._memo.move_to_end(uid)
+                        if len(self._memo) > self.memo_size:
+                            self._memo.popitem(last=False)
+        return out  # type: ignore[return-value]
+
 def save(pre, kmeans, encoder_path: Path, model_path: Path) -> None:
     encoder_path.parent.mkdir(parents=True, exist_ok=True)
     model_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1,49 +1,196 @@
 from __future__ import annotations
+from contextlib import nullcontext
+import os
 import numpy as np
 import joblib
 from pathlib import Path
 from typing import Sequence
+import uuid
+
+from .bandit_journal import log_dir_for, read_segments
+
+
+def trained_path_for(snapshot_path: Path) -> Path:
+    """Copy of the last offline-trained snapshot; the service's journal never writes it."""
+    path = Path(snapshot_path)
+    return path.with_name(f"{path.stem}.trained{path.suffix}")
+
 
 class LinTSBandit:
     """
     Contextual linear Thompson Sampling per arm.
     For each arm a: reward ~ x^T theta_a + noise, theta_a ~ N(mu, Sigma).
+    Per-arm statistics are stacked: A_stack (n_arms, d, d), b_stack (n_arms, d);
+    `A` / `b` are dicts of per-arm views into those stacks.
     """
+    EXACT_REFRESH_EVERY = 1_000  # rank-1 updates per arm between exact re-inversions (bounds round-off drift)
+
     def __init__(self, arms: Sequence[str], d: int, alpha: float = 0.5, seed: int = 42):
         self.rng = np.random.default_rng(seed)
         self.arms = list(arms)
+        self.arm_index = {a: i for i, a in enumerate(self.arms)}
         self.d = int(d)
         self.alpha = float(alpha)
+        k = len(self.arms)
         # A = (X^T X) + I, b = X^T y per arm
-        self.A = {a: np.eye(self.d) for a in self.arms}
-        self.b = {a: np.zeros(self.d) for a in self.arms}
+        self.A_stack = np.tile(np.eye(self.d), (k, 1, 1))
+        self.b_stack = np.zeros((k, self.d))
+        self.log_generation: int | None = None
+        self.trained_id: str | None = None  # id of the offline training run these statistics descend from
+        self.refresh_posterior()
+
+    @property
+    def A(self) -> dict[str, np.ndarray]:
+        return {a: self.A_stack[i] for i, a in enumerate(self.arms)}
+
+    @property
+    def b(self) -> dict[str, np.ndarray]:
+        return {a: self.b_stack[i] for i, a in enumerate(self.arms)}
+
+    # ---- posterior cache: A^-1 (Sherman-Morrison), mu = A^-1 b, chol(A^-1) (lazy) ----
+
+    def refresh_posterior(self, arm: str | None = None):
+        """Recompute cached posterior from A, b exactly (after load / bulk edits of A, b)."""
+        if arm is None:
+            A_inv = np.linalg.inv(self.A_stack)
+            self._A_inv = 0.5 * (A_inv + np.swapaxes(A_inv, 1, 2))
+            self._mu = np.einsum("kij,kj->ki", self._A_inv, self.b_stack)
+            self._L = np.zeros_like(self._A_inv)
+            self._L_dirty = np.ones(len(self.arms), dtype=bool)
+            self._rank1 = np.zeros(len(self.arms), dtype=np.int64)
+            return
+        i = self.arm_index[arm]
+        A_inv = np.linalg.inv(self.A_stack[i])
+        self._A_inv[i] = 0.5 * (A_inv + A_inv.T)
+        self._mu[i] = self._A_inv[i] @ self.b_stack[i]
+        self._L_dirty[i] = True
+        self._rank1[i] = 0
+
+    def _chol(self) -> np.ndarray:
+        """Stacked Cholesky factors of A^-1, refreshing only arms updated since the last call."""
+        dirty = np.flatnonzero(self._L_dirty)
+        if dirty.size:
+            try:
+                self._L[dirty] = np.linalg.cholesky(self._A_inv[dirty])
+            except np.linalg.LinAlgError:
+                # accumulated rank-1 round-off; rebuild from A
+                for i in dirty:
+                    self.refresh_posterior(self.arms[i])
+                self._L[dirty] = np.linalg.cholesky(self._A_inv[dirty])
+            self._L_dirty[dirty] = False
+        return self._L
+
+    def _sample_thetas(self, n: int) -> np.ndarray:
+        # theta = mu + alpha * L z with L L^T = A^-1, z ~ N(0, I); shape (n, n_arms, d)
+        Z = self.rng.standard_normal((n, len(self.arms), self.d))
+        return self._mu[None] + self.alpha * np.einsum("kij,nkj->nki", self._chol(), Z)
 
     def _sample_theta(self, arm: str):
-        A_inv = np.linalg.inv(self.A[arm])
-        mu = A_inv @ self.b[arm]
-        cov = (self.alpha ** 2) * A_inv
-        return self.rng.multivariate_normal(mu, cov, check_valid="ignore")
+        return self._sample_thetas(1)[0, self.arm_index[arm]]
+
+    def choose_batch(self, X: np.ndarray) -> list[str]:
+        """Choose an arm for each row of X (n_contexts, d), with an independent posterior draw per row."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        scores = np.einsum("nkd,nd->nk", self._sample_thetas(X.shape[0]), X)
+        return [self.arms[i] for i in scores.argmax(axis=1)]
 
     def choose(self, x: np.ndarray) -> str:
-        scores = []
-        for a in self.arms:
-            theta = self._sample_theta(a)
-            scores.append((a, float(x @ theta)))
-        scores.sort(key=lambda t: t[1], reverse=True)
-        return scores[0][0]
+        return self.choose_batch(x)[0]
+
+    def choose_mean_batch(self, X: np.ndarray) -> list[str]:
+        """
+        Arm with the best posterior-mean reward for each row of X: no draw, no cache refresh,
+        so it needs no lock (a concurrent update shows up at most one call late).
+        """
+        mu = self._mu  # refresh_posterior rebinds it; hold one array for the whole call
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        return [self.arms[i] for i in (X @ mu.T).argmax(axis=1)]
 
     def update(self, arm: str, reward: float, x: np.ndarray):
-        Ax = np.outer(x, x)
-        self.A[arm] += Ax
-        self.b[arm] += reward * x
+        i = self.arm_index[arm]
+        x = np.asarray(x, dtype=float)
+        self.A_stack[i] += np.outer(x, x)
+        self.b_stack[i] += reward * x
+        # Sherman-Morrison: (A + x x^T)^-1 = A^-1 - (A^-1 x)(A^-1 x)^T / (1 + x^T A^-1 x)
+        A_inv = self._A_inv[i]
+        v = A_inv @ x
+        denom = 1.0 + x @ v
+        self._rank1[i] += 1
+        if self._rank1[i] >= self.EXACT_REFRESH_EVERY or not denom > 0.0:
+            # periodically, or once round-off has cost A^-1 its positive definiteness: invert A exactly
+            self.refresh_posterior(arm)
+            return
+        A_inv -= np.outer(v, v) / denom
+        self._mu[i] = A_inv @ self.b_stack[i]
+        self._L_dirty[i] = True
 
-    def save(self, path: Path):
+    def update_batch(self, arms: Sequence[str] | np.ndarray, rewards: Sequence[float] | np.ndarray, X: np.ndarray):
+        """Bulk update from logged interactions: A += X_a^T X_a, b += X_a^T y_a with one product per arm."""
+        arms = np.asarray(arms).astype(str)
+        rewards = np.asarray(rewards, dtype=float)
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        unknown = set(np.unique(arms)) - set(self.arms)
+        if unknown:
+            raise KeyError(f"Unknown arms: {sorted(unknown)}")
+        for i, a in enumerate(self.arms):
+            mask = arms == a
+            if not mask.any():
+                continue
+            Xa = X[mask]
+            self.A_stack[i] += Xa.T @ Xa
+            self.b_stack[i] += Xa.T @ rewards[mask]
+            self.refresh_posterior(a)
+
+    def exclusive(self):
+        """Context for a consistent read-modify-write of A, b (in-process callers hold their own lock)."""
+        return nullcontext()
+
+    def snapshot_lock(self):
+        """Held while a snapshot of this bandit is taken and written (see SharedLinTSBandit)."""
+        return nullcontext()
+
+    def add_stats(self, dA: np.ndarray, db: np.ndarray):
+        """A += dA, b += db for every arm, e.g. statistics merged from other replicas."""
+        self.A_stack += dA
+        self.b_stack += db
+        self.refresh_posterior()
+
+    def state_dict(self) -> dict:
+        """Copy of the sufficient statistics (safe to serialize while updates continue)."""
+        return {"arms": list(self.arms), "A": {a: m.copy() for a, m in self.A.items()},
+                "b": {a: v.copy() for a, v in self.b.items()}, "d": self.d, "alpha": self.alpha,
+                "trained_id": self.trained_id}
+
+    @staticmethod
+    def write_snapshot(state: dict, path: Path, log_generation: int | None = None):
+        """Atomically replace the snapshot at `path` (write to a temp file, then rename)."""
+        path = Path(path)
         path.parent.mkdir(parents=True, exist_ok=True)
-        joblib.dump({"arms": self.arms, "A": self.A, "b": self.b, "d": self.d, "alpha": self.alpha}, path)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")  # workers may write the same snapshot
+        joblib.dump({**state, "log_generation": log_generation}, tmp)
+        os.replace(tmp, path)
+
+    def save(self, path: Path):
+        """
+        Save an offline-trained bandit: stamped with a new trained_id and also written to
+        trained_path_for(path), which the service's checkpoints (to `path`) never overwrite.
+        """
+        self.trained_id = uuid.uuid4().hex
+        state = self.state_dict()
+        self.write_snapshot(state, trained_path_for(path))
+        self.write_snapshot(state, path)
 
     @classmethod
-    def load(cls, path: Path):
+    def load(cls, path: Path, replay_log: bool = True):
+        """Restore a snapshot; if it was written by a BanditJournal, replay the feedback log tail."""
         obj = joblib.load(path)
         inst = cls(obj["arms"], obj["d"], alpha=obj["alpha"])
-        inst.A, inst.b = obj["A"], obj["b"]
+        for i, a in enumerate(inst.arms):
+            inst.A_stack[i], inst.b_stack[i] = obj["A"][a], obj["b"][a]
+        inst.refresh_posterior()
+        inst.log_generation = obj.get("log_generation")
+        inst.trained_id = obj.get("trained_id")
+        if replay_log and inst.log_generation is not None:
+            for arm_idx, reward, x in read_segments(log_dir_for(path), inst.d, inst.log_generation):
+                inst.update(inst.arms[arm_idx], reward, x)
         return inst
@@ -0,0 +1,153 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Iterator
+import logging
+import os
+import threading
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .bandit import LinTSBandit
+
+logger = logging.getLogger(__name__)
+
+# Append-only feedback log next to the bandit snapshot:
+#   <snapshot>.log/00000001.seg, 00000002.seg, ...
+# Each record is float64[d + 2] = [arm_index, reward, x_0 .. x_{d-1}].
+# A snapshot stamped with log_generation=g already contains every segment < g;
+# segments >= g are the tail that must be replayed on load.
+
+
+def log_dir_for(snapshot_path: Path) -> Path:
+    return Path(snapshot_path).with_suffix(".log")
+
+
+def _segment_path(log_dir: Path, gen: int) -> Path:
+    return Path(log_dir) / f"{gen:08d}.seg"
+
+
+def list_segments(log_dir: Path) -> list[int]:
+    log_dir = Path(log_dir)
+    if not log_dir.exists():
+        return []
+    return sorted(int(p.stem) for p in log_dir.glob("*.seg") if p.stem.isdigit())
+
+
+def read_segments(log_dir: Path, d: int, from_generation: int) -> Iterator[tuple[int, float, np.ndarray]]:
+    """Yield (arm_index, reward, x) for every complete record in segments >= from_generation."""
+    width = d + 2
+    for gen in list_segments(log_dir):
+        if gen < from_generation:
+            continue
+        raw = np.fromfile(_segment_path(log_dir, gen), dtype=np.float64)
+        n = raw.size // width  # a torn trailing record (crash mid-write) is dropped
+        for rec in raw[: n * width].reshape(n, width):
+            yield int(rec[0]), float(rec[1]), rec[2:]
+
+
+class BanditJournal:
+    """
+    Write-behind persistence for LinTSBandit.
+    `record` updates the bandit and appends the event to the log (a few dozen bytes);
+    full snapshots are written by a background thread every `checkpoint_every` events
+    or `checkpoint_interval_s` seconds, whichever comes first.
+    With log=False no per-event log is kept (for bandits whose state is already durable,
+    e.g. SharedLinTSBandit); only the periodic snapshots are written.
+    """
+    def __init__(self, bandit: "LinTSBandit", snapshot_path: Path,
+                 checkpoint_every: int = 500, checkpoint_interval_s: float = 30.0,
+                 fsync: bool = False, lock: threading.Lock | threading.RLock | None = None, log: bool = True):
+        self.bandit = bandit
+        self.snapshot_path = Path(snapshot_path)
+        self.log_dir = log_dir_for(self.snapshot_path)
+        self.checkpoint_every = int(checkpoint_every)
+        self.checkpoint_interval_s = float(checkpoint_interval_s)
+        self.fsync = bool(fsync)
+        self.log = bool(log)
+        self.lock: threading.Lock | threading.RLock = lock or threading.Lock()
+        self._arm_index = {a: i for i, a in enumerate(bandit.arms)}
+        self._generation = 0
+        self._pending = 0
+        self._fh: IO[bytes] | None = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._io_lock = threading.Lock()  # serializes snapshot writes
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self) -> "BanditJournal":
+        """Compact whatever was replayed into a fresh snapshot, then start the checkpoint thread."""
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        known = list_segments(self.log_dir) + [getattr(self.bandit, "log_generation", None) or 0]
+        self._generation = max(known)
+        self.checkpoint()
+        self._thread = threading.Thread(target=self._run, name="bandit-checkpoint", daemon=True)
+        self._thread.start()
+        return self
+
+    def record(self, arm: str, reward: float, x: np.ndarray) -> None:
+        rec = np.empty(self.bandit.d + 2, dtype=np.float64)
+        rec[0] = self._arm_index[arm]
+        rec[1] = reward
+        rec[2:] = x
+        with self.lock:
+            self.bandit.update(arm, reward, x)
+            if self.log:
+                assert self._fh is not None, "start() opens the log"
+                self._fh.write(rec.tobytes())
+                self._fh.flush()
+                if self.fsync:
+                    os.fsync(self._fh.fileno())
+            self._pending += 1
+            if self._pending >= self.checkpoint_every:
+                self._wake.set()
+
+    def checkpoint(self) -> None:
+        """Snapshot the bandit and rotate the log; segments folded into the snapshot are removed."""
+        with self._io_lock, self.bandit.snapshot_lock():
+            with self.lock:
+                state = self.bandit.state_dict()
+                self._generation += 1
+                if self._fh is not None:
+                    self._fh.close()
+                if self.log:
+                    self._fh = open(_segment_path(self.log_dir, self._generation), "ab")
+                self._pending = 0
+                gen = self._generation
+            self.bandit.write_snapshot(state, self.snapshot_path, log_generation=gen)
+            for old in list_segments(self.log_dir):
+                if old < gen:
+                    _segment_path(self.log_dir, old).unlink(missing_ok=True)
+
+    def stop(self) -> None:
+        """Stop the background checkpoint thread; `record` keeps working until `close`."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self, checkpoint: bool = True) -> None:
+        self.stop()
+        if checkpoint and self._pending:
+            self.checkpoint()
+        with self.lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.checkpoint_interval_s)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self._pending:
+                try:
+                    self.checkpoint()
+                except Exception:  # keep checkpointing; the events are still in the log
+                    logger.exception("bandit checkpoint to %s failed", self.snapshot_path)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import ContextManager
+import json
+import os
+import re
+import threading
+
+import joblib
+import numpy as np
+
+from .bandit import LinTSBandit
+
+# A and b are additive: every replica ships what it learned since its last sync as a delta
+# (A - base_A, b - base_b), a merge step sums deltas into one global model, and replicas
+# rebase onto the new global while keeping their not-yet-exported updates.
+#   <sync_dir>/deltas/<replica>-<seq:08d>.npz   dA (k,d,d), db (k,d), arms, replica, seq
+#   <sync_dir>/replicas/<replica>.base.npz      base_A, base_b, seq, global_version
+#   <sync_dir>/global.joblib                    arms, d, alpha, A, b, applied {replica: seq}, version
+
+_DELTA_RE = re.compile(r"^(?P<replica>.+)-(?P<seq>\d{8})\.npz$")
+
+
+def _atomic_save_npz(path: Path, **arrays) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def global_path(sync_dir: Path) -> Path:
+    return Path(sync_dir) / "global.joblib"
+
+
+def load_global(sync_dir: Path) -> dict | None:
+    path = global_path(sync_dir)
+    return joblib.load(path) if path.exists() else None
+
+
+def init_global(sync_dir: Path, bandit: LinTSBandit) -> dict:
+    """Seed the global model (e.g. from the trained snapshot) if there is none yet."""
+    state = load_global(sync_dir)
+    if state is None:
+        state = {**bandit.state_dict(), "applied": {}, "version": 0}
+        _write_global(sync_dir, state)
+    return state
+
+
+def _write_global(sync_dir: Path, state: dict) -> None:
+    path = global_path(sync_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(state, tmp)
+    os.replace(tmp, path)
+
+
+def merge_deltas(sync_dir: Path) -> dict:
+    """
+    Fold every pending replica delta into the global model and publish it. Deltas are applied
+    per replica in sequence order; already-applied sequence numbers are skipped (safe to rerun),
+    and gaps (a lost delta) are reported. Returns a summary.
+    """
+    sync_dir = Path(sync_dir)
+    state = load_global(sync_dir)
+    if state is None:
+        raise FileNotFoundError(f"no global bandit model in {sync_dir}; seed it with init_global")
+    arms, d = list(state["arms"]), int(state["d"])
+    A = np.stack([np.asarray(state["A"][a], dtype=float) for a in arms])
+    b = np.stack([np.asarray(state["b"][a], dtype=float) for a in arms])
+    applied: dict[str, int] = dict(state.get("applied", {}))
+
+    pending: list[tuple[str, int, Path]] = []
+    for p in sorted((sync_dir / "deltas").glob("*.npz")):
+        m = _DELTA_RE.match(p.name)
+        if m:
+            pending.append((m["replica"], int(m["seq"]), p))
+    pending.sort(key=lambda t: (t[0], t[1]))
+
+    merged, gaps, done = 0, [], []
+    for replica, seq, path in pending:
+        last = applied.get(replica, 0)
+        if seq <= last:
+            done.append(path)
+            continue
+        with np.load(path) as z:
+            if json.loads(str(z["arms"])) != arms or z["db"].shape != (len(arms), d):
+                raise ValueError(f"{path.name}: arms/dimension do not match the global model")
+            A += z["dA"]
+            b += z["db"]
+        if seq != last + 1:
+            gaps.append({"replica": replica, "expected": last + 1, "got": seq})
+        applied[replica] = seq
+        merged += 1
+        done.append(path)
+
+    if merged:
+        state = {**state, "A": {a: A[i] for i, a in enumerate(arms)}, "b": {a: b[i] for i, a in enumerate(arms)},
+                 "applied": applied, "version": int(state.get("version", 0)) + 1}
+        _write_global(sync_dir, state)
+    for path in done:
+        path.unlink(missing_ok=True)
+    return {"merged": merged, "gaps": gaps, "version": int(state.get("version", 0)), "applied": applied}
+
+
+class ReplicaSync:
+    """
+    Export/rebase side of one replica. `push` writes the statistics gathered since the last
+    push as a numbered delta; `pull` rebases the live bandit onto a newer global model.
+    Both run under `lock` (the service's bandit lock) and the bandit's own `exclusive()`.
+    """
+    def __init__(self, bandit: LinTSBandit, replica_id: str, sync_dir: Path,
+                 lock: ContextManager | None = None):
+        if not re.fullmatch(r"[A-Za-z0-9_.]+", replica_id):
+            raise ValueError(f"replica id must be [A-Za-z0-9_.]+, got {replica_id!r}")
+        self.bandit = bandit
+        self.replica_id = replica_id
+        self.sync_dir = Path(sync_dir)
+        self.lock = lock if lock is not None else threading.Lock()
+        self._base_path = self.sync_dir / "replicas" / f"{replica_id}.base.npz"
+        with self.lock, bandit.exclusive():
+            if self._base_path.exists():
+                with np.load(self._base_path) as z:
+                    self.base_A, self.base_b = z["base_A"], z["base_b"]
+                    self.seq, self.global_version = int(z["seq"]), int(z["global_version"])
+            else:
+                # first start: whatever the bandit holds is treated as already synced
+                self.base_A, self.base_b = np.array(bandit.A_stack), np.array(bandit.b_stack)
+                self.seq, self.global_version = 0, -1
+
+    def _save_base(self) -> None:
+        _atomic_save_npz(self._base_path, base_A=self.base_A, base_b=self.base_b,
+                         seq=self.seq, global_version=self.global_version)
+
+    def push(self) -> int | None:
+        """Write A - base_A, b - base_b as the next delta; returns its sequence number (None if empty)."""
+        with self.lock, self.bandit.exclusive():
+            A, b = np.array(self.bandit.A_stack), np.array(self.bandit.b_stack)
+            dA, db = A - self.base_A, b - self.base_b
+            if not dA.any() and not db.any():
+                return None
+            seq = self.seq + 1
+            _atomic_save_npz(self.sync_dir / "deltas" / f"{self.replica_id}-{seq:08d}.npz",
+                             dA=dA, db=db, arms=json.dumps(list(self.bandit.arms)),
+                             replica=self.replica_id, seq=seq)
+            self.base_A, self.base_b, self.seq = A, b, seq
+            self._save_base()
+            return seq
+
+    def pull(self) -> bool:
+        """Rebase onto the global model if it is newer: A <- G + (A - base_A), base <- G."""
+        state = load_global(self.sync_dir)
+        if state is None or int(state.get("version", 0)) <= self.global_version:
+            return False
+        if list(state["arms"]) != list(self.bandit.arms) or int(state["d"]) != self.bandit.d:
+            raise ValueError("global model arms/dimension do not match this replica")
+        G_A = np.stack([np.asarray(state["A"][a], dtype=float) for a in self.bandit.arms])
+        G_b = np.stack([np.asarray(state["b"][a], dtype=float) for a in self.bandit.arms])
+        with self.lock, self.bandit.exclusive():
+            self.bandit.add_stats(G_A - self.base_A, G_b - self.base_b)
+            self.base_A, self.base_b = G_A, G_b
+            self.global_version = int(state["version"])
+            self._save_base()
+        return True
+
+    def sync(self) -> dict:
+        seq = self.push()
+        return {"replica": self.replica_id, "pushed_seq": seq, "pulled": self.pull(),
+                "global_version": self.global_version}
@@ -0,0 +1,291 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Mapping, Sequence
+import json
+import time
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .ltr import LTRModel
+
+# Pure-NumPy scoring engine compiled from the fitted sklearn Pipeline in ltr_model.joblib.
+# Nothing here imports pandas / sklearn / xgboost at module level: `from_pipeline` (the
+# export step, see scripts/export_ltr.py) is the only place that touches the fitted objects.
+# Inputs are any column mapping (dict of arrays or a DataFrame).
+
+CONTENT_COLS = ["duration_min", "popularity", "type", "intensity", "difficulty", "goal_tag"]
+
+
+def artifact_fingerprint(path: Path) -> str:
+    """Size + mtime of the joblib a compiled scorer was exported from (detects stale exports)."""
+    st = Path(path).stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _cat_key(v: Any) -> str:
+    # vocabularies are stored as strings; bool categories (premium, push_opt_in) map to "True"/"False"
+    return str(bool(v)) if isinstance(v, (bool, np.bool_)) else str(v)
+
+
+class CompiledLTR:
+    """
+    Flattened preprocessor (scaler means/scales, one-hot vocabularies) plus either logistic
+    weights or XGBoost tree arrays. Same interface as LTRModel for the serving path.
+    NumPy tree traversal wins on small calls only; with `native` (the LTRModel it was exported
+    from) attached, xgboost calls of NATIVE_MIN_ROWS rows or more are scored by the booster.
+    """
+    NATIVE_MIN_ROWS = 1_024  # measured crossover, default model (200 trees, depth 5): ~1.5k rows
+    TRAVERSE_CHUNK = 1 << 16  # (row, tree) pairs per traversal step: bounds the node matrix
+
+    def __init__(self, arrays: Mapping[str, np.ndarray]):
+        self.arrays = {k: np.asarray(v) for k, v in arrays.items()}
+        a = self.arrays
+        self.kind = str(a["kind"])
+        self.n_features = int(a["n_features"])
+        self.source = str(a["source"])
+        self.num_cols = [str(c) for c in a["num_cols"]]
+        self.num_pos = a["num_pos"].astype(np.int64)
+        self.num_mean = a["num_mean"].astype(np.float64)
+        self.num_scale = a["num_scale"].astype(np.float64)
+        self.cat_cols = [str(c) for c in a["cat_cols"]]
+        vocab = [str(v) for v in a["cat_vocab"]]
+        bounds = a["cat_offsets"].astype(np.int64)
+        start = a["cat_pos"].astype(np.int64)
+        # column -> {category: output position}
+        self._vocab = [
+            {vocab[j]: int(start[i] + j - bounds[i]) for j in range(bounds[i], bounds[i + 1])}
+            for i in range(len(self.cat_cols))
+        ]
+        if self.kind == "xgboost":
+            self._left = a["tree_left"].astype(np.int64)
+            self._right = a["tree_right"].astype(np.int64)
+            self._feat = a["tree_feature"].astype(np.int64)
+            self._thr = a["tree_threshold"].astype(np.float32)
+            self._default_left = a["tree_default_left"].astype(bool)
+            # child of node i is _child[2 * i + went_left]
+            self._child = np.stack([self._right, self._left], axis=1).ravel()
+            self._value = a["tree_value"].astype(np.float32)
+            self._roots = a["tree_roots"].astype(np.int64)
+            self._depth = int(a["tree_depth"])
+            self._base_margin = np.float32(a["base_margin"])
+            self._missing_zero = bool(a["missing_zero"])
+        else:
+            self._coef = a["coef"].astype(np.float64)
+            self._intercept = float(a["intercept"])
+        self.catalog: Mapping[str, np.ndarray] | None = None
+        self._content_X: np.ndarray | None = None
+        self._user_mask: np.ndarray | None = None
+        self.native: LTRModel | None = None  # scores large xgboost batches (see load_ltr)
+
+    # ---------------- export / persistence ----------------
+
+    @classmethod
+    def from_pipeline(cls, pipe, source: str = "") -> "CompiledLTR":
+        """Compile Pipeline([("pre", ColumnTransformer), ("clf", LogisticRegression | XGBClassifier)])."""
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        ct, clf = pipe[0], pipe[-1]
+        if len(pipe) != 2 or not hasattr(ct, "transformers_"):
+            raise ValueError("expected Pipeline([ColumnTransformer, classifier])")
+        names = list(ct.feature_names_in_)
+        num_cols, num_pos, num_mean, num_scale = [], [], [], []
+        cat_cols: list[str] = []
+        cat_vocab: list[str] = []
+        cat_offsets, cat_pos = [0], []
+        pos = 0
+        for _, trans, cols in ct.transformers_:
+            if isinstance(trans, str) and trans == "drop":
+                continue
+            cols = [names[c] if isinstance(c, (int, np.integer)) else str(c) for c in np.atleast_1d(cols)]
+            step = trans
+            if hasattr(trans, "steps"):
+                if len(trans.steps) != 1:
+                    raise ValueError("only single-step column pipelines can be compiled")
+                step = trans.steps[0][1]
+            if isinstance(step, str) and step == "passthrough":
+                for c in cols:
+                    num_cols.append(c); num_pos.append(pos); num_mean.append(0.0); num_scale.append(1.0)
+                    pos += 1
+            elif isinstance(step, StandardScaler):
+                mean = step.mean_ if step.with_mean else np.zeros(len(cols))
+                scale = step.scale_ if step.with_std and step.scale_ is not None else np.ones(len(cols))
+                for i, c in enumerate(cols):
+                    num_cols.append(c); num_pos.append(pos); num_mean.append(float(mean[i])); num_scale.append(float(scale[i]))
+                    pos += 1
+            elif isinstance(step, OneHotEncoder):
+                if step.drop_idx_ is not None or getattr(step, "_infrequent_enabled", False):
+                    raise ValueError("OneHotEncoder with drop / infrequent categories is not supported")
+                for c, cats in zip(cols, step.categories_):
+                    cat_cols.append(c); cat_pos.append(pos)
+                    cat_vocab.extend(_cat_key(v) for v in cats)
+                    cat_offsets.append(len(cat_vocab))
+                    pos += len(cats)
+            else:
+                raise ValueError(f"unsupported transformer: {type(step).__name__}")
+
+        arrays: dict[str, Any] = dict(
+            n_features=pos, source=source,
+            num_cols=np.array(num_cols, dtype=str), num_pos=np.array(num_pos, dtype=np.int64),
+            num_mean=np.array(num_mean), num_scale=np.array(num_scale),
+            cat_cols=np.array(cat_cols, dtype=str), cat_vocab=np.array(cat_vocab, dtype=str),
+            cat_offsets=np.array(cat_offsets, dtype=np.int64), cat_pos=np.array(cat_pos, dtype=np.int64),
+        )
+        if hasattr(clf, "get_booster"):
+            arrays.update(kind="xgboost", missing_zero=bool(ct.sparse_output_), **_flatten_xgb(clf.get_booster()))
+        elif hasattr(clf, "coef_") and clf.coef_.shape[0] == 1:
+            arrays.update(kind="logreg", coef=clf.coef_[0].astype(np.float64), intercept=float(clf.intercept_[0]))
+        else:
+            raise ValueError(f"unsupported classifier: {type(clf).__name__}")
+        return cls(arrays)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, **self.arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "CompiledLTR":
+        with np.load(Path(path), allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    # ---------------- encoding ----------------
+
+    def _encode(self, cols: Mapping[str, Any], n: int, only: Sequence[str] | None = None) -> np.ndarray:
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+        for c, p, m, s in zip(self.num_cols, self.num_pos, self.num_mean, self.num_scale):
+            if only is None or c in only:
+                X[:, p] = (np.asarray(cols[c], dtype=np.float64) - m) / s
+        rows = np.arange(n)
+        for c, vocab in zip(self.cat_cols, self._vocab):
+            if only is not None and c not in only:
+                continue
+            idx = np.array([vocab.get(_cat_key(v), -1) for v in np.asarray(cols[c], dtype=object)], dtype=np.int64)
+            hit = idx >= 0  # unknown categories encode as all-zeros (handle_unknown="ignore")
+            X[rows[hit], idx[hit]] = 1.0
+        return X
+
+    # ---------------- scoring ----------------
+
+    def _score(self, X: np.ndarray) -> np.ndarray:
+        if self.kind == "logreg":
+            return _sigmoid(X @ self._coef + self._intercept)
+        flat = np.ascontiguousarray(X, dtype=np.float32).ravel()
+        n, T = X.shape[0], self._roots.size
+        margin = np.empty(n, dtype=np.float32)
+        step = max(1, self.TRAVERSE_CHUNK // T)
+        # all trees for a chunk of rows at a time: the (rows, trees) node matrix stays cache-sized
+        for start in range(0, n, step):
+            stop = min(n, start + step)
+            base = np.arange(start, stop)[:, None] * self.n_features
+            node = np.broadcast_to(self._roots, (stop - start, T)).copy()
+            for _ in range(self._depth):
+                v = flat[base + self._feat[node]]
+                missing = np.isnan(v)
+                if self._missing_zero:
+                    missing |= v == 0
+                go_left = np.where(missing, self._default_left[node], v < self._thr[node])
+                node = self._child[2 * node + go_left]
+            margin[start:stop] = self._value[node].sum(axis=1, dtype=np.float32)
+        return _sigmoid((margin + self._base_margin).astype(np.float64))
+
+    def predict_proba(self, X: Mapping[str, Any]) -> np.ndarray:
+        """P(reward) for rows given as columns (ALL feature columns present)."""
+        n = len(X[self.num_cols[0]] if self.num_cols else X[self.cat_cols[0]])
+        return self._score(self._encode(X, n))
+
+    def prepare_catalog(self, content: Mapping[str, Any]) -> None:
+        """Encode the content side of the catalog once; per request only user columns are encoded."""
+        if self.native is not None:
+            self.native.prepare_catalog(content)
+        n = len(content["content_id"])
+        cols = {c: np.asarray(content[c]) for c in CONTENT_COLS if c in content}
+        if "popularity" not in cols:
+            cols["popularity"] = np.zeros(n)
+        self.catalog = cols
+        self._content_X = self._encode(cols, n, only=CONTENT_COLS)
+        owner = np.zeros(self.n_features, dtype=bool)
+        for c, p in zip(self.num_cols, self.num_pos):
+            owner[p] = c not in CONTENT_COLS
+        for c, vocab in zip(self.cat_cols, self._vocab):
+            owner[list(vocab.values())] = c not in CONTENT_COLS
+        self._user_mask = owner
+
+    def predict_catalog(self, pools: Sequence[np.ndarray], users: Mapping[str, Any],
+                        day_of_week: Sequence[int], hour_bucket: Sequence[str],
+                        personas: Sequence[int], timings: dict | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Same contract as LTRModel.predict_catalog."""
+        if self.native is not None and sum(len(rows) for rows in pools) >= self.NATIVE_MIN_ROWS:
+            return self.native.predict_catalog(pools, users, day_of_week, hour_bucket, personas, timings)
+        assert self._content_X is not None and self._user_mask is not None, "call prepare_catalog first"
+        t0 = time.perf_counter()
+        m = len(pools)
+        ucols = {
+            "age": np.asarray(users["age"]),
+            "baseline_activity_min_per_day": np.asarray(users["baseline_activity_min_per_day"]),
+            "premium": np.asarray(users["premium"], dtype=bool),
+            "push_opt_in": np.asarray(users["push_opt_in"], dtype=bool),
+            "chronotype": np.asarray(users["chronotype"]),
+            "primary_goal": np.asarray(users["primary_goal"]),
+            "day_of_week": np.asarray(day_of_week),
+            "hour_bucket": np.asarray(hour_bucket),
+            "persona": np.array([str(p) for p in personas]),
+        }
+        U = self._encode(ucols, m, only=list(ucols))[:, self._user_mask]
+        sizes = np.array([len(rows) for rows in pools], dtype=int)
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        X = self._content_X[np.concatenate(pools).astype(int)]
+        X[:, self._user_mask] = np.repeat(U, sizes, axis=0)
+        t1 = time.perf_counter()
+        scores = self._score(X)
+        if timings is not None:
+            timings["feature_build"] = t1 - t0
+            timings["ltr_predict"] = time.perf_counter() - t1
+        return scores, offsets
+
+
+def _flatten_xgb(booster) -> dict[str, Any]:
+    """Concatenate every tree of a binary:logistic booster into flat node arrays."""
+    model = json.loads(booster.save_raw("json"))["learner"]
+    if model["objective"]["name"] != "binary:logistic":
+        raise ValueError("only binary:logistic boosters are supported")
+    gb = model["gradient_booster"]
+    if gb.get("name") != "gbtree":
+        raise ValueError("only gbtree boosters are supported")
+    left, right, feat, thr, dleft, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    off = 0
+    for tree in gb["model"]["trees"]:
+        lc = np.asarray(tree["left_children"], dtype=np.int64)
+        rc = np.asarray(tree["right_children"], dtype=np.int64)
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        leaf = lc == -1
+        idx = np.arange(lc.size)
+        # leaves point to themselves so fixed-depth traversal is a no-op once a leaf is reached
+        left.append(np.where(leaf, idx, lc) + off)
+        right.append(np.where(leaf, idx, rc) + off)
+        feat.append(np.where(leaf, 0, np.asarray(tree["split_indices"], dtype=np.int64)))
+        thr.append(np.where(leaf, 0.0, cond).astype(np.float32))
+        dleft.append(np.asarray(tree["default_left"], dtype=bool))
+        value.append(np.where(leaf, cond, 0.0).astype(np.float32))
+        roots.append(off)
+        # depth of this tree
+        d = np.zeros(lc.size, dtype=np.int64)
+        for i in range(lc.size):
+            if not leaf[i]:
+                d[lc[i]] = d[rc[i]] = d[i] + 1
+        depth = max(depth, int(d.max()))
+        off += lc.size
+    base = float(str(model["learner_model_param"]["base_score"]).strip("[]"))
+    return dict(
+        tree_left=np.concatenate(left), tree_right=np.concatenate(right),
+        tree_feature=np.concatenate(feat), tree_threshold=np.concatenate(thr),
+        tree_default_left=np.concatenate(dleft), tree_value=np.concatenate(value),
+        tree_roots=np.array(roots, dtype=np.int64), tree_depth=depth,
+        base_margin=np.float32(np.log(base / (1.0 - base))),
+    )
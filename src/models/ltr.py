@@ -1,7 +1,12 @@
 from __future__ import annotations
 from pathlib import Path
+from typing import Sequence
+import time
 import joblib
+import numpy as np
 import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 # Keep feature names centralized (must match training script)
 NUM = ["age", "baseline_activity_min_per_day", "duration_min", "day_of_week", "popularity"]
@@ -9,16 +14,122 @@ CAT = ["premium", "push_opt_in", "chronotype", "primary_goal", "type",
        "intensity", "difficulty", "goal_tag", "hour_bucket", "persona"]
 ALL = NUM + CAT
 
+# Columns owned by the content catalog vs. the user/context side of a request
+CONTENT_COLS = ["duration_min", "popularity", "type", "intensity", "difficulty", "goal_tag"]
+USER_COLS = [c for c in ALL if c not in CONTENT_COLS]
+
+def _output_sources(ct) -> list[str] | None:
+    """
+    Input column feeding each output column of a fitted ColumnTransformer, or None if some
+    transformer mixes columns (then the block split below is not valid).
+    """
+    names = list(getattr(ct, "feature_names_in_", []))
+    out: list[str] = []
+    for _, trans, cols in ct.transformers_:
+        if isinstance(trans, str) and trans == "drop":
+            continue
+        cols = [names[c] if isinstance(c, (int, np.integer)) else c for c in np.atleast_1d(cols)]
+        steps = [trans] if isinstance(trans, str) else [s for _, s in getattr(trans, "steps", [("", trans)])]
+        widths = [1] * len(cols)
+        for step in steps:
+            if isinstance(step, str) and step == "passthrough":
+                continue
+            if isinstance(step, StandardScaler):
+                continue
+            if isinstance(step, OneHotEncoder) and widths == [1] * len(cols) \
+                    and not getattr(step, "_infrequent_enabled", False):
+                drop = getattr(step, "drop_idx_", None)
+                widths = [len(c) - (0 if drop is None or drop[i] is None else 1)
+                          for i, c in enumerate(step.categories_)]
+                continue
+            return None
+        for col, w in zip(cols, widths):
+            out.extend([col] * w)
+    return out
+
+def _record(timings: dict | None, t0: float, t1: float) -> None:
+    if timings is not None:
+        timings["feature_build"] = t1 - t0
+        timings["ltr_predict"] = time.perf_counter() - t1
+
+def _dense(X) -> np.ndarray:
+    return X.toarray() if sparse.issparse(X) else np.asarray(X, dtype=float)
+
 class LTRModel:
     def __init__(self, path: Path):
         self.path = Path(path)
         self.pipe = joblib.load(self.path)
+        self.catalog: pd.DataFrame | None = None
+        self._content_X: np.ndarray | None = None   # pre-transformed catalog, user block masked
+        self._user_mask: np.ndarray | None = None   # output columns owned by USER_COLS
+        self._sparse_out = False
 
     def predict_proba(self, X: pd.DataFrame) -> pd.Series:
         # expects ALL columns present
         probs = self.pipe.predict_proba(X[ALL])[:, 1]
         return pd.Series(probs, index=X.index, name="score")
 
+    def prepare_catalog(self, content: pd.DataFrame) -> None:
+        """
+        Transform the content side of the catalog once. Later calls to predict_catalog only
+        encode the user/context block and splice it in; the pipeline's own path is used as a
+        fallback if its preprocessor cannot be split column-wise.
+        """
+        self.catalog = content.reset_index(drop=True)
+        self._content_X = self._user_mask = None
+        pre = self.pipe[:-1]
+        ct = pre[-1] if len(pre) == 1 else None
+        sources = _output_sources(ct) if ct is not None and hasattr(ct, "transformers_") else None
+        if sources is None or self.catalog.empty:
+            return
+        ref = self.catalog.iloc[[0]]
+        filler = ref.assign(age=0, baseline_activity_min_per_day=0, premium=False, push_opt_in=False,
+                            chronotype="morning", primary_goal=str(ref["goal_tag"].iloc[0]),
+                            day_of_week=0, hour_bucket="morning", persona="0").iloc[0]
+        try:
+            Xt = pre.transform(build_candidate_features(self.catalog, filler, 0, "morning", 0))
+        except ValueError:
+            return
+        if len(sources) != Xt.shape[1]:
+            return
+        self._sparse_out = sparse.issparse(Xt)
+        self._content_X = _dense(Xt)
+        self._user_mask = np.isin(np.asarray(sources), USER_COLS)
+
+    def predict_catalog(self, pools: Sequence[np.ndarray], users: pd.DataFrame,
+                        day_of_week: Sequence[int], hour_bucket: Sequence[str],
+                        personas: Sequence[int], timings: dict | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Score catalog rows pools[i] (positions into the prepared catalog) for users.iloc[i].
+        Returns (scores, offsets) where scores[offsets[i]:offsets[i+1]] belong to user i.
+        If `timings` is given, seconds spent in "feature_build" and "ltr_predict" are stored in it.
+        """
+        assert self.catalog is not None, "call prepare_catalog first"
+        t0 = time.perf_counter()
+        if self._content_X is None:
+            feats, offsets = build_batch_candidate_features(
+                [self.catalog.iloc[rows] for rows in pools], users, day_of_week, hour_bucket, personas)
+            t1 = time.perf_counter()
+            scores = self.pipe.predict_proba(feats)[:, 1]
+            _record(timings, t0, t1)
+            return scores, offsets
+
+        # user/context block: one row per user, content columns taken from any catalog row
+        ref = [self.catalog.iloc[[0]]] * len(pools)
+        user_feats, _ = build_batch_candidate_features(ref, users, day_of_week, hour_bucket, personas)
+        U = _dense(self.pipe[:-1].transform(user_feats))[:, self._user_mask]
+
+        sizes = np.array([len(rows) for rows in pools], dtype=int)
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        X = self._content_X[np.concatenate(pools).astype(int)]
+        X[:, self._user_mask] = np.repeat(U, sizes, axis=0)
+        if self._sparse_out:
+            X = sparse.csr_matrix(X)
+        t1 = time.perf_counter()
+        scores = self.pipe[-1].predict_proba(X)[:, 1]
+        _record(timings, t0, t1)
+        return scores, offsets
+
 def build_candidate_features(cands: pd.DataFrame,
                              user_row: pd.Series,
                              day_of_week: int,
@@ -51,3 +162,37 @@ def build_candidate_features(cands: pd.DataFrame,
             # duration_min, difficulty, type, intensity, goal_tag come from content df
             df[col] = 0 if col in NUM else "unknown"
     return df[ALL]
+
+def build_batch_candidate_features(pools: Sequence[pd.DataFrame],
+                                   users: pd.DataFrame,
+                                   day_of_week: Sequence[int],
+                                   hour_bucket: Sequence[str],
+                                   personas: Sequence[int]) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Stacked variant of build_candidate_features: pools[i] is the candidate pool of users.iloc[i].
+    Returns (features with ALL columns, offsets) where rows offsets[i]:offsets[i+1] belong to user i.
+    """
+    sizes = np.array([len(p) for p in pools], dtype=int)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    df = pd.concat(list(pools), ignore_index=True)
+    rep = np.repeat(np.arange(len(pools)), sizes)
+
+    # numerical
+    df["age"] = users["age"].to_numpy(dtype=int)[rep]
+    df["baseline_activity_min_per_day"] = users["baseline_activity_min_per_day"].to_numpy(dtype=int)[rep]
+    df["day_of_week"] = np.asarray(day_of_week, dtype=int)[rep]
+    if "popularity" not in df.columns:
+        df["popularity"] = 0.0
+
+    # categorical
+    df["premium"] = users["premium"].to_numpy(dtype=bool)[rep]
+    df["push_opt_in"] = users["push_opt_in"].to_numpy(dtype=bool)[rep]
+    df["chronotype"] = users["chronotype"].astype(str).to_numpy()[rep]
+    df["primary_goal"] = users["primary_goal"].astype(str).to_numpy()[rep]
+    df["hour_bucket"] = np.asarray(hour_bucket, dtype=object)[rep]
+    df["persona"] = np.asarray([str(p) for p in personas], dtype=object)[rep]
+
+    for col in ALL:
+        if col not in df.columns:
+            df[col] = 0 if col in NUM else "unknown"
+    return df[ALL], offsets
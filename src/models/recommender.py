@@ -1,4 +1,7 @@
 from __future__ import annotations
+from typing import Sequence
+import time
+import numpy as np
 import pandas as pd
 
 # Persona preferences are lightweight heuristics:
@@ -55,17 +58,122 @@ def score_content(row: pd.Series, user_goal: str, persona: int) -> float:
     return float(score)
 
 
+def _columns(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    pop = df["popularity"] if "popularity" in df.columns else pd.Series(0.0, index=df.index)
+    return {
+        "type": df["type"].to_numpy(dtype=object),
+        "intensity": df["intensity"].astype(str).to_numpy(dtype=object),
+        "duration_min": df["duration_min"].to_numpy(dtype=float),
+        "difficulty": df["difficulty"].to_numpy(dtype=object),
+        "popularity": pd.to_numeric(pop, errors="coerce").fillna(0.0).to_numpy(dtype=float),
+    }
+
+
+def _persona_scores(cols: dict[str, np.ndarray], persona: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    score_content for every row, as (goal matches, goal does not match). The terms are added
+    in score_content's order, so the floats (and therefore the ranking) are identical.
+    """
+    prefs = PERSONA_PREFERENCES.get(int(persona), PERSONA_PREFERENCES[0])
+    lo, hi = prefs["duration"]
+    order = np.array([INTENSITY_ORDER.get(v, 1) for v in cols["intensity"]], dtype=float)
+    out = []
+    for goal in (3.0, 0.0):
+        score = np.full(len(order), goal)
+        score += np.where(np.isin(cols["type"], prefs["types"]), 1.0, 0.0)
+        score += np.where(np.isin(cols["intensity"], prefs["intensity"]), 0.5, 0.0)
+        score += np.where((cols["duration_min"] >= lo) & (cols["duration_min"] <= hi), 0.5, 0.0)
+        score -= 0.1 * order
+        score += np.where(np.isin(cols["difficulty"], ["beginner", "all"]), 1.0, 0.0)
+        score += 0.5 * cols["popularity"]
+        out.append(score)
+    return out[0], out[1]
+
+
+def top_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k best scores, descending, ties in catalog order (partition + sort of k).
+    2-D scores are ranked row by row; k <= 0 gives an empty last axis.
+    """
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if scores.ndim == 2:
+        return _top_positions_rows(scores, k)
+    n = len(scores)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        cand = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+    else:
+        cand = np.arange(n)
+    return cand[np.lexsort((cand, -scores[cand]))]
+
+
+def _top_positions_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    n, m = scores.shape
+    if k < m:
+        kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+        eq = scores == kth
+        take = (scores > kth) | (eq & (np.cumsum(eq, axis=1) <= k - (scores > kth).sum(axis=1, keepdims=True)))
+        cand = np.nonzero(take)[1].reshape(n, k)
+    else:
+        cand = np.broadcast_to(np.arange(m), scores.shape)
+    order = np.lexsort((cand, -np.take_along_axis(scores, cand, axis=1)), axis=1)
+    return np.take_along_axis(cand, order, axis=1)
+
+
 def rank_content(df_content: pd.DataFrame, user_goal: str, persona: int, top_k: int = 5) -> pd.DataFrame:
     """
     Filter the catalog to the user's goal (if present), then score and return Top-K.
     If no items match the goal, fall back to the whole catalog.
     """
+    rows = np.arange(len(df_content))
     if "goal_tag" in df_content.columns:
-        df = df_content[df_content["goal_tag"] == user_goal].copy()
-        if df.empty:
-            df = df_content.copy()
+        match = df_content["goal_tag"].to_numpy() == user_goal
+        if match.any():
+            rows = np.flatnonzero(match)
+    df = df_content.iloc[rows]
+    with_goal, without = _persona_scores(_columns(df), persona)
+    if "goal_tag" in df.columns:
+        scores = np.where(df["goal_tag"].astype(str).to_numpy() == str(user_goal), with_goal, without)
     else:
-        df = df_content.copy()
+        scores = without
+    top = top_positions(scores, top_k)
+    return df.iloc[top].assign(score=scores[top])
+
+
+class HeuristicScorer:
+    """
+    Cold-start scorer (score_content's rules) behind the learned scorer's catalog interface.
+    prepare_catalog computes every persona's scores over the catalog once; a request is then
+    a gather over its pool. The service uses it when no learned scorer is trained yet and
+    while the learned one is still loading.
+    """
+    def __init__(self):
+        self.catalog: pd.DataFrame | None = None
+        self._goal_tag: np.ndarray | None = None
+        self._scores: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    def prepare_catalog(self, content: pd.DataFrame) -> None:
+        self.catalog = content.reset_index(drop=True)
+        cols = _columns(self.catalog)
+        self._goal_tag = self.catalog["goal_tag"].astype(str).to_numpy(dtype=object)
+        self._scores = {p: _persona_scores(cols, p) for p in PERSONA_PREFERENCES}
+
+    def score(self, rows: np.ndarray, user_goal: str, persona: int) -> np.ndarray:
+        assert self._goal_tag is not None, "call prepare_catalog first"
+        with_goal, without = self._scores.get(int(persona), self._scores[0])
+        return np.where(self._goal_tag[rows] == str(user_goal), with_goal[rows], without[rows])
 
-    df["score"] = df.apply(lambda r: score_content(r, user_goal, persona), axis=1)
-    return df.sort_values("score", ascending=False).head(top_k)
+    def predict_catalog(self, pools: Sequence[np.ndarray], users: pd.DataFrame,
+                        day_of_week: Sequence[int], hour_bucket: Sequence[str],
+                        personas: Sequence[int], timings: dict | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Same contract as LTRModel.predict_catalog (context is not used by the heuristic)."""
+        t0 = time.perf_counter()
+        goals = users["primary_goal"].astype(str).to_numpy()
+        parts = [self.score(np.asarray(rows, dtype=int), goals[i], personas[i]) for i, rows in enumerate(pools)]
+        offsets = np.concatenate([[0], np.cumsum([len(p) for p in parts])]).astype(int)
+        scores = np.concatenate(parts) if parts else np.zeros(0)
+        if timings is not None:
+            timings["heuristic_score"] = time.perf_counter() - t0
+        return scores, offsets
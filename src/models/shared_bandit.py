@@ -0,0 +1,234 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Sequence
+import fcntl
+import json
+import os
+import threading
+
+import joblib
+import numpy as np
+
+from .bandit import LinTSBandit, trained_path_for
+from .bandit_journal import list_segments, log_dir_for
+
+# One LinTSBandit shared by several worker processes.
+#   <path>       float64 memmap: [update counts (k) | A (k*d*d) | b (k*d)]
+#   <path>.json  arms, d, alpha, source (id of the snapshot the region was built from),
+#                trained_id (offline training run the statistics descend from)
+#   <path>.lock  flock target: exclusive for updates, shared for reads
+#   <path>.snapshot.lock  flock target: one worker at a time snapshots the region to BANDIT_PATH
+# Every process keeps its own posterior cache (A^-1, mu, Cholesky) and refreshes only the
+# arms whose update count moved since it last looked. Its own updates to an arm nobody else
+# touched in between are applied to the cache as rank-1 (Sherman-Morrison) updates.
+
+
+def _meta_path(path: Path) -> Path:
+    return Path(str(path) + ".json")
+
+
+def _lock_path(path: Path) -> Path:
+    return Path(str(path) + ".lock")
+
+
+def _fingerprint(path: Path) -> str:
+    st = Path(path).stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class SharedLinTSBandit(LinTSBandit):
+    """LinTSBandit whose sufficient statistics live in a memory-mapped file (see module comment)."""
+
+    def __init__(self, path: Path, seed: int | None = None):
+        path = Path(path)
+        meta = json.loads(_meta_path(path).read_text(encoding="utf-8"))
+        # posterior draws must differ between workers, so no fixed seed by default
+        self.rng = np.random.default_rng(seed)
+        self.arms = list(meta["arms"])
+        self.arm_index = {a: i for i, a in enumerate(self.arms)}
+        self.d = int(meta["d"])
+        self.alpha = float(meta["alpha"])
+        self.source = str(meta.get("source", "init"))
+        self.log_generation = None
+        self.trained_id = meta.get("trained_id")
+        self.path = path
+        k, d = len(self.arms), self.d
+        self._mm = np.memmap(path, dtype=np.float64, mode="r+", shape=(k + k * d * d + k * d,))
+        self.counts = self._mm[:k]
+        self.A_stack = self._mm[k:k + k * d * d].reshape(k, d, d)
+        self.b_stack = self._mm[k + k * d * d:].reshape(k, d)
+        self._lock_fd = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+        self._thread_lock = threading.Lock()  # flock is per open file, not per thread
+        with self._locked(fcntl.LOCK_SH):
+            self._seen = np.array(self.counts)
+            self.refresh_posterior()
+
+    # ---- creation ----
+
+    @classmethod
+    def create(cls, path: Path, bandit: LinTSBandit, source: str = "init") -> "SharedLinTSBandit":
+        """Write `bandit`'s A, b into a new shared region at `path` (atomically replacing any old one)."""
+        cls._write_region(path, bandit, source)
+        return cls(path)
+
+    @staticmethod
+    def _write_region(path: Path, bandit: LinTSBandit, source: str) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        k, d = len(bandit.arms), bandit.d
+        tmp = path.with_name(path.name + ".tmp")
+        mm = np.memmap(tmp, dtype=np.float64, mode="w+", shape=(k + k * d * d + k * d,))
+        mm[:k] = 0
+        mm[k:k + k * d * d] = np.asarray(bandit.A_stack, dtype=float).ravel()
+        mm[k + k * d * d:] = np.asarray(bandit.b_stack, dtype=float).ravel()
+        mm.flush()
+        del mm
+        SharedLinTSBandit._write_meta(path, bandit, source)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _write_meta(path: Path, bandit: LinTSBandit, source: str) -> None:
+        _meta_path(path).write_text(json.dumps({"arms": list(bandit.arms), "d": bandit.d, "alpha": bandit.alpha,
+                                                "source": source, "trained_id": bandit.trained_id}),
+                                    encoding="utf-8")
+
+    @classmethod
+    def open_or_create(cls, path: Path, snapshot_path: Path, arms: Sequence[str], d: int) -> "SharedLinTSBandit":
+        """
+        Attach to the shared region, creating it first if needed. The region is (re)built from
+        the snapshot when it is missing or has other arms/d, and from the trained copy (see
+        LinTSBandit.save) when that holds a training run the live statistics do not descend from.
+        Creation is serialized across processes, so concurrently starting workers build it once.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            snapshot_path = Path(snapshot_path)
+            snapshot = joblib.load(snapshot_path) if snapshot_path.exists() else None
+            meta = json.loads(_meta_path(path).read_text(encoding="utf-8")) if _meta_path(path).exists() else {}
+            trained_copy = trained_path_for(snapshot_path)
+            if trained_copy.exists():
+                # rebuild when the last training run is not the one the live statistics descend from
+                candidate = LinTSBandit.load(trained_copy, replay_log=False)
+                live = meta if path.exists() else snapshot or {}
+                trained = candidate.trained_id != live.get("trained_id")
+            else:  # snapshot written before trained copies existed
+                trained = snapshot is not None and snapshot.get("log_generation") is None
+            if trained or not path.exists() or meta.get("arms") != list(arms) or meta.get("d") != int(d):
+                if trained and trained_copy.exists():
+                    source, source_id = candidate, _fingerprint(trained_copy)
+                elif snapshot is not None:
+                    source, source_id = LinTSBandit.load(snapshot_path), _fingerprint(snapshot_path)
+                else:
+                    source, source_id = LinTSBandit(arms, d=d), "init"
+                cls._write_region(path, source, source_id)
+                if trained:
+                    # stamp it right away so workers starting after us attach instead of rebuilding
+                    gen = max(list_segments(log_dir_for(snapshot_path)), default=0) + 1
+                    LinTSBandit.write_snapshot(source.state_dict(), snapshot_path, log_generation=gen)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        return cls(path)
+
+    # ---- cross-process synchronization ----
+
+    @contextmanager
+    def _locked(self, mode: int) -> Iterator[None]:
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _refresh_changed(self) -> None:
+        """Refresh the posterior of arms other processes updated (caller holds the file lock)."""
+        counts = np.array(self.counts)
+        for i in np.flatnonzero(counts != self._seen):
+            self.refresh_posterior(self.arms[i])
+        self._seen = counts
+
+    def sync(self) -> None:
+        if np.array_equal(self.counts, self._seen):  # unlocked peek: nothing new, nothing to do
+            return
+        with self._locked(fcntl.LOCK_SH):
+            self._refresh_changed()
+
+    def choose_batch(self, X: np.ndarray) -> list[str]:
+        self.sync()
+        return super().choose_batch(X)
+
+    def update(self, arm: str, reward: float, x: np.ndarray):
+        i = self.arm_index[arm]
+        x = np.asarray(x, dtype=float)
+        with self._locked(fcntl.LOCK_EX):
+            if self.counts[i] == self._seen[i]:
+                # cache is current for this arm: A, b += and a rank-1 update of A^-1 (with the
+                # periodic exact re-inversion of LinTSBandit.update)
+                super().update(arm, reward, x)
+                self.counts[i] += 1
+                self._seen[i] = self.counts[i]
+            else:
+                self.A_stack[i] += np.outer(x, x)
+                self.b_stack[i] += reward * x
+                self.counts[i] += 1
+            self._refresh_changed()
+
+    def update_batch(self, arms, rewards, X):
+        arms = np.asarray(arms).astype(str)
+        with self._locked(fcntl.LOCK_EX):
+            super().update_batch(arms, rewards, X)
+            for a in np.unique(arms):
+                self.counts[self.arm_index[a]] += 1
+            self._refresh_changed()
+
+    def assign(self, bandit: LinTSBandit) -> None:
+        """Replace the shared statistics with `bandit`'s (e.g. a hot-reloaded retrained model)."""
+        if list(bandit.arms) != self.arms or bandit.d != self.d:
+            raise ValueError("arms / dimension do not match the shared region")
+        with self._locked(fcntl.LOCK_EX):
+            self.A_stack[:] = bandit.A_stack
+            self.b_stack[:] = bandit.b_stack
+            self.counts += 1
+            self._refresh_changed()
+            self.trained_id = bandit.trained_id
+            self._write_meta(self.path, self, self.source)
+
+    def region_trained_id(self) -> str | None:
+        """trained_id of the statistics in the region (another worker may have assigned newer ones)."""
+        with self._locked(fcntl.LOCK_SH):
+            return json.loads(_meta_path(self.path).read_text(encoding="utf-8")).get("trained_id")
+
+    def exclusive(self):
+        return self._locked(fcntl.LOCK_EX)
+
+    @contextmanager
+    def snapshot_lock(self) -> Iterator[None]:
+        """Serializes snapshot writes of all workers attached to the region (own fd: per-call flock)."""
+        fd = os.open(str(self.path) + ".snapshot.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the lock
+
+    def add_stats(self, dA: np.ndarray, db: np.ndarray):
+        """Caller holds `exclusive()`."""
+        super().add_stats(dA, db)
+        self.counts += 1
+        self._seen = np.array(self.counts)
+
+    def state_dict(self) -> dict:
+        with self._locked(fcntl.LOCK_SH):
+            return super().state_dict()
+
+    def flush(self) -> None:
+        self._mm.flush()
+
+    def close(self) -> None:
+        self.flush()
+        os.close(self._lock_fd)
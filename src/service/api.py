@@ -1,11 +1,22 @@
 from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
+import asyncio
+import hashlib
 import json
+import logging
+import multiprocessing
 import random
+import threading
+import time
 
 import numpy as np
 import pandas as pd
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
 
 from ..config import (
     DATA_DIR,
@@ -15,88 +26,278 @@ from ..config import (
     BANDIT_PATH,
     ARMS,
     BANDIT_D,
+    BANDIT_CHECKPOINT_EVERY,
+    BANDIT_CHECKPOINT_SECONDS,
+    RANK_CACHE_SIZE,
+    RANK_CACHE_TTL_SECONDS,
+    SCORING_EXECUTOR,
+    SCORING_WORKERS,
+    WARMUP_REQUESTS,
+    MODEL_RELOAD_POLL_SECONDS,
+    SHARED_STATE_DIR,
+    BANDIT_REPLICA_ID,
+    BANDIT_SYNC_DIR,
+    BANDIT_SYNC_SECONDS,
+    TOPK_DIR,
+    LATENCY_BUDGET_MS,
+    LATENCY_BUDGET_SCORING_SHARE,
+    DEGRADE_COOLDOWN_SECONDS,
+    MICROBATCH_MAX_SIZE,
+    MICROBATCH_MAX_WAIT_MS,
 )
-from ..features.persona_clustering import load as load_persona_model, assign_personas
-from ..features.preprocess import select_user_features
-from ..models.bandit import LinTSBandit
-from ..models.ltr import LTRModel, build_candidate_features
+from ..data_store import has_table
+from ..features.bandit_context import USER_DIM, user_block, user_row, with_context, fit_dim
+from ..models.bandit import LinTSBandit, trained_path_for
+from ..models.bandit_journal import BanditJournal
+from ..models.bandit_sync import ReplicaSync, init_global
+from ..models.shared_bandit import SharedLinTSBandit
+from ..models.compiled_ltr import artifact_fingerprint
+from ..models.recommender import top_positions
+from . import telemetry
+from .batcher import MicroBatcher
+from .bundle import ModelBundle, artifact_fingerprints, has_learned_scorer
+from .cache import TTLCache
+from .topk import TopKTable, current_generation
+from .user_store import UserStore
 from .schemas import (
     RecommendationRequest,
     RecommendationResponse,
     RecommendationItem,
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
     Feedback,
     HelperBundle,
     UserProfile,
     RequestContext,
+    Ranker,
 )
 
-app = FastAPI(title="Humanoo Retention Personalization (ML)")
-
-# Lazy singletons
-_persona = None          # tuple(preprocessor, kmeans)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(_warm_start())
+    watcher = None
+    if MODEL_RELOAD_POLL_SECONDS > 0:
+        watcher = threading.Thread(target=_watch_artifacts, args=(MODEL_RELOAD_POLL_SECONDS,),
+                                   name="artifact-watcher", daemon=True)
+        watcher.start()
+    syncer = None
+    if BANDIT_REPLICA_ID:
+        syncer = threading.Thread(target=_sync_replica_loop, args=(BANDIT_SYNC_SECONDS,),
+                                  name="bandit-sync", daemon=True)
+        syncer.start()
+    yield
+    task.cancel()
+    _stop_watch.set()
+    for t in (watcher, syncer):
+        if t is not None:
+            await run_in_threadpool(t.join)
+    await run_in_threadpool(_shutdown)
+
+
+app = FastAPI(title="Humanoo Retention Personalization (ML)", lifespan=lifespan)
+logger = logging.getLogger(__name__)
+
+# Singletons: loaded eagerly by the lifespan hook, lazily on first request otherwise
+_bundle: ModelBundle | None = None      # persona model + content + learned scorer, swapped as one unit
+_recent_bundles: OrderedDict[str, ModelBundle] = OrderedDict()  # version -> bundle, for in-flight requests
 _bandit: LinTSBandit | None = None
-_content: pd.DataFrame | None = None
-_ltr: LTRModel | None = None
+_bandit_version = "init"                 # fingerprint of the trained snapshot the bandit started from
+_journal: BanditJournal | None = None
+_replica: ReplicaSync | None = None      # multi-replica delta export / global rebase (BANDIT_REPLICA_ID)
+_users: UserStore | None = None
+_rank_cache = TTLCache(maxsize=RANK_CACHE_SIZE, ttl_s=RANK_CACHE_TTL_SECONDS)
+_RANK_DEPTH = 50                         # upper bound of RecommendationRequest.top_k
+_load_lock = threading.RLock()           # first requests must not load artifacts twice
+_bandit_lock = threading.RLock()         # guards bandit state: /feedback updates vs. sampling vs. reload
+_reload_lock = threading.Lock()          # one reload at a time
+_stop_watch = threading.Event()
+_scoring_pool: Executor | None = None
+_sampling_pool: Executor | None = None
+_started_at = time.monotonic()
+_trained_seen: str | None = None         # fingerprint of the trained bandit copy last looked at by _reload
+_degraded_until = 0.0                    # monotonic time until which budgeted requests skip the learned scorer
+_startup: dict = {"state": "idle", "load_s": None, "warmup_s": None, "warmup_requests": 0, "error": None}
+_reload_status: dict = {"reloads": 0, "rejected": 0, "last_reload_s": None, "last_error": None}
+
+# Runtime metrics (scraped from /metrics/runtime)
+_registry = telemetry.Registry()
+_requests_total = _registry.counter("reco_requests_total", "Handled requests by endpoint and status code.",
+                                    ["endpoint", "code"])
+_in_flight = _registry.gauge("reco_requests_in_flight", "Requests currently being handled.", ["endpoint"])
+_request_seconds = _registry.histogram("reco_request_duration_seconds", "Handler latency.", ["endpoint"])
+_stage_seconds = _registry.histogram("reco_stage_duration_seconds",
+                                     "Latency of each recommend/feedback stage.", ["endpoint", "stage"])
+_degraded_total = _registry.counter("reco_degraded_total",
+                                    "Recommendations served without the learned scorer to meet the latency budget.",
+                                    ["endpoint", "ranker"])
+_microbatch_size = _registry.histogram("reco_microbatch_size",
+                                       "Concurrent /recommendations requests scored together.",
+                                       buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+
+
+@_registry.collector
+def _runtime_samples() -> list[str]:
+    st = _rank_cache.stats()
+    lines = telemetry.sample("reco_model_info", "gauge", "Live model version.", 1,
+                             {"version": _model_version()})
+    for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        lines += telemetry.sample(f"reco_rank_cache_{key}_total", "counter", f"Ranking cache {key}.", st[key])
+    lines += telemetry.sample("reco_rank_cache_size", "gauge", "Ranking cache entries.", st["size"])
+    lines += telemetry.sample("reco_users", "gauge", "Profiles in the user store.", len(_users) if _users else 0)
+    lines += telemetry.sample("reco_bandit_pending_updates", "gauge", "Feedback events not yet checkpointed.",
+                              _journal.pending if _journal else 0)
+    lines += telemetry.sample("reco_degraded_mode", "gauge",
+                              "1 while budgeted requests bypass the learned scorer after a budget miss.",
+                              int(time.monotonic() < _degraded_until))
+    return lines
+
+
+@contextmanager
+def _track(endpoint: str):
+    """Count the request, its status code and handler latency; maintain the in-flight gauge."""
+    _in_flight.inc(endpoint)
+    t0 = time.perf_counter()
+    code = "200"
+    try:
+        yield
+    except HTTPException as e:
+        code = str(e.status_code)
+        raise
+    except Exception:
+        code = "500"
+        raise
+    finally:
+        _in_flight.dec(endpoint)
+        _request_seconds.observe(time.perf_counter() - t0, endpoint)
+        _requests_total.inc(endpoint, code)
+
+
+def _current_bundle() -> ModelBundle:
+    """The live artifact bundle, loading it on first use."""
+    bundle = _bundle
+    if bundle is not None:
+        return bundle
+    with _load_lock:
+        if _bundle is None:
+            _install_bundle(ModelBundle.load(DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH, SHARED_STATE_DIR))
+        assert _bundle is not None
+        return _bundle
+
+
+def _attach_topk(bundle: ModelBundle) -> None:
+    """Serve the current top-K table with `bundle` if it was materialized for this version."""
+    gen = current_generation(TOPK_DIR)
+    table = TopKTable.open(TOPK_DIR) if gen is not None else None
+    bundle.topk = table if table is not None and table.version == bundle.version else None
+    bundle.topk_generation = gen
+
+
+def _install_bundle(bundle: ModelBundle) -> None:
+    global _bundle, _scoring_pool
+    _attach_topk(bundle)
+    with _load_lock:
+        _recent_bundles[bundle.version] = bundle
+        while len(_recent_bundles) > 2:
+            _recent_bundles.popitem(last=False)
+        _bundle = bundle
+        _rank_cache.set_version(bundle.version)
+        if SCORING_EXECUTOR == "process" and _scoring_pool is not None:
+            # worker processes hold their own bundle: replace them so they load the new set
+            old, _scoring_pool = _scoring_pool, _process_pool()
+            old.shutdown(wait=False)
+
+
+def _load_bandit() -> tuple[LinTSBandit, str]:
+    if SHARED_STATE_DIR is not None:
+        shared = SharedLinTSBandit.open_or_create(SHARED_STATE_DIR / "bandit.f64", BANDIT_PATH, ARMS, BANDIT_D)
+        return shared, shared.source
+    if Path(BANDIT_PATH).exists():
+        bandit = LinTSBandit.load(BANDIT_PATH)
+        trained = trained_path_for(BANDIT_PATH)
+        if trained.exists():
+            candidate = LinTSBandit.load(trained, replay_log=False)
+            if candidate.trained_id != bandit.trained_id:
+                # trained while the last run was up; its checkpoints went over the new snapshot
+                return candidate, artifact_fingerprint(trained)
+        return bandit, artifact_fingerprint(Path(BANDIT_PATH))
+    return LinTSBandit(ARMS, d=BANDIT_D), "init"
 
 
 def _ensure_loaded():
-    """Load persona encoder/kmeans, bandit, content (with popularity), and LTR model once."""
-    global _persona, _bandit, _content, _ltr
-
-    if _persona is None:
-        pre, km = load_persona_model(ENCODER_PATH, PERSONA_MODEL_PATH)
-        _persona = (pre, km)
-
-    if _bandit is None:
-        if Path(BANDIT_PATH).exists():
-            _bandit = LinTSBandit.load(BANDIT_PATH)
-        else:
-            _bandit = LinTSBandit(ARMS, d=BANDIT_D)
-
-    if _content is None:
-        _content = pd.read_csv(DATA_DIR / "content_catalog.csv")
-        # Popularity prior (CTR per content_id) from interactions if available
-        inter_path = DATA_DIR / "interactions.csv"
-        if inter_path.exists():
-            inter = pd.read_csv(inter_path)
-            pop = (
-                inter.groupby("content_id")["reward"]
-                .mean()
-                .rename("popularity")
-                .reset_index()
-            )
-            _content = _content.merge(pop, on="content_id", how="left")
-            _content["popularity"] = _content["popularity"].fillna(0.0)
-        else:
-            _content["popularity"] = 0.0
-
-    if _ltr is None:
-        maybe = ARTIFACTS_DIR / "ltr_model.joblib"
-        if maybe.exists():
-            _ltr = LTRModel(maybe)
-        else:
-            raise RuntimeError("Learned scorer not found. Run `make train-ltr` or `make train`.")
-
-
-def _user_vector_10(user_df: pd.DataFrame, day_of_week: int, hour_bucket: str) -> np.ndarray:
-    """10-D bandit features: bias, age/60, baseline/60, premium, push_opt_in, chrono_morning,
-       goal_is_stress, goal_is_weight_loss, bucket_morning, day_of_week/6"""
-    u = user_df.iloc[0]
-    return np.array(
-        [
-            1.0,
-            float(u.age) / 60.0,
-            float(u.baseline_activity_min_per_day) / 60.0,
-            1.0 if u.premium else 0.0,
-            1.0 if u.push_opt_in else 0.0,
-            1.0 if u.chronotype == "morning" else 0.0,
-            1.0 if u.primary_goal == "stress" else 0.0,
-            1.0 if u.primary_goal == "weight_loss" else 0.0,
-            1.0 if hour_bucket == "morning" else 0.0,
-            float(day_of_week) / 6.0,
-        ],
-        dtype=float,
-    )
+    """Scorer artifacts plus the stateful parts (bandit + feedback journal, user store)."""
+    global _bandit, _bandit_version, _journal, _replica, _users
+
+    _current_bundle()
+    with _load_lock:
+        if _bandit is None:
+            bandit, version = _load_bandit()
+            _journal = _start_journal(bandit)
+            _bandit, _bandit_version = bandit, _short_id(version)
+            if BANDIT_REPLICA_ID:
+                init_global(BANDIT_SYNC_DIR, bandit)
+                _replica = ReplicaSync(bandit, BANDIT_REPLICA_ID, BANDIT_SYNC_DIR, lock=_bandit_lock)
+                _replica.pull()
+
+        if _users is None:
+            _users = UserStore.load(DATA_DIR)
+
+
+def _start_journal(bandit: LinTSBandit) -> BanditJournal:
+    return BanditJournal(
+        bandit, BANDIT_PATH,
+        checkpoint_every=BANDIT_CHECKPOINT_EVERY,
+        checkpoint_interval_s=BANDIT_CHECKPOINT_SECONDS,
+        lock=_bandit_lock,
+        # the shared region is itself durable (a memory-mapped file): snapshots only
+        log=not isinstance(bandit, SharedLinTSBandit),
+    ).start()
+
+
+def _short_id(fingerprint: str) -> str:
+    return fingerprint if fingerprint == "init" else hashlib.sha1(fingerprint.encode()).hexdigest()[:8]
+
+
+def _model_version() -> str:
+    """`<scorer bundle>+<bandit>` identifier reported on every response."""
+    return f"{_bundle.version if _bundle is not None else 'none'}+{_bandit_version}"
+
+
+def _init_scoring_worker(paths: dict) -> None:
+    """Process-pool initializer: load artifacts from the parent's locations, not the env defaults."""
+    globals().update(paths)
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: this process runs journal / watcher / sync threads, and a forked child
+    # could inherit one of their locks held. Each worker keeps its own bundle and ranking cache.
+    paths = {"DATA_DIR": DATA_DIR, "ARTIFACTS_DIR": ARTIFACTS_DIR, "ENCODER_PATH": ENCODER_PATH,
+             "PERSONA_MODEL_PATH": PERSONA_MODEL_PATH, "SHARED_STATE_DIR": SHARED_STATE_DIR, "TOPK_DIR": TOPK_DIR}
+    return ProcessPoolExecutor(max_workers=SCORING_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_scoring_worker, initargs=(paths,))
+
+
+def _executors() -> tuple[Executor, Executor]:
+    """(scoring pool, bandit sampling pool). Bandit state lives in this process, so with a
+    process pool only persona assignment + learned scoring leave the process."""
+    global _scoring_pool, _sampling_pool
+    with _load_lock:
+        if _scoring_pool is None:
+            if SCORING_EXECUTOR == "process":
+                _scoring_pool = _process_pool()
+                _sampling_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bandit")
+            else:
+                _scoring_pool = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+                _sampling_pool = _scoring_pool
+    assert _sampling_pool is not None
+    return _scoring_pool, _sampling_pool
+
+
+def _bandit_x(block: np.ndarray, day_of_week, hour_bucket, d: int | None = None) -> np.ndarray:
+    """Bandit features for user block(s) + context, padded/truncated to the bandit dimension."""
+    if d is None:
+        assert _bandit is not None
+        d = _bandit.d
+    return fit_dim(with_context(block, day_of_week, hour_bucket), d)
 
 # --------- enum normalization helpers for /helper ---------
 _ALLOWED_WORK = {"9-5", "shift", "flex"}
@@ -130,7 +331,7 @@ def _norm_lang(v: str) -> str:
 # ---------- Consolidated helper (single GET) ----------
 
 @app.get("/helper", response_model=HelperBundle)
-def helper_bundle():
+async def helper_bundle():
     """
     Single helper endpoint that returns:
     - allowed arms
@@ -138,42 +339,40 @@ def helper_bundle():
     - a valid sample content_id
     - ready-to-send example payloads for /recommendations and /feedback
     """
-    _ensure_loaded()
-    assert _content is not None
-
-    users_path = DATA_DIR / "users.csv"
-    if not users_path.exists():
-        raise HTTPException(status_code=404, detail="users.csv not found; run `make data`.")
-    users_df = pd.read_csv(users_path)
-    if users_df.empty:
+    await run_in_threadpool(_ensure_loaded)
+    assert _users is not None
+    content = _current_bundle().content
+    if len(_users) == 0:
+        if not has_table(DATA_DIR, "users"):
+            raise HTTPException(status_code=404, detail="users.csv not found; run `make data`.")
         raise HTTPException(status_code=404, detail="users.csv is empty.")
-    urow = users_df.sample(n=1, random_state=random.randint(0, 9999)).iloc[0]
+    urow = _users.row(random.randrange(len(_users)))
 
-    work_pattern = _norm_work_pattern(urow.work_pattern)
-    gender = _norm_gender(urow.gender)
-    primary_goal = _norm_goal(urow.primary_goal)
-    chronotype = _norm_chronotype(urow.chronotype)
-    language = _norm_lang(getattr(urow, "language", "en"))
-    age = int(max(13, min(100, int(urow.age))))
-    baseline = int(max(0, min(300, int(urow.baseline_activity_min_per_day))))
+    work_pattern = _norm_work_pattern(urow["work_pattern"])
+    gender = _norm_gender(urow["gender"])
+    primary_goal = _norm_goal(urow["primary_goal"])
+    chronotype = _norm_chronotype(urow["chronotype"])
+    language = _norm_lang(urow.get("language", "en"))
+    age = int(max(13, min(100, int(urow["age"]))))
+    baseline = int(max(0, min(300, int(urow["baseline_activity_min_per_day"]))))
 
     sample_user = UserProfile(
-        user_id=str(urow.user_id),
+        user_id=str(urow["user_id"]),
         age=age,
         gender=gender,
         work_pattern=work_pattern,
         primary_goal=primary_goal,
         baseline_activity_min_per_day=baseline,
-        premium=bool(urow.premium),
-        push_opt_in=bool(urow.push_opt_in),
+        premium=bool(urow["premium"]),
+        push_opt_in=bool(urow["push_opt_in"]),
         chronotype=chronotype,
         language=language,
     )
 
-    dfc = _content.copy()
-    if "popularity" in dfc.columns:
-        dfc = dfc.sort_values("popularity", ascending=False)
-    cid = str(dfc.iloc[0].content_id)
+    if "popularity" in content.columns:
+        cid = str(content["content_id"].iloc[int(content["popularity"].to_numpy().argmax())])
+    else:
+        cid = str(content["content_id"].iloc[0])
 
     ctx = RequestContext(
         day_of_week=random.randint(0, 6),
@@ -201,77 +400,600 @@ def helper_bundle():
 
 # ---------- Core endpoints (learned scorer) ----------
 
-@app.post("/recommendations", response_model=RecommendationResponse)
-def recommend(req: RecommendationRequest):
-    _ensure_loaded()
-    assert _persona is not None and _bandit is not None and _content is not None and _ltr is not None
-
-    user_df = pd.DataFrame([req.user.model_dump()])
-    pre, km = _persona
-
-    # Persona assignment
-    personas_df = assign_personas(select_user_features(user_df), pre, km)
-    persona = int(personas_df.iloc[0]["persona"])
-
-    # Candidate pool (goal-filter; if empty, fall back to all)
-    pool = _content[_content["goal_tag"] == req.user.primary_goal].copy()
-    if pool.empty:
-        pool = _content.copy()
-
-    # Build features and score with learned model
-    feats = build_candidate_features(pool, user_df.iloc[0], req.context.day_of_week,
-                                     req.context.hour_bucket, persona)
-    scores = _ltr.predict_proba(feats)
-    pool = pool.assign(score=scores.values)
-    ranked = pool.sort_values("score", ascending=False).head(req.top_k)
-
-    # Bandit arm selection
-    x = _user_vector_10(user_df, req.context.day_of_week, req.context.hour_bucket)
-    if _bandit.d != len(x):
-        x = np.pad(x, (0, _bandit.d - len(x))) if len(x) < _bandit.d else x[: _bandit.d]
-    chosen = _bandit.choose(x)
-
-    items = [
-        RecommendationItem(
-            content_id=str(r.content_id),
-            type=str(r.type),
-            duration_min=int(r.duration_min),
-            intensity=str(r.intensity),
-            goal_tag=str(r.goal_tag),
-            difficulty=str(r.difficulty),
-            score=float(r.score),
+def _segment_key(version: str, req: RecommendationRequest, persona: int) -> tuple:
+    u, c = req.user, req.context
+    return (version, persona, u.primary_goal, u.age, u.baseline_activity_min_per_day, u.premium,
+            u.push_opt_in, u.chronotype, c.day_of_week, c.hour_bucket)
+
+
+def _score_requests(reqs: list[RecommendationRequest]) -> tuple[str, list[int], list[tuple[np.ndarray, np.ndarray]], dict]:
+    """
+    (bundle version, personas, rankings, stage timings) with this process's live bundle; runs
+    on the scoring pool. Timings travel back with the result so process workers are covered too.
+    """
+    timings: dict[str, float] = {}
+    bundle = _current_bundle()
+    return (bundle.version, *_score_with(bundle, reqs, timings=timings), timings)
+
+
+def _score_with(bundle: ModelBundle, reqs: list[RecommendationRequest], use_cache: bool = True,
+                timings: dict | None = None) -> tuple[list[int], list[tuple[np.ndarray, np.ndarray]]]:
+    """Personas + ranked (catalog positions, scores) per request."""
+    timings = {} if timings is None else timings
+    profiles = [r.user.model_dump() for r in reqs]
+    table = bundle.topk
+    if table is None:
+        return _score_live(bundle, reqs, profiles, use_cache, timings)
+
+    # known users with an unchanged profile: direct lookup in the materialized table
+    t = time.perf_counter()
+    found = [table.lookup(p, r.context.day_of_week, r.context.hour_bucket, r.top_k)
+             for p, r in zip(profiles, reqs)]
+    timings["topk_lookup"] = time.perf_counter() - t
+    live = [i for i, f in enumerate(found) if f is None]
+    if len(live) == len(reqs):
+        return _score_live(bundle, reqs, profiles, use_cache, timings)
+    personas = [f[0] if f is not None else -1 for f in found]
+    rankings = [(f[1], f[2]) if f is not None else None for f in found]
+    if live:
+        p_live, r_live = _score_live(bundle, [reqs[i] for i in live], [profiles[i] for i in live],
+                                     use_cache, timings)
+        for j, i in enumerate(live):
+            personas[i], rankings[i] = p_live[j], r_live[j]
+    return personas, rankings  # type: ignore[return-value]
+
+
+def _score_live(bundle: ModelBundle, reqs: list[RecommendationRequest], profiles: list[dict],
+                use_cache: bool, timings: dict) -> tuple[list[int], list[tuple[np.ndarray, np.ndarray]]]:
+    """Persona assignment + learned scorer (through the segment cache)."""
+    t = time.perf_counter()
+    users_df = pd.DataFrame(profiles)
+
+    personas = bundle.personas(profiles)
+    now = time.perf_counter()
+    timings["persona"], t = now - t, now
+
+    # Ranking depends only on the exact feature tuple entering the learned model:
+    # reuse cached rankings for repeated segments, score the rest in one call
+    keys = [_segment_key(bundle.version, r, personas[i]) for i, r in enumerate(reqs)]
+    rankings = [_rank_cache.get(k) if use_cache else None for k in keys]
+    first: dict[tuple, int] = {}
+    for i, hit in enumerate(rankings):
+        if hit is None:
+            first.setdefault(keys[i], i)
+    miss = list(first.values())
+    now = time.perf_counter()
+    timings["cache_lookup"], t = now - t, now
+    if miss:
+        pools = [bundle.goal_rows(reqs[i].user.primary_goal) for i in miss]
+        timings["pool_filter"] = time.perf_counter() - t
+        scores, offsets = bundle.ltr.predict_catalog(
+            pools,
+            users_df.iloc[miss],
+            [reqs[i].context.day_of_week for i in miss],
+            [reqs[i].context.hour_bucket for i in miss],
+            [personas[i] for i in miss],
+            timings=timings,
         )
-        for _, r in ranked.iterrows()
-    ]
+        t = time.perf_counter()
+        for j, i in enumerate(miss):
+            s = scores[offsets[j]:offsets[j + 1]]
+            order = np.argsort(-s, kind="stable")[:_RANK_DEPTH]
+            rankings[i] = (pools[j][order], s[order])
+            if use_cache:
+                _rank_cache.put(keys[i], rankings[i])
+        for i, hit in enumerate(rankings):
+            if hit is None:
+                rankings[i] = rankings[first[keys[i]]]
+        timings["rank"] = time.perf_counter() - t
+    return personas, rankings  # type: ignore[return-value]
+
+
+def _choose_arms(block: np.ndarray, day_of_week, hour_bucket, endpoint: str | None = None) -> tuple[str, list[str]]:
+    """Thompson draw for every context row; sampling mutates the RNG and Cholesky cache."""
+    t0 = time.perf_counter()
+    with _bandit_lock:
+        assert _bandit is not None
+        out = _bandit_version, _bandit.choose_batch(_bandit_x(block, day_of_week, hour_bucket))
+    if endpoint is not None:
+        _stage_seconds.observe(time.perf_counter() - t0, endpoint, "bandit_choose")
+    return out
+
+
+_RANKER_NOTES: dict[Ranker, str] = {
+    "learned": "learned scorer ranked by P(reward)",
+    "cached": "cached learned ranking (latency budget)",
+    "heuristic": "cold-start heuristic ranked",
+}
+
+
+def _build_responses(bundle: ModelBundle, bandit_version: str, reqs, personas, rankings,
+                     chosen_arms, rankers: list[Ranker] | None = None,
+                     degraded: bool = False) -> list[RecommendationResponse]:
+    model_version = f"{bundle.version}+{bandit_version}"
+    if rankers is None:
+        rankers = ["learned" if bundle.learned else "heuristic"] * len(reqs)
+    out = []
+    for i, req in enumerate(reqs):
+        positions, ranked_scores = rankings[i]
+        ranked = bundle.content.iloc[positions[: req.top_k]].assign(score=ranked_scores[: req.top_k])
+        chosen = chosen_arms[i]
+
+        items = [
+            RecommendationItem(
+                content_id=str(r.content_id),
+                type=str(r.type),
+                duration_min=int(r.duration_min),
+                intensity=str(r.intensity),
+                goal_tag=str(r.goal_tag),
+                difficulty=str(r.difficulty),
+                score=float(r.score),
+            )
+            for r in ranked.itertuples(index=False)
+        ]
 
-    rationale = (
-        f"Persona {persona} + goal '{req.user.primary_goal}' suggest these; "
-        f"learned scorer ranked by P(reward); bandit selected '{chosen}'."
-    )
-    return RecommendationResponse(
-        persona=persona, chosen_arm=chosen, items=items, rationale=rationale
+        rationale = (
+            f"Persona {personas[i]} + goal '{req.user.primary_goal}' suggest these; "
+            f"{_RANKER_NOTES[rankers[i]]}; bandit selected '{chosen}'."
+        )
+        out.append(RecommendationResponse(
+            persona=personas[i], chosen_arm=chosen, items=items, rationale=rationale,
+            model_version=model_version, ranker=rankers[i], degraded=degraded,
+        ))
+    return out
+
+
+def _score_fallback(bundle: ModelBundle, reqs: list[RecommendationRequest]
+                    ) -> tuple[list[int], list[tuple[np.ndarray, np.ndarray]], list[Ranker]]:
+    """
+    Rankings without the learned scorer: the materialized table or the ranking cache where they
+    have the answer ("cached"), the heuristic scorer otherwise. Only lookups and array work.
+    """
+    profiles = [r.user.model_dump() for r in reqs]
+    personas = bundle.personas(profiles)
+    rankings: list[tuple[np.ndarray, np.ndarray]] = []
+    rankers: list[Ranker] = []
+    for i, (req, profile) in enumerate(zip(reqs, profiles)):
+        ctx = req.context
+        hit = None
+        if bundle.topk is not None:
+            found = bundle.topk.lookup(profile, ctx.day_of_week, ctx.hour_bucket, req.top_k)
+            if found is not None:
+                personas[i], hit = found[0], (found[1], found[2])
+        if hit is None:
+            hit = _rank_cache.get(_segment_key(bundle.version, req, personas[i]))
+        if hit is not None and bundle.learned:
+            rankings.append(hit)
+            rankers.append("cached")
+            continue
+        rows = bundle.goal_rows(req.user.primary_goal)
+        s = bundle.fallback.score(rows, req.user.primary_goal, personas[i])
+        top = top_positions(s, _RANK_DEPTH)
+        rankings.append((rows[top], s[top]))
+        rankers.append("heuristic")
+    return personas, rankings, rankers
+
+
+def _respond_degraded(reqs: list[RecommendationRequest], endpoint: str | None) -> list[RecommendationResponse]:
+    """
+    Budget fallback, run on the event loop: the pools may be busy with the slow scoring
+    this replaces, so nothing here waits for them, nor for the bandit lock (arms are the
+    posterior-mean choice instead of a Thompson draw).
+    """
+    t0 = time.perf_counter()
+    bundle = _current_bundle()
+    personas, rankings, rankers = _score_fallback(bundle, reqs)
+    # no _bandit_lock: a checkpoint or reload may hold it for a while; posterior means need no draw
+    bandit, bandit_version = _bandit, _bandit_version
+    assert bandit is not None
+    X = _bandit_x(np.vstack([user_row(r.user.model_dump()) for r in reqs]),
+                  [r.context.day_of_week for r in reqs], [r.context.hour_bucket for r in reqs], bandit.d)
+    chosen_arms = bandit.choose_mean_batch(X)
+    if endpoint is not None:
+        _stage_seconds.observe(time.perf_counter() - t0, endpoint, "fallback")
+        for ranker in rankers:
+            _degraded_total.inc(endpoint, ranker)
+    return _build_responses(bundle, bandit_version, reqs, personas, rankings, chosen_arms, rankers, degraded=True)
+
+
+def _budget_seconds(reqs: list[RecommendationRequest]) -> float | None:
+    """Tightest per-request budget, else LATENCY_BUDGET_MS; None = no budget."""
+    budgets = [r.budget_ms for r in reqs if r.budget_ms is not None]
+    ms = min(budgets) if budgets else LATENCY_BUDGET_MS
+    return ms / 1000.0 if ms and ms > 0 else None
+
+
+async def _rank_and_choose(reqs: list[RecommendationRequest], endpoint: str | None = None,
+                           deadline: float | None = None) -> list[RecommendationResponse]:
+    """
+    Score + choose arms + build responses; stage latencies are recorded under `endpoint` (if given).
+    With a `deadline` (perf_counter time) for the learned scorer, requests it cannot answer in
+    time get the fallback rankings; a miss also diverts budgeted requests for the cooldown.
+    """
+    global _degraded_until
+    loop = asyncio.get_running_loop()
+    scoring_pool, sampling_pool = _executors()
+    if deadline is not None and time.monotonic() < _degraded_until:
+        return _respond_degraded(reqs, endpoint)
+    t0 = time.perf_counter()
+    scoring = loop.run_in_executor(scoring_pool, _score_requests, reqs)
+    try:
+        if deadline is None:
+            version, personas, rankings, timings = await scoring
+        else:
+            # on timeout, queued work is cancelled; running work completes and fills the cache
+            version, personas, rankings, timings = await asyncio.wait_for(
+                scoring, timeout=max(0.0, deadline - time.perf_counter()))
+    except asyncio.TimeoutError:
+        _degraded_until = time.monotonic() + DEGRADE_COOLDOWN_SECONDS
+        return _respond_degraded(reqs, endpoint)
+    if endpoint is not None:
+        for stage, seconds in timings.items():
+            _stage_seconds.observe(seconds, endpoint, stage)
+        # time spent queued for (or shipping data to) the scoring pool
+        _stage_seconds.observe(max(0.0, time.perf_counter() - t0 - sum(timings.values())),
+                               endpoint, "executor_wait")
+    bundle = _recent_bundles.get(version)
+    if bundle is None:
+        # scoring worker still on an artifact set this process no longer holds: rescore here
+        bundle = _current_bundle()
+        personas, rankings = await loop.run_in_executor(sampling_pool, _score_with, bundle, reqs)
+
+    bandit_version, chosen_arms = await loop.run_in_executor(
+        sampling_pool, _choose_arms,
+        user_block(pd.DataFrame([r.user.model_dump() for r in reqs])),
+        [r.context.day_of_week for r in reqs],
+        [r.context.hour_bucket for r in reqs],
+        endpoint,
     )
+    return _build_responses(bundle, bandit_version, reqs, personas, rankings, chosen_arms)
 
 
-@app.post("/feedback")
-def feedback(fb: Feedback):
-    _ensure_loaded()
+async def _admit(reqs: list[RecommendationRequest]) -> float | None:
+    """Load artifacts if needed and record the profiles; returns the learned scorer's deadline (None = no budget)."""
+    budget = _budget_seconds(reqs)
+    deadline = None if budget is None else time.perf_counter() + budget * LATENCY_BUDGET_SCORING_SHARE
+    if _bundle is None or _bandit is None or _users is None:
+        await run_in_threadpool(_ensure_loaded)
+    assert _users is not None
+    if len(reqs) == 1:
+        _users.upsert(reqs[0].user.model_dump())  # one row, no pandas: cheap enough for the event loop
+    else:
+        await run_in_threadpool(_users.upsert_many, [r.user.model_dump() for r in reqs])
+    return deadline
+
+
+async def _recommend_many(reqs: list[RecommendationRequest], endpoint: str) -> list[RecommendationResponse]:
+    """Score a list of requests with one persona pass and one learned-scorer call, off the event loop."""
+    return await _rank_and_choose(reqs, endpoint, await _admit(reqs))
+
+
+async def _flush_microbatch(items: list[tuple[RecommendationRequest, float | None]]) -> list[RecommendationResponse]:
+    """
+    Score coalesced /recommendations calls together. A batch holds calls with the same budget,
+    so its earliest deadline is at most the batching wait ahead of any member's own.
+    """
+    _microbatch_size.observe(len(items))
+    deadlines = [d for _, d in items if d is not None]
+    return await _rank_and_choose([r for r, _ in items], "recommendations", min(deadlines) if deadlines else None)
+
+
+# calls are batched per budget: a tight budget must not degrade calls that allow more time
+_batcher = (MicroBatcher(_flush_microbatch, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS / 1000.0)
+            if MICROBATCH_MAX_SIZE > 1 and MICROBATCH_MAX_WAIT_MS > 0 else None)
+
+
+async def _recommend_one(req: RecommendationRequest) -> RecommendationResponse:
+    deadline = await _admit([req])
+    if _batcher is None:
+        return (await _rank_and_choose([req], "recommendations", deadline))[0]
+    return await _batcher.submit((req, deadline), group=_budget_seconds([req]))
+
+
+# ---------- Startup: eager load, warmup, probes ----------
+
+def _warmup_requests(bundle: ModelBundle) -> list[RecommendationRequest]:
+    """Synthetic requests covering every goal pool and both hour buckets (not added to the user store)."""
+    example = UserProfile.Config.json_schema_extra["example"]
+    goals = sorted({_norm_goal(g) for g in bundle.content["goal_tag"].unique()}) or [str(example["primary_goal"])]
+    reqs = []
+    for i in range(WARMUP_REQUESTS):
+        user = UserProfile.model_validate({**example, "user_id": f"__warmup_{i}", "primary_goal": goals[i % len(goals)],
+                                           "chronotype": ("morning", "evening")[i // len(goals) % 2]})
+        ctx = RequestContext(day_of_week=i % 7, hour_bucket=("morning", "evening")[i % 2])
+        reqs.append(RecommendationRequest(user=user, context=ctx, top_k=5))
+    return reqs
+
+
+def _install_fallback() -> bool:
+    """
+    At startup, serve heuristic rankings (persona model + catalog only) while the learned
+    scorer loads. Returns True if the learned bundle still has to be loaded.
+    """
+    with _load_lock:
+        if _bundle is not None or not has_learned_scorer(ARTIFACTS_DIR):
+            return False
+        _install_bundle(ModelBundle.load(DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH,
+                                         SHARED_STATE_DIR, learned=False))
+        return True
+
+
+def _install_learned() -> None:
+    """Replace the startup fallback by the full bundle (outside _load_lock: requests keep flowing)."""
+    with _reload_lock:
+        _install_bundle(ModelBundle.load(DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH, SHARED_STATE_DIR))
+
+
+async def _warm_start() -> None:
+    """Load all artifacts once, then push synthetic traffic through the scoring path."""
+    _startup["state"] = "loading"
+    t0 = time.perf_counter()
+    try:
+        pending = await run_in_threadpool(_install_fallback)
+        await run_in_threadpool(_ensure_loaded)
+        if pending:
+            await run_in_threadpool(_install_learned)
+        _startup["load_s"] = round(time.perf_counter() - t0, 4)
+
+        _startup["state"] = "warming"
+        t1 = time.perf_counter()
+        reqs = _warmup_requests(_current_bundle())
+        if reqs:
+            # batched path once, then single requests concurrently so every pool worker is warm
+            await _rank_and_choose(reqs)
+            await asyncio.gather(*(_rank_and_choose([r]) for r in reqs))
+        _startup.update(warmup_s=round(time.perf_counter() - t1, 4), warmup_requests=2 * len(reqs),
+                        state="ready")
+    except Exception as e:  # keep serving /healthz; /readyz reports the failure
+        _startup.update(state="failed", error=f"{type(e).__name__}: {e}")
+
+
+def _shutdown() -> None:
+    global _scoring_pool, _sampling_pool
+    if _replica is not None:
+        try:
+            _replica.push()  # hand over what this replica learned before it goes away
+        except OSError:
+            pass
+    if _journal is not None:
+        _journal.close()
+    if isinstance(_bandit, SharedLinTSBandit):
+        _bandit.flush()
+    for pool in {id(p): p for p in (_scoring_pool, _sampling_pool) if p is not None}.values():
+        pool.shutdown(wait=True)
+    _scoring_pool = _sampling_pool = None
+
+
+def _status() -> dict:
+    return {**_startup, "uptime_s": round(time.monotonic() - _started_at, 3), "model_version": _model_version()}
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up; includes load/warmup progress and durations."""
+    return _status()
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 only once artifacts are loaded and warmup has finished, 503 before that."""
+    st = _status()
+    if st["state"] != "ready":
+        return JSONResponse(status_code=503, content=st)
+    return st
+
+
+# ---------- Hot reload: load on a side thread, validate, swap atomically ----------
+
+def _validate_bundle(bundle: ModelBundle) -> None:
+    """Score the warmup requests with a candidate bundle (uncached); raise ValueError if unusable."""
+    reqs = _warmup_requests(bundle)
+    personas, rankings = _score_with(bundle, reqs, use_cache=False)
+    n_personas = getattr(bundle.persona[1], "n_clusters", None)
+    for req, p, (positions, scores) in zip(reqs, personas, rankings):
+        if positions.size == 0:
+            raise ValueError(f"empty candidate pool for goal '{req.user.primary_goal}'")
+        if not np.all(np.isfinite(scores)):
+            raise ValueError("scorer returned non-finite scores")
+        if bundle.learned and (scores.min() < 0.0 or scores.max() > 1.0):
+            raise ValueError("learned scorer returned scores outside [0, 1]")
+        if n_personas is not None and not 0 <= p < n_personas:
+            raise ValueError(f"persona {p} outside 0..{n_personas - 1}")
+
+
+def _validate_bandit(bandit: LinTSBandit) -> None:
+    if sorted(bandit.arms) != sorted(ARMS):
+        raise ValueError(f"bandit arms {bandit.arms} do not match configured arms {ARMS}")
+    assert _users is not None
+    block = _users.user_context(_users.row(0)["user_id"]) if len(_users) else None
+    if block is None:
+        block = np.zeros((1, USER_DIM))
+    X = _bandit_x(np.repeat(np.atleast_2d(block), 2, axis=0), [0, 6], ["morning", "evening"], d=bandit.d)
+    if not np.all(np.isfinite(bandit._sample_thetas(len(X)))):
+        raise ValueError("bandit posterior is not finite")
+    bandit.choose_batch(X)
+
+
+def _install_bandit(bandit: LinTSBandit, fingerprint: str) -> None:
+    global _bandit, _bandit_version, _journal
+    if isinstance(_bandit, SharedLinTSBandit):
+        # other workers pick the new statistics up from the shared region
+        _bandit.assign(bandit)
+        assert _journal is not None
+        _journal.checkpoint()
+        _bandit_version = _short_id(fingerprint)
+        return
+    old = _journal
+    if old is not None:
+        old.stop()  # no more background checkpoints of the old state over the new snapshot
+    journal = _start_journal(bandit)
+    with _bandit_lock:
+        _bandit, _bandit_version, _journal = bandit, _short_id(fingerprint), journal
+    if old is not None:
+        old.close(checkpoint=False)
+
+
+def _adopted_trained_id() -> str | None:
     assert _bandit is not None
+    return _bandit.region_trained_id() if isinstance(_bandit, SharedLinTSBandit) else _bandit.trained_id
+
+
+def _reload(force: bool = False) -> dict:
+    """
+    Reload whatever changed on disk: the scorer bundle when any of its files changed, the
+    bandit when the trained copy next to BANDIT_PATH (written by scripts/train_bandit.py,
+    never by the journal) holds a training run the live bandit does not descend from.
+    Candidates are loaded and validated on the calling thread while the old ones keep serving.
+    """
+    global _trained_seen
+    _ensure_loaded()
+    with _reload_lock:
+        t0 = time.perf_counter()
+        swapped: list[str] = []
+        try:
+            current = _current_bundle()
+            fps = artifact_fingerprints(DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH)
+            if force or fps != current.fingerprints:
+                candidate = ModelBundle.load(DATA_DIR, ARTIFACTS_DIR, ENCODER_PATH, PERSONA_MODEL_PATH, SHARED_STATE_DIR)
+                _validate_bundle(candidate)
+                _install_bundle(candidate)
+                swapped.append("scorer")
+            elif current_generation(TOPK_DIR) != current.topk_generation:
+                # same artifacts, newly materialized table (process workers reattach via recycling)
+                _install_bundle(current)
+                if current.topk is not None:
+                    swapped.append("topk")
+
+            trained = trained_path_for(BANDIT_PATH)
+            fingerprint = artifact_fingerprint(trained) if trained.exists() else None
+            # with replicas the merged global model is the source of truth, not the trained copy
+            if _replica is None and fingerprint is not None and fingerprint != _trained_seen:
+                bandit = LinTSBandit.load(trained, replay_log=False)
+                if bandit.trained_id != _adopted_trained_id():
+                    _validate_bandit(bandit)
+                    _install_bandit(bandit, fingerprint)
+                    swapped.append("bandit")
+                _trained_seen = fingerprint
+        except Exception as e:
+            _reload_status.update(rejected=_reload_status["rejected"] + 1, last_error=f"{type(e).__name__}: {e}")
+            raise
+        if swapped:
+            _reload_status.update(reloads=_reload_status["reloads"] + 1,
+                                  last_reload_s=round(time.perf_counter() - t0, 4), last_error=None)
+        return {"swapped": swapped, "model_version": _model_version(), **_reload_status}
+
+
+def _watch_artifacts(interval_s: float) -> None:
+    """Poll artifact fingerprints and reload on change (MODEL_RELOAD_POLL_SECONDS > 0)."""
+    while not _stop_watch.wait(interval_s):
+        if _bundle is None:
+            continue  # still starting up
+        try:
+            _reload()
+        except Exception:  # also recorded in _reload_status; keep serving the current version
+            logger.exception("artifact reload failed")
+
+
+def _sync_replica_loop(interval_s: float) -> None:
+    """Push this replica's delta and rebase on the merged global model every BANDIT_SYNC_SECONDS."""
+    while not _stop_watch.wait(interval_s):
+        if _replica is None:
+            continue  # still starting up
+        try:
+            _replica.sync()
+        except Exception:  # next round retries; unsynced updates stay in the bandit
+            logger.exception("bandit replica sync failed")
+
+
+@app.post("/admin/bandit/sync")
+async def admin_bandit_sync():
+    """Export this replica's bandit delta now and rebase on the global model if a newer one exists."""
+    await run_in_threadpool(_ensure_loaded)
+    if _replica is None:
+        raise HTTPException(status_code=409, detail="BANDIT_REPLICA_ID is not set; replica sync is off")
+    return await run_in_threadpool(_replica.sync)
+
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False):
+    """Load changed artifacts on a worker thread, validate on sample requests, then swap them in."""
+    try:
+        return await run_in_threadpool(_reload, force)
+    except Exception as e:
+        raise HTTPException(status_code=409, detail=f"reload rejected, still serving "
+                                                    f"{_model_version()}: {type(e).__name__}: {e}")
+
+
+@app.get("/admin/model")
+def admin_model():
+    """Live model version, the artifact fingerprints behind it and reload counters."""
+    return {"model_version": _model_version(),
+            "scorer": None if _bundle is None else "learned" if _bundle.learned else "heuristic",
+            "fingerprints": _bundle.fingerprints if _bundle is not None else {},
+            "topk": _topk_status(),
+            **_reload_status}
+
+
+def _topk_status() -> dict | None:
+    table = _bundle.topk if _bundle is not None else None
+    if table is None:
+        return None
+    return {"generation": table.generation, "users": len(table), "depth": table.depth}
 
-    if fb.arm not in ARMS:
-        raise HTTPException(status_code=400, detail=f"Invalid arm '{fb.arm}'. Allowed: {ARMS}")
 
-    users_csv = pd.read_csv(DATA_DIR / "users.csv")
-    urow = users_csv[users_csv["user_id"] == fb.user_id]
-    if urow.empty:
+@app.post("/recommendations", response_model=RecommendationResponse)
+async def recommend(req: RecommendationRequest):
+    with _track("recommendations"):
+        res = await _recommend_one(req)
+        with _stage_seconds.time("recommendations", "serialization"):
+            return Response(res.model_dump_json(), media_type="application/json")
+
+
+@app.post("/recommendations/batch", response_model=BatchRecommendationResponse)
+async def recommend_batch(req: BatchRecommendationRequest):
+    """Score many users at once; per-batch overhead is paid once instead of once per user."""
+    with _track("recommendations_batch"):
+        res = BatchRecommendationResponse(results=await _recommend_many(req.requests, "recommendations_batch"))
+        with _stage_seconds.time("recommendations_batch", "serialization"):
+            return Response(res.model_dump_json(), media_type="application/json")
+
+
+def _record_feedback(fb: Feedback) -> None:
+    assert _users is not None
+    block = _users.user_context(fb.user_id)
+    if block is None:
         raise HTTPException(status_code=404, detail="user_id not found")
+    # Update + append to the feedback log under the bandit lock (held across the lookup so a
+    # concurrent bandit swap cannot hand us a closed journal); snapshots are checkpointed
+    # in the background
+    x = _bandit_x(block, fb.day_of_week, fb.hour_bucket)[0]
+    with _stage_seconds.time("feedback", "bandit_save"), _bandit_lock:
+        assert _journal is not None
+        _journal.record(fb.arm, float(fb.reward), x)
+
+
+@app.post("/feedback")
+async def feedback(fb: Feedback):
+    with _track("feedback"):
+        await run_in_threadpool(_ensure_loaded)
+
+        if fb.arm not in ARMS:
+            raise HTTPException(status_code=400, detail=f"Invalid arm '{fb.arm}'. Allowed: {ARMS}")
+
+        await run_in_threadpool(_record_feedback, fb)
+        return {"status": "ok", "updated_arm": fb.arm, "model_version": _model_version()}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss/eviction counters of the segment-keyed ranking cache."""
+    return {**_rank_cache.stats(), "model_version": _model_version()}
+
 
-    x = _user_vector_10(urow, fb.day_of_week, fb.hour_bucket)
-    if _bandit.d != len(x):
-        x = np.pad(x, (0, _bandit.d - len(x))) if len(x) < _bandit.d else x[: _bandit.d]
-    _bandit.update(fb.arm, float(fb.reward), x)
-    _bandit.save(BANDIT_PATH)
-    return {"status": "ok", "updated_arm": fb.arm}
+@app.get("/metrics/runtime", response_class=PlainTextResponse)
+def runtime_metrics():
+    """Prometheus text exposition: request counts/latency, in-flight gauges, per-stage latency, cache stats."""
+    return PlainTextResponse(_registry.render(), media_type=telemetry.CONTENT_TYPE)
 
 
 @app.get("/metrics")
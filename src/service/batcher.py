@@ -0,0 +1,83 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Hashable, Sequence
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submissions into one call. An item of an idle group (no batch in
+    flight) is flushed at once; otherwise it opens a batch, which is flushed when the group
+    goes idle, `max_wait_s` later or as soon as it holds `max_size` items, whichever is first.
+    `flush(items)` returns one result per item, in order; each caller gets its own result
+    (or the exception the flush raised; a cancelled flush cancels its callers and those queued
+    behind them). Runs on the event loop, no locking needed.
+    """
+    def __init__(self, flush: Callable[[list], Awaitable[Sequence[Any]]], max_size: int = 32,
+                 max_wait_s: float = 0.002):
+        self._flush = flush
+        self.max_size = max(1, int(max_size))
+        self.max_wait_s = max(0.0, float(max_wait_s))
+        self._pending: dict[Hashable, list[tuple[Any, asyncio.Future]]] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self._running: set[asyncio.Task] = set()
+        self._inflight: dict[Hashable, int] = {}  # batches being flushed, per group
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any, group: Hashable = None) -> Any:
+        """Result for `item`; only items of the same `group` are batched together."""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), group)  # futures and timers belong to one event loop
+        fut = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, fut))
+        if len(batch) >= self.max_size or not self._inflight.get(key):
+            self._dispatch(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_wait_s, self._dispatch, key)
+        return await fut
+
+    def _dispatch(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            self._inflight[key] = self._inflight.get(key, 0) + 1
+            task = asyncio.ensure_future(self._run(key, batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = list(await self._flush([item for item, _ in batch]))
+            if len(results) != len(batch):
+                raise RuntimeError(f"flush returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            # shutdown: nothing will answer this batch or the one queued behind it
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            for _, fut in batch + self._pending.pop(key, []):
+                fut.cancel()
+            raise
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():  # caller may have gone away (cancelled)
+                    fut.set_exception(e)
+            return
+        finally:
+            self._inflight[key] -= 1
+            if not self._inflight[key]:
+                del self._inflight[key]
+                self._dispatch(key)  # what queued up behind this batch goes now
+        for (_, fut), res in zip(batch, results):
+            if not fut.done():
+                fut.set_result(res)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch": round(self.items / self.batches, 3) if self.batches else 0.0,
+                "max_size": self.max_size, "max_wait_ms": self.max_wait_s * 1000}
@@ -0,0 +1,169 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from ..data_store import has_table, read_table, source_fingerprint
+from ..features.persona_clustering import load as load_persona_model, assign_personas, PersonaAssigner
+from ..models.ltr import LTRModel
+from ..models.recommender import HeuristicScorer
+from ..models.compiled_ltr import CompiledLTR, artifact_fingerprint
+
+if TYPE_CHECKING:
+    from .topk import TopKTable
+
+
+def artifact_fingerprints(data_dir: Path, artifacts_dir: Path,
+                          encoder_path: Path, persona_path: Path) -> dict[str, str]:
+    """
+    size:mtime of every file a bundle is built from (missing optional files are skipped); for
+    the datasets, of the columnar table when that is what gets read, else of the CSV.
+    """
+    paths = {
+        "encoder": Path(encoder_path),
+        "personas": Path(persona_path),
+        "ltr": Path(artifacts_dir) / "ltr_model.joblib",
+        "ltr_compiled": Path(artifacts_dir) / "ltr_compiled.npz",
+    }
+    out = {k: artifact_fingerprint(p) for k, p in paths.items() if p.exists()}
+    for key, name in (("content", "content_catalog"), ("interactions", "interactions")):
+        fp = source_fingerprint(data_dir, name)
+        if fp is not None:
+            out[key] = fp
+    return out
+
+
+def version_id(fingerprints: dict[str, str]) -> str:
+    raw = "|".join(f"{k}={v}" for k, v in sorted(fingerprints.items()))
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def shared_array(path: Path, arr: np.ndarray) -> np.ndarray:
+    """
+    Read-only memory map of `arr` at `path`, written first if no file with that shape exists.
+    Worker processes mapping the same file share one copy in the page cache.
+    """
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp, arr)
+        os.replace(tmp, path)
+    mapped = np.load(path, mmap_mode="r")
+    if mapped.shape != arr.shape or mapped.dtype != arr.dtype:
+        return arr
+    return mapped
+
+
+LEARNED_KEYS = ("ltr", "ltr_compiled")  # fingerprints of the learned scorer files
+
+
+def has_learned_scorer(artifacts_dir: Path) -> bool:
+    return (Path(artifacts_dir) / "ltr_model.joblib").exists() or (Path(artifacts_dir) / "ltr_compiled.npz").exists()
+
+
+def load_ltr(artifacts_dir: Path) -> LTRModel | CompiledLTR | HeuristicScorer:
+    """
+    Prefer the NumPy-compiled scorer when it was exported from the current ltr_model.joblib
+    (a tree model keeps the booster for large batches); without any trained scorer, the
+    cold-start heuristic.
+    """
+    maybe = Path(artifacts_dir) / "ltr_model.joblib"
+    compiled = Path(artifacts_dir) / "ltr_compiled.npz"
+    if compiled.exists():
+        engine = CompiledLTR.load(compiled)
+        if not maybe.exists():
+            return engine
+        if engine.source == artifact_fingerprint(maybe):
+            if engine.kind == "xgboost":
+                engine.native = LTRModel(maybe)
+            return engine
+    if maybe.exists():
+        return LTRModel(maybe)
+    return HeuristicScorer()
+
+
+def load_content(data_dir: Path) -> pd.DataFrame:
+    """Content catalog with a popularity prior (CTR per content_id) from interactions if available."""
+    content = read_table(data_dir, "content_catalog", categorical=False)
+    if has_table(data_dir, "interactions"):
+        inter = read_table(data_dir, "interactions", columns=["content_id", "reward"])
+        pop = (
+            inter.groupby("content_id", observed=True)["reward"]
+            .mean()
+            .rename("popularity")
+            .reset_index()
+            .astype({"content_id": str})
+        )
+        content = content.merge(pop, on="content_id", how="left")
+        content["popularity"] = content["popularity"].fillna(0.0)
+    else:
+        content["popularity"] = 0.0
+    return content
+
+
+class ModelBundle:
+    """
+    Everything the scoring path reads (persona model, content catalog, learned scorer),
+    loaded together and treated as immutable. The service swaps whole bundles; a request
+    keeps the bundle it started with, so it never mixes artifacts from two versions.
+    """
+    def __init__(self, persona, content: pd.DataFrame, ltr: LTRModel | CompiledLTR | HeuristicScorer,
+                 fingerprints: dict[str, str] | None = None, shared_dir: Path | None = None):
+        self.persona = persona  # tuple(preprocessor, kmeans)
+        try:
+            self.assigner: PersonaAssigner | None = PersonaAssigner(*persona)
+        except ValueError:
+            self.assigner = None  # unexpected preprocessor layout: keep the sklearn path
+        self.content = content.reset_index(drop=True)
+        self.ltr = ltr
+        self.ltr.prepare_catalog(self.content)
+        self.learned = not isinstance(ltr, HeuristicScorer)  # False: cold-start heuristic ranking
+        # cheap ranking over the same catalog for requests that cannot wait for the learned scorer
+        self.fallback = ltr if isinstance(ltr, HeuristicScorer) else HeuristicScorer()
+        if self.learned:
+            self.fallback.prepare_catalog(self.content)
+        self.fingerprints = dict(fingerprints or {})
+        self.version = version_id(self.fingerprints)
+        scorer = self.ltr
+        if shared_dir is not None and not isinstance(scorer, HeuristicScorer) and scorer._content_X is not None:
+            # the pre-transformed catalog is the largest array; one copy for all workers
+            scorer._content_X = shared_array(Path(shared_dir) / f"catalog_X-{self.version}.npy",
+                                             scorer._content_X)
+        self._pool_rows: dict[str, np.ndarray] = {}  # goal -> catalog positions
+        # materialized top-K table built for this version (attached by the service, may stay None)
+        self.topk: TopKTable | None = None
+        self.topk_generation: str | None = None  # table generation last checked against this bundle
+
+    @classmethod
+    def load(cls, data_dir: Path, artifacts_dir: Path, encoder_path: Path, persona_path: Path,
+             shared_dir: Path | None = None, learned: bool = True) -> "ModelBundle":
+        """learned=False skips the learned scorer (heuristic ranking, fast to load)."""
+        # fingerprint first: a file replaced mid-load then shows up as changed on the next check
+        fps = artifact_fingerprints(data_dir, artifacts_dir, encoder_path, persona_path)
+        persona = load_persona_model(encoder_path, persona_path)
+        if not learned:
+            fps = {k: v for k, v in fps.items() if k not in LEARNED_KEYS}
+            return cls(persona, load_content(data_dir), HeuristicScorer(), fps, shared_dir)
+        return cls(persona, load_content(data_dir), load_ltr(artifacts_dir), fps, shared_dir)
+
+    def personas(self, profiles: list[dict]) -> list[int]:
+        """Persona per profile dict (compiled nearest-centroid, one pass for the whole list)."""
+        if self.assigner is not None:
+            return self.assigner.assign(profiles)
+        pre, km = self.persona
+        return assign_personas(pd.DataFrame(profiles), pre, km)["persona"].astype(int).tolist()
+
+    def goal_rows(self, goal: str) -> np.ndarray:
+        """Catalog positions of the candidate pool (goal-filter; if empty, fall back to all)."""
+        rows = self._pool_rows.get(goal)
+        if rows is None:
+            rows = np.flatnonzero(self.content["goal_tag"].to_numpy() == goal)
+            if rows.size == 0:
+                rows = np.arange(len(self.content))
+            self._pool_rows[goal] = rows
+        return rows
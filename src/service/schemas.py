@@ -4,6 +4,8 @@ from pydantic import BaseModel, Field
 
 # ---------- Core request/response models ----------
 
+Ranker = Literal["learned", "cached", "heuristic"]  # what ranked a response's items
+
 
 class UserProfile(BaseModel):
     user_id: str
@@ -46,6 +48,7 @@ class RecommendationRequest(BaseModel):
     user: UserProfile
     context: RequestContext
     top_k: int = Field(default=5, ge=1, le=50)
+    budget_ms: float | None = Field(default=None, gt=0, le=60_000)  # overrides LATENCY_BUDGET_MS
 
     class Config:
         json_schema_extra = {
@@ -72,6 +75,22 @@ class RecommendationResponse(BaseModel):
     chosen_arm: str
     items: List[RecommendationItem]
     rationale: str
+    model_version: str  # "<scorer bundle>+<bandit>" that produced this response
+    ranker: Ranker = "learned"
+    degraded: bool = False  # learned scorer skipped to meet the latency budget
+
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest] = Field(min_length=1, max_length=5000)
+
+    class Config:
+        json_schema_extra = {
+            "example": {"requests": [RecommendationRequest.Config.json_schema_extra["example"]]}
+        }
+
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse]
 
 
 class Feedback(BaseModel):
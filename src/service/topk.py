@@ -0,0 +1,190 @@
+from __future__ import annotations
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from .bundle import ModelBundle
+from .schemas import UserProfile
+from .user_store import PROFILE_COLS
+
+# Materialized top-K rankings for every known user in every request context.
+#   <topk_dir>/CURRENT              name of the live generation (replaced atomically)
+#   <topk_dir>/<generation>/
+#     items.npy        int32   (users, contexts, depth) catalog positions, -1 once the pool runs out
+#     scores.npy       float32 (users, contexts, depth)
+#     personas.npy     int16   (users,)
+#     profile_hash.npy uint64  (users,) the profile the rows were scored for
+#     user_ids.npy, catalog_ids.npy, meta.json (bundle version, model/pool fingerprints, depth)
+# The arrays are memory-mapped read-only by the service. A row is served only when the bundle
+# version matches and the request carries the same profile; everything else is scored live.
+
+HOUR_BUCKETS = ("morning", "evening")
+CONTEXTS = tuple((dow, hb) for dow in range(7) for hb in HOUR_BUCKETS)
+MODEL_KEYS = ("encoder", "personas", "ltr", "ltr_compiled")  # any change invalidates every row
+
+
+def context_slot(day_of_week: int, hour_bucket: str) -> int:
+    return int(day_of_week) * len(HOUR_BUCKETS) + HOUR_BUCKETS.index(hour_bucket)
+
+
+def profile_hash(profile: dict) -> int:
+    raw = "|".join(f"{c}={profile.get(c)!r}" for c in PROFILE_COLS[1:])
+    return int.from_bytes(hashlib.blake2b(raw.encode(), digest_size=8).digest(), "little")
+
+
+def pool_hash(bundle: ModelBundle, goal: str) -> str:
+    """Fingerprint of a goal's candidate pool (rows, order and every column incl. popularity)."""
+    pool = bundle.content.iloc[bundle.goal_rows(goal)]
+    return hashlib.sha1(pd.util.hash_pandas_object(pool, index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+
+def current_generation(topk_dir: Path) -> str | None:
+    path = Path(topk_dir) / "CURRENT"
+    if not path.exists():
+        return None
+    return path.read_text(encoding="utf-8").strip() or None
+
+
+class TopKTable:
+    """Read side of one table generation (see module comment)."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.generation = self.path.name
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.version = str(self.meta["version"])
+        self.depth = int(self.meta["depth"])
+        self.items = np.load(self.path / "items.npy", mmap_mode="r")
+        self.scores = np.load(self.path / "scores.npy", mmap_mode="r")
+        self.personas = np.load(self.path / "personas.npy", mmap_mode="r")
+        self.hashes = np.load(self.path / "profile_hash.npy", mmap_mode="r")
+        self.catalog_ids = np.load(self.path / "catalog_ids.npy")
+        self._index = {u: i for i, u in enumerate(np.load(self.path / "user_ids.npy").tolist())}
+
+    @classmethod
+    def open(cls, topk_dir: Path) -> "TopKTable | None":
+        gen = current_generation(topk_dir)
+        if gen is None or not (Path(topk_dir) / gen / "meta.json").exists():
+            return None
+        return cls(Path(topk_dir) / gen)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def row(self, user_id: str) -> int | None:
+        return self._index.get(str(user_id))
+
+    def lookup(self, profile: dict, day_of_week: int, hour_bucket: str,
+               top_k: int) -> tuple[int, np.ndarray, np.ndarray] | None:
+        """(persona, catalog positions, scores) for a known, unchanged profile; None -> score live."""
+        i = self.row(profile["user_id"])
+        if i is None or int(self.hashes[i]) != profile_hash(profile):
+            return None
+        c = context_slot(day_of_week, hour_bucket)
+        positions = self.items[i, c]
+        n = int(np.count_nonzero(positions >= 0))
+        if n == self.depth and top_k > n:
+            return None  # asks for more than was materialized
+        return int(self.personas[i]), positions[:n].astype(np.intp), self.scores[i, c, :n].astype(float)
+
+
+def _profiles(users: pd.DataFrame) -> list[dict]:
+    """Validated, normalized profiles (same types as a request payload); invalid rows are skipped."""
+    users = users.drop_duplicates("user_id", keep="last")
+    cols = [c for c in PROFILE_COLS if c in users.columns]
+    out = []
+    for rec in users[cols].to_dict(orient="records"):
+        try:
+            out.append(UserProfile(**{**rec, "user_id": str(rec["user_id"])}).model_dump())
+        except ValueError:
+            continue
+    return out
+
+
+def materialize(bundle: ModelBundle, users: pd.DataFrame, topk_dir: Path, depth: int = 20,
+                full: bool = False, chunk: int = 64) -> dict:
+    """
+    Build the next table generation for `users` and make it current. Rows of the previous
+    generation are reused when the scorer/persona artifacts are unchanged, the user's profile is
+    unchanged and their goal pool is unchanged (`full=True` rescores everyone). Rows are scored
+    goal by goal, `chunk` users x every context per learned-scorer call.
+    """
+    t0 = time.perf_counter()
+    topk_dir = Path(topk_dir)
+    profiles = _profiles(users)
+    n = len(profiles)
+    goals = np.array([p["primary_goal"] for p in profiles], dtype=object)
+    hashes = np.array([profile_hash(p) for p in profiles], dtype=np.uint64)
+    pools = {g: pool_hash(bundle, g) for g in sorted(set(goals))}
+    model = {k: v for k, v in sorted(bundle.fingerprints.items()) if k in MODEL_KEYS}
+    catalog_ids = bundle.content["content_id"].astype(str).to_numpy()
+
+    items = np.full((n, len(CONTEXTS), depth), -1, dtype=np.int32)
+    scores = np.zeros((n, len(CONTEXTS), depth), dtype=np.float32)
+    personas = np.zeros(n, dtype=np.int16)
+    todo = np.ones(n, dtype=bool)
+
+    previous = current_generation(topk_dir)
+    prev = None if full else TopKTable.open(topk_dir)
+    if prev is not None and prev.depth == depth and prev.meta.get("model") == model:
+        old = np.array([-1 if (j := prev.row(p["user_id"])) is None else j for p in profiles], dtype=np.intp)
+        keep = old >= 0
+        keep[keep] = prev.hashes[old[keep]] == hashes[keep]
+        keep &= np.array([prev.meta["pools"].get(g) == pools[g] for g in goals], dtype=bool)
+        if keep.any():
+            # catalog positions may have moved: map old position -> content_id -> new position
+            new_pos = {c: i for i, c in enumerate(catalog_ids.tolist())}
+            remap = np.array([new_pos.get(c, -1) for c in prev.catalog_ids.tolist()] + [-1], dtype=np.int32)
+            rows = old[keep]
+            items[keep] = remap[prev.items[rows]]  # -1 pads index the trailing -1
+            scores[keep] = prev.scores[rows]
+            personas[keep] = prev.personas[rows]
+            todo &= ~keep
+
+    idx = np.flatnonzero(todo)
+    if idx.size:
+        personas[idx] = bundle.personas([profiles[i] for i in idx])
+        users_df = pd.DataFrame(profiles)
+        dows = np.array([c[0] for c in CONTEXTS])
+        hbs = np.array([c[1] for c in CONTEXTS], dtype=object)
+        for goal in sorted(set(goals[idx])):
+            rows_g = bundle.goal_rows(goal)
+            k = min(depth, len(rows_g))
+            members = idx[goals[idx] == goal]
+            for start in range(0, len(members), chunk):
+                part = members[start:start + chunk]
+                rep = np.repeat(part, len(CONTEXTS))
+                s, _ = bundle.ltr.predict_catalog([rows_g] * len(rep), users_df.iloc[rep],
+                                                  np.tile(dows, len(part)).tolist(), np.tile(hbs, len(part)).tolist(),
+                                                  personas[rep].tolist())
+                s = s.reshape(len(part), len(CONTEXTS), len(rows_g))
+                order = np.argsort(-s, axis=2, kind="stable")[..., :k]  # same order as the live path
+                items[part, :, :k] = rows_g[order]
+                scores[part, :, :k] = np.take_along_axis(s, order, axis=2)
+
+    gen = f"{bundle.version}-{os.urandom(4).hex()}"
+    out = topk_dir / gen
+    out.mkdir(parents=True)
+    np.save(out / "items.npy", items)
+    np.save(out / "scores.npy", scores)
+    np.save(out / "personas.npy", personas)
+    np.save(out / "profile_hash.npy", hashes)
+    np.save(out / "user_ids.npy", np.array([p["user_id"] for p in profiles], dtype=str))
+    np.save(out / "catalog_ids.npy", catalog_ids.astype(str))
+    summary = {"generation": gen, "version": bundle.version, "users": n, "recomputed": int(idx.size),
+               "reused": int(n - idx.size), "depth": depth, "seconds": round(time.perf_counter() - t0, 3)}
+    (out / "meta.json").write_text(json.dumps({**summary, "model": model, "pools": pools}), encoding="utf-8")
+
+    tmp = topk_dir / "CURRENT.tmp"
+    tmp.write_text(gen, encoding="utf-8")
+    os.replace(tmp, topk_dir / "CURRENT")
+    # keep the previous generation for readers still mapping it
+    for d in topk_dir.iterdir():
+        if d.is_dir() and d.name not in (gen, previous):
+            shutil.rmtree(d, ignore_errors=True)
+    return summary
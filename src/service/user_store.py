@@ -0,0 +1,91 @@
+from __future__ import annotations
+from pathlib import Path
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ..data_store import has_table, read_table
+from ..features.bandit_context import user_block, user_row, USER_DIM
+
+PROFILE_COLS = [
+    "user_id", "age", "gender", "work_pattern", "primary_goal",
+    "baseline_activity_min_per_day", "premium", "push_opt_in", "chronotype", "language",
+]
+
+
+class UserStore:
+    """
+    In-memory user table loaded once, with a hash index user_id -> row.
+    Keeps the user part of the bandit context precomputed per row so /feedback
+    only has to append (hour_bucket, day_of_week). Upserts are O(1) amortized.
+    """
+    def __init__(self, users: pd.DataFrame | None = None):
+        self._lock = threading.Lock()
+        self._index: dict[str, int] = {}
+        self._rows: list[dict] = []
+        self._ctx = np.empty((0, USER_DIM), dtype=float)
+        if users is not None and not users.empty:
+            users = users.drop_duplicates("user_id", keep="last")
+            cols = [c for c in PROFILE_COLS if c in users.columns]
+            self._rows = users[cols].to_dict(orient="records")
+            for r in self._rows:
+                r["user_id"] = str(r["user_id"])
+            self._index = {r["user_id"]: i for i, r in enumerate(self._rows)}
+            self._ctx = user_block(users)
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "UserStore":
+        path = Path(path)
+        return cls(pd.read_csv(path) if path.exists() else None)
+
+    @classmethod
+    def load(cls, data_dir: Path) -> "UserStore":
+        """users dataset from DATA_DIR (columnar table if present, else users.csv); empty if missing."""
+        if not has_table(data_dir, "users"):
+            return cls()
+        return cls(read_table(data_dir, "users", categorical=False))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, user_id: str) -> bool:
+        return str(user_id) in self._index
+
+    def get(self, user_id: str) -> dict | None:
+        i = self._index.get(str(user_id))
+        return None if i is None else dict(self._rows[i])
+
+    def user_context(self, user_id: str) -> np.ndarray | None:
+        """Precomputed user block of the bandit context (see features.bandit_context)."""
+        i = self._index.get(str(user_id))
+        return None if i is None else self._ctx[i]
+
+    def row(self, i: int) -> dict:
+        return dict(self._rows[i])
+
+    def upsert(self, profile: dict) -> None:
+        """Insert a new user or overwrite an existing one (e.g. from a /recommendations payload)."""
+        rec = {c: profile[c] for c in PROFILE_COLS if c in profile}
+        rec["user_id"] = str(rec["user_id"])
+        ctx = user_row(rec)
+        with self._lock:
+            i = self._index.get(rec["user_id"])
+            if i is not None:
+                if self._rows[i] == rec:
+                    return
+                self._rows[i] = rec
+                self._ctx[i] = ctx
+                return
+            n = len(self._rows)
+            if n == self._ctx.shape[0]:
+                grown = np.empty((max(16, 2 * n), USER_DIM), dtype=float)
+                grown[:n] = self._ctx[:n]
+                self._ctx = grown
+            self._ctx[n] = ctx
+            self._rows.append(rec)
+            self._index[rec["user_id"]] = n
+
+    def upsert_many(self, profiles: list[dict]) -> None:
+        for p in profiles:
+            self.upsert(p)
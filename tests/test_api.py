@@ -3,6 +3,7 @@ import importlib
 import pandas as pd
 import numpy as np
 import joblib
+import pytest
 
 from fastapi.testclient import TestClient
 
@@ -84,6 +85,16 @@ def _write_minimal_data(root: Path) -> None:
     pipe = Pipeline([("pre", preproc), ("clf", LogisticRegression(max_iter=200))]).fit(X, y)
     joblib.dump(pipe, cfg.ARTIFACTS_DIR / "ltr_model.joblib")
 
+@pytest.fixture
+def api_paths(tmp_path: Path, monkeypatch) -> Path:
+    """Point data + artifact paths at tmp_path (reload the api module afterwards)."""
+    monkeypatch.setattr(cfg, "DATA_DIR", tmp_path / "data", raising=False)
+    monkeypatch.setattr(cfg, "ARTIFACTS_DIR", tmp_path / "artifacts", raising=False)
+    monkeypatch.setattr(cfg, "PERSONA_MODEL_PATH", tmp_path / "artifacts" / "kmeans_personas.joblib", raising=False)
+    monkeypatch.setattr(cfg, "ENCODER_PATH", tmp_path / "artifacts" / "preprocess_encoder.joblib", raising=False)
+    monkeypatch.setattr(cfg, "BANDIT_PATH", tmp_path / "artifacts" / "bandit_lin_ts.joblib", raising=False)
+    return tmp_path
+
 def test_api_end_to_end(tmp_path: Path, monkeypatch) -> None:
     monkeypatch.setattr(cfg, "DATA_DIR", tmp_path / "data", raising=False)
     monkeypatch.setattr(cfg, "ARTIFACTS_DIR", tmp_path / "artifacts", raising=False)
@@ -131,3 +142,444 @@ def test_api_end_to_end(tmp_path: Path, monkeypatch) -> None:
     r3 = client.post("/feedback", json=fb)
     assert r3.status_code == 200
     assert (tmp_path / "artifacts" / "bandit_lin_ts.joblib").exists()
+
+def test_batch_recommendations_match_single(tmp_path: Path, api_paths) -> None:
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    users = pd.read_csv(tmp_path / "data" / "users.csv")
+    reqs = [
+        {"user": u, "context": {"day_of_week": i % 7, "hour_bucket": "morning" if i % 2 else "evening"}, "top_k": 3}
+        for i, u in enumerate(users.to_dict(orient="records"))
+    ]
+
+    r = client.post("/recommendations/batch", json={"requests": reqs})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert len(results) == len(reqs)
+
+    st = client.get("/cache/stats").json()
+    assert st["misses"] == len(reqs) and st["size"] == len(reqs)
+
+    # score each request on its own (cold cache) and compare with the stacked batch scores
+    api_module._rank_cache.clear()
+    for req, res in zip(reqs, results):
+        single = client.post("/recommendations", json=req).json()
+        assert res["persona"] == single["persona"]
+        assert res["chosen_arm"] in cfg.ARMS
+        assert [it["content_id"] for it in res["items"]] == [it["content_id"] for it in single["items"]]
+        assert np.allclose([it["score"] for it in res["items"]], [it["score"] for it in single["items"]])
+
+    # repeated segments are served from the cache
+    hits = client.get("/cache/stats").json()["hits"]
+    assert client.post("/recommendations/batch", json={"requests": reqs}).json()["results"][0]["items"] == results[0]["items"]
+    assert client.get("/cache/stats").json()["hits"] == hits + len(reqs)
+
+def test_concurrent_feedback_and_recommendations(tmp_path: Path, monkeypatch, api_paths) -> None:
+    monkeypatch.setattr(cfg, "SCORING_WORKERS", 2, raising=False)
+
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    user = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")[0]
+    rec = {"user": user, "context": {"day_of_week": 2, "hour_bucket": "morning"}, "top_k": 3}
+    fb = {"user_id": user["user_id"], "content_id": "c1", "arm": cfg.ARMS[0], "reward": 1,
+          "day_of_week": 2, "hour_bucket": "morning"}
+
+    from concurrent.futures import ThreadPoolExecutor
+    n = 40
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        futs = [ex.submit(client.post, "/feedback" if i % 2 else "/recommendations", json=fb if i % 2 else rec)
+                for i in range(n)]
+        codes = [f.result().status_code for f in futs]
+    assert codes == [200] * n
+
+    # every feedback update landed exactly once (A = I + sum x x^T, trace grows by |x|^2 each)
+    b = api_module._bandit
+    x = api_module._bandit_x(api_module._users.user_context(user["user_id"]), 2, "morning")[0]
+    i = b.arm_index[cfg.ARMS[0]]
+    assert np.isclose(np.trace(b.A_stack[i]) - b.d, (n // 2) * float(x @ x))
+    assert api_module._journal.pending == n // 2
+
+def test_lifespan_loads_warms_and_reports_ready(tmp_path: Path, api_paths) -> None:
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    importlib.reload(api_module)
+
+    # without the lifespan nothing is loaded eagerly: alive but not ready
+    client = TestClient(api_module.app)
+    assert client.get("/healthz").json()["state"] == "idle"
+    assert client.get("/readyz").status_code == 503
+
+    import time
+    with TestClient(api_module.app) as client:
+        deadline = time.monotonic() + 30
+        while client.get("/readyz").status_code != 200:
+            assert time.monotonic() < deadline
+            assert client.get("/healthz").json()["state"] != "failed"
+            time.sleep(0.05)
+        st = client.get("/readyz").json()
+        assert st["state"] == "ready" and st["error"] is None
+        assert st["load_s"] >= 0 and st["warmup_s"] >= 0
+        assert st["warmup_requests"] == 2 * cfg.WARMUP_REQUESTS
+        # warmup users are synthetic and stay out of the user store
+        assert len(api_module._users) == 2
+        assert client.post("/recommendations",
+                           json=api_module.RecommendationRequest.Config.json_schema_extra["example"]).status_code == 200
+
+def test_admin_reload_swaps_validated_artifacts(tmp_path: Path, monkeypatch, api_paths) -> None:
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    from src.models.bandit import LinTSBandit
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    user = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")[0]
+    rec = {"user": user, "context": {"day_of_week": 2, "hour_bucket": "morning"}, "top_k": 3}
+    v1 = client.post("/recommendations", json=rec).json()["model_version"]
+    assert client.post("/admin/reload").json()["swapped"] == []
+
+    # retrained learned scorer: same content, new artifact -> new scorer version
+    ltr_path = tmp_path / "artifacts" / "ltr_model.joblib"
+    pipe = joblib.load(ltr_path)
+    pipe.set_params(clf__C=0.1)
+    X = pd.DataFrame({c: [v] * 2 for c, v in zip(ALL, [30, 5, 10, 2, 0.0, False, True, "morning", "stress",
+                                                       "yoga", "low", "beginner", "stress", "morning", "0"])})
+    joblib.dump(pipe.fit(X, [0, 1]), ltr_path)
+    r = client.post("/admin/reload")
+    assert r.status_code == 200 and r.json()["swapped"] == ["scorer"]
+    v2 = client.post("/recommendations", json=rec).json()["model_version"]
+    assert v2 != v1 and v2.split("+")[1] == v1.split("+")[1]
+    assert client.get("/admin/model").json()["model_version"] == v2
+
+    # a bandit with the wrong arms is rejected; the old one keeps serving
+    LinTSBandit(["a", "b"], d=cfg.BANDIT_D).save(cfg.BANDIT_PATH)
+    r = client.post("/admin/reload")
+    assert r.status_code == 409
+    assert client.post("/recommendations", json=rec).json()["model_version"] == v2
+    assert client.get("/admin/model").json()["rejected"] == 1
+
+    # a freshly trained bandit is swapped in together with a new journal
+    fresh = LinTSBandit(cfg.ARMS, d=cfg.BANDIT_D)
+    fresh.update(cfg.ARMS[1], 1.0, np.ones(cfg.BANDIT_D))
+    fresh.save(cfg.BANDIT_PATH)
+    api_module._journal.checkpoint()  # the live journal overwrites BANDIT_PATH before the reload
+    assert client.post("/admin/reload").json()["swapped"] == ["bandit"]
+    v3 = client.post("/recommendations", json=rec).json()["model_version"]
+    assert v3.split("+")[0] == v2.split("+")[0] and v3 != v2
+    assert np.allclose(api_module._bandit.b_stack[1], 1.0)
+
+    # nothing new: the trained copy is not even loaded again
+    with monkeypatch.context() as m:
+        m.setattr(api_module.LinTSBandit, "load", None)
+        assert client.post("/admin/reload").json()["swapped"] == []
+
+    fb = {"user_id": user["user_id"], "content_id": "c1", "arm": cfg.ARMS[0], "reward": 1,
+          "day_of_week": 2, "hour_bucket": "morning"}
+    assert client.post("/feedback", json=fb).json()["model_version"] == v3
+    assert api_module._journal.bandit is api_module._bandit and api_module._journal.pending == 1
+
+def test_runtime_metrics_exposition(tmp_path: Path, api_paths) -> None:
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    user = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")[0]
+    rec = {"user": user, "context": {"day_of_week": 2, "hour_bucket": "morning"}, "top_k": 3}
+    assert client.post("/recommendations", json=rec).status_code == 200
+    fb = {"user_id": "nobody", "content_id": "c1", "arm": cfg.ARMS[0], "reward": 1,
+          "day_of_week": 2, "hour_bucket": "morning"}
+    assert client.post("/feedback", json=fb).status_code == 404
+    assert client.post("/feedback", json={**fb, "user_id": user["user_id"]}).status_code == 200
+
+    r = client.get("/metrics/runtime")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'reco_requests_total{endpoint="recommendations",code="200"} 1' in text
+    assert 'reco_requests_total{endpoint="feedback",code="404"} 1' in text
+    assert 'reco_requests_in_flight{endpoint="recommendations"} 0' in text
+    for stage in ("persona", "pool_filter", "feature_build", "ltr_predict", "rank",
+                  "bandit_choose", "serialization"):
+        assert f'reco_stage_duration_seconds_count{{endpoint="recommendations",stage="{stage}"}} 1' in text
+    assert 'reco_stage_duration_seconds_count{endpoint="feedback",stage="bandit_save"} 1' in text
+    assert "reco_rank_cache_misses_total 1" in text
+    assert "reco_bandit_pending_updates 1" in text
+
+def test_feedback_lands_in_shared_bandit_region(tmp_path: Path, monkeypatch, api_paths) -> None:
+    monkeypatch.setattr(cfg, "SHARED_STATE_DIR", tmp_path / "shared", raising=False)
+
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    from src.models.shared_bandit import SharedLinTSBandit
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    user = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")[0]
+    rec = {"user": user, "context": {"day_of_week": 2, "hour_bucket": "morning"}, "top_k": 3}
+    assert client.post("/recommendations", json=rec).status_code == 200
+    assert isinstance(api_module._bandit, SharedLinTSBandit)
+    assert list((tmp_path / "shared").glob("catalog_X-*.npy"))
+
+    # another worker attached to the same region sees this worker's feedback
+    other = SharedLinTSBandit(tmp_path / "shared" / "bandit.f64")
+    fb = {"user_id": user["user_id"], "content_id": "c1", "arm": cfg.ARMS[2], "reward": 1,
+          "day_of_week": 2, "hour_bucket": "morning"}
+    assert client.post("/feedback", json=fb).status_code == 200
+    other.sync()
+    assert np.allclose(other.A_stack, api_module._bandit.A_stack)
+    assert other.b_stack[2].any()
+    # no per-event log in shared mode
+    assert not list((tmp_path / "artifacts" / "bandit_lin_ts.log").glob("*.seg"))
+
+def test_replica_sync_exports_feedback_delta(tmp_path: Path, monkeypatch, api_paths) -> None:
+    monkeypatch.setattr(cfg, "BANDIT_REPLICA_ID", "r1", raising=False)
+    monkeypatch.setattr(cfg, "BANDIT_SYNC_DIR", tmp_path / "sync", raising=False)
+
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    from src.models.bandit_sync import merge_deltas
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    user = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")[0]
+    fb = {"user_id": user["user_id"], "content_id": "c1", "arm": cfg.ARMS[1], "reward": 1,
+          "day_of_week": 2, "hour_bucket": "morning"}
+    assert client.post("/feedback", json=fb).status_code == 200
+    r = client.post("/admin/bandit/sync")
+    assert r.status_code == 200 and r.json()["pushed_seq"] == 1
+    assert merge_deltas(tmp_path / "sync")["applied"] == {"r1": 1}
+
+    # the merged model already contains this replica's update: pulling must not count it twice
+    b_before = np.array(api_module._bandit.b_stack)
+    assert client.post("/admin/bandit/sync").json()["pulled"] is True
+    assert np.allclose(api_module._bandit.b_stack, b_before)
+
+def test_topk_table_served_by_lookup_and_refreshed_incrementally(tmp_path: Path, monkeypatch, api_paths) -> None:
+    monkeypatch.setattr(cfg, "TOPK_DIR", tmp_path / "artifacts" / "topk", raising=False)
+
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    from src.service.bundle import ModelBundle
+    from src.service.topk import materialize
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    users = pd.read_csv(tmp_path / "data" / "users.csv")
+    user = users.to_dict(orient="records")[0]
+    rec = {"user": user, "context": {"day_of_week": 3, "hour_bucket": "evening"}, "top_k": 3}
+    live = client.post("/recommendations", json=rec).json()
+
+    def load():
+        return ModelBundle.load(cfg.DATA_DIR, cfg.ARTIFACTS_DIR, cfg.ENCODER_PATH, cfg.PERSONA_MODEL_PATH)
+
+    summary = materialize(load(), users, cfg.TOPK_DIR, depth=5)
+    assert summary["users"] == 2 and summary["recomputed"] == 2
+    assert client.post("/admin/reload").json()["swapped"] == ["topk"]
+    assert client.get("/admin/model").json()["topk"]["users"] == 2
+
+    table = api_module._bundle.topk
+    assert table.lookup(user, 3, "evening", 3) is not None  # pool (3 items) fits in depth 5
+    served = client.post("/recommendations", json=rec).json()
+    assert served["persona"] == live["persona"]
+    assert [i["content_id"] for i in served["items"]] == [i["content_id"] for i in live["items"]]
+    assert np.allclose([i["score"] for i in served["items"]], [i["score"] for i in live["items"]], atol=1e-6)
+    assert api_module._stage_seconds.count("recommendations", "topk_lookup") == 1
+
+    # changed profiles fall back to live scoring
+    assert table.lookup({**user, "age": 30}, 3, "evening", 3) is None
+
+    # a catalog change in the fitness pool only rescores fitness users; the rest is reused
+    content = pd.read_csv(tmp_path / "data" / "content_catalog.csv")
+    content.loc[content["content_id"] == "c3", "duration_min"] = 30
+    content.to_csv(tmp_path / "data" / "content_catalog.csv", index=False)
+    again = materialize(load(), users, cfg.TOPK_DIR, depth=5)
+    assert again["recomputed"] == 1 and again["reused"] == 1
+
+def test_heuristic_fallback_without_or_before_learned_scorer(tmp_path: Path, api_paths) -> None:
+    _write_minimal_data(tmp_path)
+    ltr_path = tmp_path / "artifacts" / "ltr_model.joblib"
+    trained = ltr_path.read_bytes()
+    ltr_path.unlink()
+
+    import src.service.api as api_module
+    from src.models.recommender import rank_content
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    # no learned scorer trained: cold-start heuristic instead of an error
+    user = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")[0]
+    rec = {"user": user, "context": {"day_of_week": 2, "hour_bucket": "morning"}, "top_k": 3}
+    body = client.post("/recommendations", json=rec).json()
+    content = api_module._bundle.content
+    expected = rank_content(content, user["primary_goal"], body["persona"], top_k=3)
+    assert [i["content_id"] for i in body["items"]] == expected["content_id"].tolist()
+    assert "cold-start heuristic" in body["rationale"]
+    assert client.get("/admin/model").json()["scorer"] == "heuristic"
+
+    # once trained, the next reload switches to the learned scorer
+    ltr_path.write_bytes(trained)
+    assert client.post("/admin/reload").json()["swapped"] == ["scorer"]
+    assert client.get("/admin/model").json()["scorer"] == "learned"
+    assert "P(reward)" in client.post("/recommendations", json=rec).json()["rationale"]
+
+    # startup: the heuristic bundle serves until the learned one is loaded
+    importlib.reload(api_module)
+    assert api_module._install_fallback() is True
+    assert api_module._bundle.learned is False and "ltr" not in api_module._bundle.fingerprints
+    assert TestClient(api_module.app).post("/recommendations", json=rec).status_code == 200
+    api_module._install_learned()
+    assert api_module._bundle.learned is True
+    assert api_module._install_fallback() is False
+
+def test_latency_budget_degrades_to_cached_or_heuristic(tmp_path: Path, monkeypatch, api_paths) -> None:
+    _write_minimal_data(tmp_path)
+
+    import time
+    import src.service.api as api_module
+    from src.models.recommender import rank_content
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    users = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")
+    ctx = {"day_of_week": 2, "hour_bucket": "morning"}
+    first = client.post("/recommendations", json={"user": users[0], "context": ctx, "top_k": 3}).json()
+    assert first["ranker"] == "learned" and first["degraded"] is False
+
+    # learned scorer stalls: budgeted requests answer with the heuristic in time...
+    ltr = api_module._bundle.ltr
+    slow = ltr.predict_catalog
+    monkeypatch.setattr(ltr, "predict_catalog", lambda *a, **k: (time.sleep(0.5), slow(*a, **k))[1])
+    other = {**users[1], "user_id": "u9"}
+    t0 = time.perf_counter()
+    heur = client.post("/recommendations", json={"user": other, "context": ctx, "top_k": 2,
+                                                 "budget_ms": 50}).json()
+    assert time.perf_counter() - t0 < 0.4
+    assert heur["ranker"] == "heuristic" and heur["degraded"] is True
+    expected = rank_content(api_module._bundle.content, other["primary_goal"], heur["persona"], top_k=2)
+    assert [i["content_id"] for i in heur["items"]] == expected["content_id"].tolist()
+
+    # ...and while the scorer is backlogged (cooldown), cached learned rankings where there are some,
+    # without waiting for a bandit lock held elsewhere (e.g. by a slow checkpoint)
+    import threading
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock() -> None:
+        with api_module._bandit_lock:
+            held.set()
+            release.wait(2.0)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    held.wait()
+    t0 = time.perf_counter()
+    cached = client.post("/recommendations", json={"user": users[0], "context": ctx, "top_k": 3,
+                                                   "budget_ms": 50}).json()
+    assert time.perf_counter() - t0 < 1.0
+    release.set()
+    holder.join()
+    assert cached["ranker"] == "cached" and cached["degraded"] is True
+    assert [i["content_id"] for i in cached["items"]] == [i["content_id"] for i in first["items"]]
+
+    # no budget: waits for the learned scorer as before
+    full = client.post("/recommendations", json={"user": other, "context": ctx, "top_k": 2}).json()
+    assert full["ranker"] == "learned" and full["degraded"] is False
+
+    text = client.get("/metrics/runtime").text
+    assert 'reco_degraded_total{endpoint="recommendations",ranker="cached"} 1' in text
+    assert 'reco_degraded_total{endpoint="recommendations",ranker="heuristic"} 1' in text
+    assert "reco_degraded_mode 1" in text
+
+    # once the cooldown is over and the scorer is fast again, budgeted requests use it
+    monkeypatch.setattr(ltr, "predict_catalog", slow)
+    api_module._degraded_until = 0.0
+    again = client.post("/recommendations", json={"user": other, "context": {"day_of_week": 3, "hour_bucket": "evening"},
+                                                  "budget_ms": 5_000}).json()
+    assert again["ranker"] == "learned" and again["degraded"] is False
+
+
+def test_concurrent_recommendations_are_micro_batched(tmp_path: Path, monkeypatch, api_paths) -> None:
+    monkeypatch.setattr(cfg, "MICROBATCH_MAX_SIZE", 4, raising=False)
+    monkeypatch.setattr(cfg, "MICROBATCH_MAX_WAIT_MS", 5_000.0, raising=False)  # flushed only when idle or full
+
+    _write_minimal_data(tmp_path)
+
+    import asyncio
+    import src.service.api as api_module
+    importlib.reload(api_module)
+
+    # the first call goes at once (idle) and is held until the other three queue up behind it
+    flush = api_module._batcher._flush
+
+    async def gated(items):
+        while len(items) == 1 and sum(map(len, api_module._batcher._pending.values())) < 3:
+            await asyncio.sleep(0.001)
+        return await flush(items)
+
+    monkeypatch.setattr(api_module._batcher, "_flush", gated)
+
+    users = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")
+    reqs = [{"user": users[i % 2], "context": {"day_of_week": i, "hour_bucket": "morning"}, "top_k": 3}
+            for i in range(4)]
+
+    from concurrent.futures import ThreadPoolExecutor
+    with TestClient(api_module.app) as client, ThreadPoolExecutor(max_workers=4) as ex:
+        import time
+        while client.get("/readyz").status_code != 200:  # the learned scorer loads in the background
+            time.sleep(0.01)
+        singles = [r.json() for r in ex.map(lambda req: client.post("/recommendations", json=req), reqs)]
+        text = client.get("/metrics/runtime").text
+        api_module._rank_cache.clear()
+        batch = client.post("/recommendations/batch", json={"requests": reqs}).json()["results"]
+
+    assert "reco_microbatch_size_count 2" in text and "reco_microbatch_size_sum 4" in text
+    assert api_module._batcher.stats()["batches"] == 2
+    # each caller got the response for its own request
+    for single, res in zip(singles, batch):
+        assert single["persona"] == res["persona"]
+        assert [it["content_id"] for it in single["items"]] == [it["content_id"] for it in res["items"]]
+
+
+def test_process_scoring_executor_serves_requests(tmp_path: Path, monkeypatch, api_paths) -> None:
+    monkeypatch.setattr(cfg, "SCORING_EXECUTOR", "process", raising=False)
+    monkeypatch.setattr(cfg, "SCORING_WORKERS", 1, raising=False)
+
+    _write_minimal_data(tmp_path)
+
+    import src.service.api as api_module
+    importlib.reload(api_module)
+    client = TestClient(api_module.app)
+
+    user = pd.read_csv(tmp_path / "data" / "users.csv").to_dict(orient="records")[0]
+    req = {"user": user, "context": {"day_of_week": 2, "hour_bucket": "morning"}, "top_k": 3}
+    try:
+        # the spawned worker loads the artifacts from tmp_path, like this process
+        res = client.post("/recommendations", json=req)
+        assert res.status_code == 200
+        assert client.post("/recommendations", json=req).json()["items"] == res.json()["items"]
+        pool = api_module._scoring_pool
+        assert pool is not None and pool._mp_context.get_start_method() == "spawn"
+
+        from src.service.schemas import RecommendationRequest
+        personas, rankings = api_module._score_with(api_module._current_bundle(), [RecommendationRequest(**req)],
+                                                    use_cache=False)
+        assert res.json()["persona"] == personas[0]
+        content_ids = api_module._current_bundle().content["content_id"].to_numpy()
+        assert [i["content_id"] for i in res.json()["items"]] == content_ids[rankings[0][0][:3]].tolist()
+        # the ranking cache lives in the worker process
+        st = client.get("/cache/stats").json()
+        assert st["hits"] == st["misses"] == 0
+    finally:
+        api_module._shutdown()
@@ -0,0 +1,77 @@
+from pathlib import Path
+import numpy as np
+import pytest
+
+from src.models.bandit import LinTSBandit
+from src.models.bandit_sync import ReplicaSync, init_global, load_global, merge_deltas
+
+ARMS = ["a", "b"]
+
+def _events(n, seed):
+    rng = np.random.default_rng(seed)
+    return [(ARMS[i % 2], float(rng.integers(0, 2)), rng.normal(size=3)) for i in range(n)]
+
+def _feed(bandit, events):
+    for arm, r, x in events:
+        bandit.update(arm, r, x)
+
+def test_replica_deltas_merge_into_the_full_model(tmp_path: Path):
+    sync = tmp_path / "sync"
+    init_global(sync, LinTSBandit(ARMS, d=3))
+    r1 = ReplicaSync(LinTSBandit(ARMS, d=3), "r1", sync)
+    r2 = ReplicaSync(LinTSBandit(ARMS, d=3), "r2", sync)
+    ev1, ev2, ev3 = _events(30, 1), _events(20, 2), _events(10, 3)
+    ref = LinTSBandit(ARMS, d=3)
+    _feed(ref, ev1 + ev2 + ev3)
+
+    _feed(r1.bandit, ev1)
+    _feed(r2.bandit, ev2)
+    assert r1.push() == 1 and r2.push() == 1
+    assert r1.push() is None  # nothing new since the last export
+
+    summary = merge_deltas(sync)
+    assert summary["merged"] == 2 and summary["gaps"] == [] and summary["applied"] == {"r1": 1, "r2": 1}
+    assert merge_deltas(sync)["merged"] == 0  # rerun is a no-op
+
+    # r1 learned more before pulling: the rebase keeps those unexported updates
+    _feed(r1.bandit, ev3)
+    assert r1.pull() and r2.pull()
+    assert np.allclose(r1.bandit.A_stack, ref.A_stack) and np.allclose(r1.bandit.b_stack, ref.b_stack)
+    assert np.allclose(r1.bandit._mu, np.linalg.solve(ref.A_stack, ref.b_stack[..., None])[..., 0])
+
+    # and ships them with the next delta, without re-sending what is already merged
+    assert r1.push() == 2
+    merge_deltas(sync)
+    g = load_global(sync)
+    assert np.allclose(np.stack([g["A"][a] for a in ARMS]), ref.A_stack)
+    assert r2.pull() and np.allclose(r2.bandit.b_stack, ref.b_stack)
+
+def test_sync_state_survives_restart_and_gaps_are_reported(tmp_path: Path):
+    sync = tmp_path / "sync"
+    init_global(sync, LinTSBandit(ARMS, d=3))
+    bandit = LinTSBandit(ARMS, d=3)
+    rep = ReplicaSync(bandit, "r1", sync)
+    _feed(bandit, _events(5, 0))
+    rep.push()
+    _feed(bandit, _events(5, 1))
+    rep.push()
+    (sync / "deltas" / "r1-00000001.npz").unlink()  # lost in transit
+
+    summary = merge_deltas(sync)
+    assert summary["gaps"] == [{"replica": "r1", "expected": 1, "got": 2}]
+
+    # a restarted replica continues its sequence and does not re-export old updates
+    again = ReplicaSync(bandit, "r1", sync)
+    assert again.seq == 2 and again.push() is None
+
+def test_mismatched_delta_is_rejected(tmp_path: Path):
+    sync = tmp_path / "sync"
+    init_global(sync, LinTSBandit(ARMS, d=3))
+    other = LinTSBandit(["x", "y"], d=3)
+    rep = ReplicaSync(other, "bad", sync)
+    other.update("x", 1.0, np.ones(3))
+    rep.push()
+    with pytest.raises(ValueError):
+        merge_deltas(sync)
+    with pytest.raises(ValueError):
+        ReplicaSync(other, "no/slash", sync)
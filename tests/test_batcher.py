@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from src.service.batcher import MicroBatcher
+
+
+def test_concurrent_submissions_are_flushed_together():
+    calls = []
+
+    async def flush(items):
+        calls.append(list(items))
+        await asyncio.sleep(0)
+        return [x * 10 for x in items]
+
+    async def go():
+        b = MicroBatcher(flush, max_size=4, max_wait_s=0.05)
+        res = await asyncio.gather(*(b.submit(i) for i in range(7)))
+        split = await asyncio.gather(b.submit(1, group="a"), b.submit(2, group="b"))
+        return b, res, split
+
+    b, res, split = asyncio.run(go())
+    assert res == [0, 10, 20, 30, 40, 50, 60]        # each caller gets its own result
+    assert split == [10, 20]
+    # idle: the first goes alone; a full batch is flushed at once, the rest when the group is idle
+    assert calls[:3] == [[0], [1, 2, 3, 4], [5, 6]]
+    assert sorted(calls[3:]) == [[1], [2]]           # groups are never mixed
+    assert b.stats()["batches"] == 5 and b.stats()["items"] == 9
+
+
+def test_waiting_batch_goes_when_the_group_goes_idle():
+    release = asyncio.Event()
+    calls = []
+
+    async def flush(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            await release.wait()
+        return items
+
+    async def go():
+        b = MicroBatcher(flush, max_size=8, max_wait_s=60.0)
+        first = asyncio.ensure_future(b.submit("a"))
+        await asyncio.sleep(0)
+        rest = [asyncio.ensure_future(b.submit(x)) for x in "bc"]
+        await asyncio.sleep(0.01)
+        assert calls == [["a"]]                      # b and c wait for the running batch
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(first, *rest), timeout=1.0)
+
+    assert asyncio.run(go()) == ["a", "b", "c"]
+    assert calls == [["a"], ["b", "c"]]
+
+
+def test_flush_error_reaches_every_caller_in_the_batch():
+    async def flush(items):
+        raise RuntimeError("scorer down")
+
+    async def go():
+        b = MicroBatcher(flush, max_size=8, max_wait_s=0.001)
+        return await asyncio.gather(b.submit(1), b.submit(2), return_exceptions=True)
+
+    errors = asyncio.run(go())
+    assert [type(e) for e in errors] == [RuntimeError, RuntimeError]
+
+
+def test_short_flush_result_fails_every_caller():
+    release = asyncio.Event()
+
+    async def flush(items):
+        if items == ["first"]:
+            await release.wait()
+        return items[:1]
+
+    async def go():
+        b = MicroBatcher(flush, max_size=8, max_wait_s=60.0)
+        first = asyncio.ensure_future(b.submit("first"))  # idle group: goes alone
+        await asyncio.sleep(0)
+        short = asyncio.gather(b.submit("x"), b.submit("y"), return_exceptions=True)  # one batch behind it
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(first, short), 1.0)
+
+    first, errors = asyncio.run(go())
+    assert first == "first"
+    assert [type(e) for e in errors] == [RuntimeError, RuntimeError]
+
+
+def test_cancelled_flush_cancels_its_callers_and_the_queue_behind_them():
+    started = asyncio.Event()
+
+    async def flush(items):
+        started.set()
+        await asyncio.sleep(60)
+        return items
+
+    async def go():
+        b = MicroBatcher(flush, max_size=8, max_wait_s=60.0)
+        running = asyncio.ensure_future(b.submit("running"))
+        await started.wait()
+        queued = asyncio.ensure_future(b.submit("queued"))
+        await asyncio.sleep(0)
+        for task in list(b._running):
+            task.cancel()
+        return await asyncio.wait_for(asyncio.gather(running, queued, return_exceptions=True), 1.0)
+
+    assert [type(e) for e in asyncio.run(go())] == [asyncio.CancelledError] * 2
+
+
+def test_cancelled_caller_does_not_break_the_batch():
+    async def flush(items):
+        await asyncio.sleep(0.01)
+        return items
+
+    async def go():
+        b = MicroBatcher(flush, max_size=8, max_wait_s=0.001)
+        gone = asyncio.ensure_future(b.submit("gone"))
+        kept = asyncio.ensure_future(b.submit("kept"))
+        await asyncio.sleep(0.005)
+        gone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        return await kept
+
+    assert asyncio.run(go()) == "kept"
@@ -0,0 +1,40 @@
+import json
+
+import scripts.benchmark as bench
+
+
+def test_measure_reports_percentiles():
+    stats = bench.measure(lambda: sum(range(100)), repeat=50, budget_s=0.5)
+    assert stats["n"] == 50
+    assert stats["min_ms"] <= stats["p50_ms"] <= stats["p90_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+
+
+def test_compare_flags_only_real_regressions():
+    base = {"results": {"a": {"p50_ms": 10.0}, "b": {"p50_ms": 10.0}, "c": {"p50_ms": 0.01},
+                        "gone": {"p50_ms": 1.0}}}
+    cur = {"results": {"a": {"p50_ms": 11.0}, "b": {"p50_ms": 14.0}, "c": {"p50_ms": 0.03},
+                       "new": {"p50_ms": 1.0}}}
+    rows = {r["case"]: r for r in bench.compare(base, cur, threshold=0.25, floor_ms=0.05)}
+    assert set(rows) == {"a", "b", "c"}
+    assert not rows["a"]["regressed"]        # +10%: within threshold
+    assert rows["b"]["regressed"]            # +40%
+    assert not rows["c"]["regressed"]        # 3x, but below the absolute floor
+
+
+def test_run_and_compare_cli(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    argv = ["run", "--quick", "--only", "rank_content,bandit_choose", "--budget", "0.01", "--out", str(out)]
+    assert bench.main(argv) == 0
+    report = json.loads(out.read_text())
+    assert set(report["results"]) == {"rank_content[catalog=300]", f"bandit_choose[d={bench.BANDIT_D}]"}
+    assert report["meta"]["grid"]["catalog"] == [300]
+
+    # identical run → nothing regressed; a baseline twice as fast → fails
+    assert bench.main(["compare", "--baseline", str(out), "--current", str(out)]) == 0
+    fast = {**report, "results": {k: {**v, "p50_ms": v["p50_ms"] / 2} for k, v in report["results"].items()}}
+    (tmp_path / "fast.json").write_text(json.dumps(fast))
+    assert bench.main(["compare", "--baseline", str(tmp_path / "fast.json"), "--current", str(out),
+                       "--floor-ms", "0"]) == 1
+    assert "REGRESSED" in capsys.readouterr().out
+
+    assert bench.main(["run", "--only", "nope", "--out", str(out)]) == 2
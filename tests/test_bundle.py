@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.service.bundle import shared_array, version_id
+
+
+def test_shared_array_maps_one_file(tmp_path: Path):
+    arr = np.arange(12, dtype=float).reshape(3, 4)
+    a = shared_array(tmp_path / "x.npy", arr)
+    b = shared_array(tmp_path / "x.npy", arr * 0)  # second worker: attaches, does not rewrite
+    assert isinstance(a, np.memmap) and not a.flags.writeable
+    assert np.array_equal(b, arr)
+    # fancy indexing (as predict_catalog does) yields a private, writable copy
+    rows = a[[0, 2]]
+    rows[:, 0] = -1
+    assert a[0, 0] == 0
+
+
+def test_version_id_depends_on_every_fingerprint():
+    fps = {"ltr": "10:1", "content": "5:2"}
+    assert version_id(fps) == version_id(dict(reversed(list(fps.items()))))
+    assert version_id(fps) != version_id({**fps, "content": "5:3"})
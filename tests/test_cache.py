@@ -0,0 +1,32 @@
+from src.service.cache import TTLCache
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+    def __call__(self):
+        return self.t
+
+def test_lru_eviction_and_counters():
+    c = TTLCache(maxsize=2, ttl_s=60)
+    c.put("a", 1); c.put("b", 2)
+    assert c.get("a") == 1          # a is now most recent
+    c.put("c", 3)                   # evicts b
+    assert c.get("b") is None and c.get("c") == 3
+    st = c.stats()
+    assert (st["hits"], st["misses"], st["evictions"], st["size"]) == (2, 1, 1, 2)
+
+def test_ttl_expiry_and_version_invalidation():
+    clock = _Clock()
+    c = TTLCache(maxsize=10, ttl_s=5, clock=clock)
+    c.set_version(1)
+    c.put("k", "v")
+    clock.t = 4.9
+    assert c.get("k") == "v"
+    clock.t = 5.0
+    assert c.get("k") is None and c.stats()["expirations"] == 1
+
+    c.put("k", "v")
+    c.set_version(1)
+    assert c.get("k") == "v"
+    c.set_version(2)
+    assert c.get("k") is None and c.stats()["invalidations"] == 1
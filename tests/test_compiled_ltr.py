@@ -0,0 +1,116 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import joblib
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import LogisticRegression
+
+from src.models.ltr import ALL, NUM, CAT, LTRModel
+from src.models.compiled_ltr import CompiledLTR, artifact_fingerprint
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "age": rng.integers(18, 65, n), "baseline_activity_min_per_day": rng.integers(0, 50, n),
+        "duration_min": rng.integers(5, 35, n), "day_of_week": rng.integers(0, 7, n), "popularity": rng.random(n),
+        "premium": rng.random(n) < 0.5, "push_opt_in": rng.random(n) < 0.5,
+        "chronotype": rng.choice(["morning", "evening"], n),
+        "primary_goal": rng.choice(["stress", "fitness", "weight_loss"], n),
+        "type": rng.choice(["yoga", "walk", "hiit", "meditation"], n),
+        "intensity": rng.choice(["low", "medium", "high"], n),
+        "difficulty": rng.choice(["beginner", "all", "intermediate"], n),
+        "goal_tag": rng.choice(["stress", "fitness", "weight_loss"], n),
+        "hour_bucket": rng.choice(["morning", "evening"], n),
+        "persona": rng.choice(["0", "1", "2", "3"], n),
+    })
+
+def _pipe(clf, **ct_kwargs):
+    pre = ColumnTransformer([
+        ("num", StandardScaler(), NUM),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CAT),
+    ], **ct_kwargs)
+    X = _frame(400, 0)
+    y = ((X["goal_tag"] == X["primary_goal"]) ^ (np.random.default_rng(1).random(400) < 0.2)).astype(int)
+    return Pipeline([("pre", pre), ("clf", clf)]).fit(X[ALL], y)
+
+def _assert_parity(pipe, atol):
+    compiled = CompiledLTR.from_pipeline(pipe)
+    X = _frame(300, 7)
+    X.loc[:5, "type"] = "unseen"  # handle_unknown="ignore"
+    assert np.allclose(compiled.predict_proba(X), pipe.predict_proba(X[ALL])[:, 1], rtol=0, atol=atol)
+
+def test_logreg_parity_with_sklearn():
+    _assert_parity(_pipe(LogisticRegression(max_iter=500)), atol=1e-12)
+
+@pytest.mark.parametrize("sparse_threshold", [0.0, 1.0])
+@pytest.mark.parametrize("chunk", [CompiledLTR.TRAVERSE_CHUNK, 100])
+def test_xgboost_parity_with_sklearn(sparse_threshold, chunk, monkeypatch):
+    xgb = pytest.importorskip("xgboost")
+    monkeypatch.setattr(CompiledLTR, "TRAVERSE_CHUNK", chunk)  # 100: two rows per traversal step
+    clf = xgb.XGBClassifier(n_estimators=40, max_depth=4, learning_rate=0.2, n_jobs=1, random_state=0)
+    _assert_parity(_pipe(clf, sparse_threshold=sparse_threshold), atol=1e-6)
+
+def test_large_xgboost_batches_go_to_the_booster_and_keep_up_with_it(tmp_path: Path):
+    xgb = pytest.importorskip("xgboost")
+    import time
+    import scripts.export_ltr as ex
+    from src.service.bundle import load_ltr
+
+    clf = xgb.XGBClassifier(n_estimators=200, max_depth=5, n_jobs=1, random_state=0)  # train_ltr's shape
+    joblib.dump(_pipe(clf), tmp_path / "ltr_model.joblib")
+    ex.export(tmp_path / "ltr_model.joblib", tmp_path / "ltr_compiled.npz")
+    served = load_ltr(tmp_path)
+    assert isinstance(served, CompiledLTR) and isinstance(served.native, LTRModel)
+
+    content = _frame(300, 3)[["duration_min", "popularity", "type", "intensity", "difficulty", "goal_tag"]]
+    content.insert(0, "content_id", [f"c{i}" for i in range(300)])
+    served.prepare_catalog(content)
+    native = LTRModel(tmp_path / "ltr_model.joblib")
+    native.prepare_catalog(content)
+
+    def timed(model, n):
+        args = ([np.arange(300)] * n, _frame(n, 4), [1] * n, ["morning"] * n, [0] * n)
+        model.predict_catalog(*args)
+        best = float("inf")
+        for _ in range(5):
+            t0 = time.perf_counter()
+            scores, _ = model.predict_catalog(*args)
+            best = min(best, time.perf_counter() - t0)
+        return best, scores
+
+    small, small_ref = timed(served, 1)[1], timed(native, 1)[1]
+    assert np.allclose(small, small_ref, rtol=0, atol=1e-6)  # below NATIVE_MIN_ROWS: NumPy traversal
+    n = 64  # 19k rows: the batch endpoint / top-K materialization regime
+    t_served, got = timed(served, n)
+    t_native, expected = timed(native, n)
+    assert np.array_equal(got, expected)
+    assert t_served < 2 * t_native + 0.01  # NumPy traversal alone: ~3.5x
+
+def test_export_roundtrip_and_catalog_scoring(tmp_path: Path):
+    pipe = _pipe(LogisticRegression(max_iter=500))
+    src = tmp_path / "ltr_model.joblib"
+    joblib.dump(pipe, src)
+
+    import scripts.export_ltr as ex
+    out = tmp_path / "ltr_compiled.npz"
+    ex.export(src, out)
+    compiled = CompiledLTR.load(out)
+    assert compiled.kind == "logreg" and compiled.source == artifact_fingerprint(src)
+
+    content = _frame(30, 3)[["duration_min", "popularity", "type", "intensity", "difficulty", "goal_tag"]]
+    content.insert(0, "content_id", [f"c{i}" for i in range(30)])
+    users = _frame(3, 4)
+    pools = [np.arange(30), np.arange(5, 12), np.array([2, 0, 9])]
+    args = (users, [1, 5, 6], ["morning", "evening", "evening"], [0, 3, 1])
+
+    ref = LTRModel(src)
+    ref.prepare_catalog(content)
+    expected, off_ref = ref.predict_catalog(pools, *args)
+
+    compiled.prepare_catalog(content)
+    got, offsets = compiled.predict_catalog(pools, *args)
+    assert list(offsets) == list(off_ref)
+    assert np.allclose(got, expected, rtol=0, atol=1e-12)
@@ -0,0 +1,67 @@
+from pathlib import Path
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_store import has_table, read_table, source_fingerprint, table_dir, write_table
+
+
+def _inter() -> pd.DataFrame:
+    return pd.DataFrame({
+        "user_id": ["u1", "u2", "u1", "u3"],
+        "content_id": ["c1", "c2", "c2", None],
+        "reward": [1, 0, 1, 0],
+        "day_of_week": [0, 6, 3, 2],
+        "hour_bucket": ["morning", "evening", "morning", "evening"],
+        "premium": [True, False, True, True],
+        "score": [0.5, 0.25, 1.0, 0.0],
+    })
+
+
+def test_roundtrip_types_and_projection(tmp_path: Path):
+    df = _inter()
+    write_table(df, tmp_path, "interactions")
+    assert (tmp_path / "interactions.csv").exists() and has_table(tmp_path, "interactions")
+
+    out = read_table(tmp_path, "interactions")
+    assert isinstance(out["user_id"].dtype, pd.CategoricalDtype)
+    assert out["reward"].dtype == np.int64 and out["premium"].dtype == bool
+    pd.testing.assert_frame_equal(out.astype({"user_id": object, "content_id": object, "hour_bucket": object}), df)
+
+    plain = read_table(tmp_path, "interactions", columns=["hour_bucket", "reward"], categorical=False)
+    assert list(plain.columns) == ["hour_bucket", "reward"]
+    assert plain["hour_bucket"].tolist() == df["hour_bucket"].tolist()
+    with pytest.raises(KeyError):
+        read_table(tmp_path, "interactions", columns=["nope"])
+
+
+def test_stale_table_falls_back_to_csv(tmp_path: Path):
+    write_table(_inter(), tmp_path, "interactions")
+    edited = _inter().assign(reward=[0, 0, 0, 0])
+    edited.to_csv(tmp_path / "interactions.csv", index=False)
+    os.utime(tmp_path / "interactions.csv", ns=(1, 1))  # make sure the fingerprint moves
+    assert read_table(tmp_path, "interactions")["reward"].tolist() == [0, 0, 0, 0]
+
+    # table without a CSV next to it is used as is
+    write_table(_inter(), tmp_path, "other", csv=False)
+    assert not (tmp_path / "other.csv").exists()
+    assert read_table(tmp_path, "other", columns=["reward"])["reward"].tolist() == [1, 0, 1, 0]
+    assert (table_dir(tmp_path, "other") / "schema.json").exists()
+    assert not has_table(tmp_path, "missing")
+
+
+def test_source_fingerprint_follows_the_table_next_to_a_stale_csv(tmp_path: Path):
+    assert source_fingerprint(tmp_path, "interactions") is None
+    _inter().to_csv(tmp_path / "interactions.csv", index=False)
+    only_csv = source_fingerprint(tmp_path, "interactions")
+    assert only_csv is not None and not only_csv.startswith("cols:")
+
+    write_table(_inter(), tmp_path, "interactions", csv=False)  # --no-csv rerun leaves the old CSV
+    first = source_fingerprint(tmp_path, "interactions")
+    assert first is not None and first.startswith("cols:")
+    os.utime(table_dir(tmp_path, "interactions") / "schema.json", ns=(1, 1))
+    write_table(_inter().assign(reward=[0, 0, 0, 0]), tmp_path, "interactions", csv=False)
+    assert source_fingerprint(tmp_path, "interactions") != first
+    assert read_table(tmp_path, "interactions")["reward"].tolist() == [0, 0, 0, 0]
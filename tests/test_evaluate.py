@@ -96,3 +96,24 @@ def test_offline_evaluate_runs_and_writes_metrics(tmp_path: Path, monkeypatch):
     m = evaluate(top_k=3)
     assert "bandit" in m and "recommender" in m
     assert (tmp_path / "artifacts" / "metrics.json").exists()
+
+
+def test_sharded_evaluation_matches_single_process(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cfg, "DATA_DIR", tmp_path / "data", raising=False)
+    monkeypatch.setattr(cfg, "ARTIFACTS_DIR", tmp_path / "artifacts", raising=False)
+    monkeypatch.setattr(cfg, "PERSONA_MODEL_PATH", tmp_path / "artifacts" / "kmeans_personas.joblib", raising=False)
+    monkeypatch.setattr(cfg, "ENCODER_PATH", tmp_path / "artifacts" / "preprocess_encoder.joblib", raising=False)
+    monkeypatch.setattr(cfg, "BANDIT_PATH", tmp_path / "artifacts" / "bandit_lin_ts.joblib", raising=False)
+
+    _seed_eval_env(tmp_path)
+
+    import scripts.evaluate as ev
+    monkeypatch.setattr(ev, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(ev, "ARTIFACTS_DIR", tmp_path / "artifacts")
+    monkeypatch.setattr(ev, "METRICS_PATH", tmp_path / "artifacts" / "metrics.json")
+    monkeypatch.setattr(ev, "ENCODER_PATH", cfg.ENCODER_PATH)
+    monkeypatch.setattr(ev, "PERSONA_MODEL_PATH", cfg.PERSONA_MODEL_PATH)
+
+    single = ev.evaluate(top_k=2)
+    sharded = ev.evaluate(top_k=2, workers=2, chunk_size=1)
+    assert single["recommender"] == sharded["recommender"]
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+
+import scripts.load_test as lt
+from src.data_store import write_table
+
+USER = {"user_id": "u1", "age": 30, "gender": "female", "work_pattern": "9-5", "primary_goal": "stress",
+        "baseline_activity_min_per_day": 10, "premium": False, "push_opt_in": True, "chronotype": "morning",
+        "language": "en"}
+
+
+def _stub_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/readyz")
+    def readyz():
+        return {"ready": True}
+
+    @app.post("/recommendations")
+    def recommend(body: dict):
+        return {"chosen_arm": "push_evening", "items": [{"content_id": "c9"}]}
+
+    @app.post("/feedback")
+    def feedback(body: dict):
+        if body["user_id"] == "missing":
+            raise HTTPException(status_code=404)
+        return {"status": "ok"}
+
+    return app
+
+
+def test_load_users_from_dataset_or_example(tmp_path):
+    users = pd.DataFrame([USER, {**USER, "user_id": "bad", "age": 5}])
+    write_table(users, tmp_path, "users")
+    assert [u["user_id"] for u in lt.load_users(tmp_path)] == ["u1"]  # invalid profiles are skipped
+    assert lt.load_users(tmp_path / "none")[0]["user_id"] == "u0001"
+
+
+def test_traffic_mix_and_feedback_follows_recommendations():
+    traffic = lt.Traffic([USER], ["c1", "c2"], feedback_ratio=0.25, seed=1)
+    kinds = [traffic.next()[0] for _ in range(2000)]
+    assert abs(kinds.count("feedback") / len(kinds) - 0.25) < 0.05
+
+    _, _, payload = next(r for r in iter(traffic.next, None) if r[0] == "recommendations")
+    traffic.observe(payload, {"chosen_arm": "email_morning", "items": [{"content_id": "c7"}]})
+    _, path, fb = next(r for r in iter(traffic.next, None) if r[0] == "feedback")
+    assert path == "/feedback"
+    assert (fb["user_id"], fb["content_id"], fb["arm"]) == ("u1", "c7", "email_morning")
+    assert fb["reward"] in (0, 1)
+
+
+def test_run_load_reports_percentiles_and_errors():
+    async def go():
+        transport = httpx.ASGITransport(app=_stub_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            await lt.wait_ready(client, timeout_s=5)
+            traffic = lt.Traffic([{**USER, "user_id": "missing"}], ["c1"], feedback_ratio=0.5, seed=0)
+            traffic.observe = lambda payload, response: None  # feedback keeps the unknown user
+            return await lt.run_load(client, traffic, duration_s=30, requests=200, concurrency=4, warmup=20)
+
+    samples, wall = asyncio.run(go())
+    report = lt.summarize(samples, wall)
+    assert report["overall"]["requests"] == 200
+    rec, fb = report["endpoints"]["recommendations"], report["endpoints"]["feedback"]
+    assert rec["errors"] == 0 and rec["status"] == {"200": rec["requests"]}
+    assert fb["error_rate"] == 1.0 and fb["status"] == {"404": fb["requests"]}
+    assert report["overall"]["p50_ms"] <= report["overall"]["p95_ms"] <= report["overall"]["p99_ms"]
+    assert report["overall"]["throughput_rps"] > 0
+
+
+def test_open_loop_rate_paces_requests():
+    async def go():
+        transport = httpx.ASGITransport(app=_stub_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            traffic = lt.Traffic([USER], ["c1"], feedback_ratio=0.0)
+            return await lt.run_load(client, traffic, duration_s=30, requests=20, concurrency=4, rate=100.0)
+
+    samples, wall = asyncio.run(go())
+    assert len(samples) == 20
+    assert wall >= 0.18  # 20 requests due over 0.19 s
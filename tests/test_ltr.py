@@ -62,3 +62,30 @@ def test_build_features_and_predict(tmp_path: Path):
 
     # should rank meditation/stress higher given training signal
     assert float(proba.iloc[0]) > float(proba.iloc[1])
+
+def test_predict_catalog_matches_pipeline(tmp_path: Path):
+    content = pd.DataFrame([
+        {"content_id":"c1","type":"meditation","duration_min":10,"intensity":"low","goal_tag":"stress","difficulty":"beginner","popularity":0.1},
+        {"content_id":"c2","type":"hiit","duration_min":30,"intensity":"high","goal_tag":"fitness","difficulty":"advanced","popularity":0.0},
+        {"content_id":"c3","type":"yoga","duration_min":20,"intensity":"medium","goal_tag":"stress","difficulty":"all","popularity":0.4},
+    ])
+    users = pd.DataFrame([
+        {"age":30,"baseline_activity_min_per_day":20,"premium":True,"push_opt_in":True,
+         "chronotype":"morning","primary_goal":"stress"},
+        {"age":52,"baseline_activity_min_per_day":4,"premium":False,"push_opt_in":False,
+         "chronotype":"evening","primary_goal":"fitness"},
+    ])
+    model_path = tmp_path / "ltr.joblib"
+    _dummy_ltr_artifact(model_path)
+    model = LTRModel(model_path)
+    model.prepare_catalog(content)
+    assert model._content_X is not None
+
+    pools = [np.array([0, 2]), np.array([1, 0, 2])]
+    scores, offsets = model.predict_catalog(pools, users, [2, 6], ["morning", "evening"], [2, 1])
+    assert list(offsets) == [0, 2, 5]
+
+    for i, rows in enumerate(pools):
+        feats = build_candidate_features(content.iloc[rows], users.iloc[i], [2, 6][i], ["morning", "evening"][i], [2, 1][i])
+        expected = model.predict_proba(feats).to_numpy()
+        assert np.allclose(scores[offsets[i]:offsets[i + 1]], expected, rtol=0, atol=1e-12)
@@ -39,3 +39,41 @@ def test_persona_fit_assign_save_load(tmp_path: Path):
     pre2, km2 = load(enc_p, km_p)
     out2 = assign_personas(users, pre2, km2)
     assert out2["persona"].equals(out["persona"])
+
+def test_compiled_assigner_matches_sklearn_path():
+    import numpy as np
+    from src.features.persona_clustering import PersonaAssigner, _ensure_finite
+
+    rng = np.random.default_rng(0)
+    n = 300
+    users = pd.DataFrame({
+        "user_id": [f"u{i}" for i in range(n)],
+        "age": rng.integers(18, 65, n).astype(float),
+        "gender": rng.choice(["male", "female", "other"], n),
+        "work_pattern": rng.choice(["9-5", "shift", "flex"], n),
+        "primary_goal": rng.choice(["weight_loss", "fitness", "stress"], n),
+        "baseline_activity_min_per_day": rng.integers(5, 50, n).astype(float),
+        "premium": rng.random(n) < 0.5,
+        "push_opt_in": rng.random(n) < 0.8,
+        "chronotype": rng.choice(["morning", "evening"], n),
+        "language": rng.choice(["en", "de", "fr"], n),
+    })
+    pre, km = fit_kmeans_personas(users, k=4)
+
+    probe = users.copy()
+    probe.loc[0, "age"] = np.nan
+    probe.loc[1, "language"] = "es"          # unseen category
+    probe.loc[2, "gender"] = None
+    expected_X = _ensure_finite(pre.transform(select_user_features(probe)))
+    expected = assign_personas(probe, pre, km)["persona"].tolist()
+
+    assigner = PersonaAssigner(pre, km)
+    records = probe.to_dict(orient="records")
+    assert np.array_equal(assigner.encode(records), expected_X)
+    assert assigner.assign(records) == expected
+
+    # memoized by user_id, recomputed when that user's features change
+    assert assigner.assign(records[:5]) == expected[:5]
+    changed = {**records[3], "age": 64.0, "primary_goal": "stress"}
+    ref = assign_personas(pd.DataFrame([changed]), pre, km)["persona"].tolist()
+    assert assigner.assign([changed]) == ref
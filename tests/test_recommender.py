@@ -1,5 +1,6 @@
+import numpy as np
 import pandas as pd
-from src.models.recommender import rank_content, score_content
+from src.models.recommender import rank_content, score_content, top_positions
 
 def _catalog():
     return pd.DataFrame([
@@ -27,3 +28,40 @@ def test_ranker_filters_by_goal_and_falls_back():
     out2 = rank_content(df, user_goal="unknown", persona=1, top_k=2)
     assert set(out2["content_id"]) <= {"c1","c2","c3"}
     assert "score" in out2.columns
+
+def test_vectorized_ranking_matches_row_scoring():
+    df = pd.concat([_catalog()] * 4, ignore_index=True)
+    df["content_id"] = [f"c{i}" for i in range(len(df))]
+    df.loc[::3, "popularity"] = 0.3
+    for persona in (0, 1, 2, 3, 9):
+        for goal in ("stress", "fitness", "unknown"):
+            out = rank_content(df, user_goal=goal, persona=persona, top_k=5)
+            pool = df[df["goal_tag"] == goal] if (df["goal_tag"] == goal).any() else df
+            ref = pool.assign(score=pool.apply(lambda r, goal=goal, persona=persona: score_content(r, goal, persona), axis=1))
+            ref = ref.sort_values("score", ascending=False, kind="stable").head(5)
+            assert out["content_id"].tolist() == ref["content_id"].tolist()
+            assert np.array_equal(out["score"].to_numpy(), ref["score"].to_numpy())
+
+def test_heuristic_scorer_catalog_interface():
+    from src.models.recommender import HeuristicScorer
+    df = _catalog()
+    scorer = HeuristicScorer()
+    scorer.prepare_catalog(df)
+    users = pd.DataFrame({"primary_goal": ["stress", "fitness"]})
+    scores, offsets = scorer.predict_catalog([np.array([0, 1]), np.array([2])], users, [1, 2],
+                                             ["morning", "evening"], [2, 1])
+    assert offsets.tolist() == [0, 2, 3]
+    assert scores.tolist() == [score_content(df.iloc[0], "stress", 2), score_content(df.iloc[1], "stress", 2),
+                               score_content(df.iloc[2], "fitness", 1)]
+
+
+def test_top_positions_matches_stable_sort():
+    scores = np.array([[0.1, 0.9, 0.5, 0.9, 0.2], [0.3, 0.3, 0.3, 0.8, 0.0]])
+    full = np.argsort(-scores, axis=1, kind="stable")
+    assert np.array_equal(top_positions(scores, 3), full[:, :3])
+    assert np.array_equal(top_positions(scores, 5), full)
+    for row, ref in zip(scores, full):
+        assert np.array_equal(top_positions(row, 3), ref[:3])
+    assert top_positions(scores, 0).shape == (2, 0)
+    assert top_positions(scores, -1).shape == (2, 0)
+    assert top_positions(scores[0], 0).shape == (0,)
@@ -0,0 +1,119 @@
+from pathlib import Path
+import multiprocessing as mp
+
+import joblib
+import numpy as np
+
+from src.models.bandit import LinTSBandit
+from src.models.shared_bandit import SharedLinTSBandit
+
+ARMS = ["a", "b", "c"]
+
+
+def _worker(path, seed, n):
+    bandit = SharedLinTSBandit(path)
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        bandit.update(ARMS[i % 3], float(rng.integers(0, 2)), rng.normal(size=4))
+    bandit.close()
+
+
+def test_updates_from_one_process_are_seen_by_another(tmp_path: Path):
+    w1 = SharedLinTSBandit.create(tmp_path / "bandit.f64", LinTSBandit(ARMS, d=4))
+    w2 = SharedLinTSBandit(tmp_path / "bandit.f64")
+    ref = LinTSBandit(ARMS, d=4)
+
+    x = np.array([1.0, 0.5, -0.2, 0.0])
+    w1.update("b", 1.0, x)
+    ref.update("b", 1.0, x)
+    w2.sync()
+    assert np.allclose(w2.A["b"], ref.A["b"]) and np.allclose(w2.b["b"], ref.b["b"])
+    assert np.allclose(w2._mu, ref._mu) and np.allclose(w2._A_inv, ref._A_inv)
+    assert w2.choose_batch(np.ones((5, 4)))[0] in ARMS
+
+
+def test_concurrent_processes_lose_no_updates(tmp_path: Path):
+    path = tmp_path / "bandit.f64"
+    SharedLinTSBandit.create(path, LinTSBandit(ARMS, d=4)).close()
+    ctx = mp.get_context("fork")
+    procs = [ctx.Process(target=_worker, args=(path, seed, 60)) for seed in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+
+    ref = LinTSBandit(ARMS, d=4)
+    for seed in range(3):
+        rng = np.random.default_rng(seed)
+        for i in range(60):
+            ref.update(ARMS[i % 3], float(rng.integers(0, 2)), rng.normal(size=4))
+    shared = SharedLinTSBandit(path)
+    assert np.allclose(shared.A_stack, ref.A_stack) and np.allclose(shared.b_stack, ref.b_stack)
+    assert shared.counts.sum() == 180
+
+
+def test_open_or_create_rebuilds_only_from_trained_snapshots(tmp_path: Path):
+    snap, path = tmp_path / "bandit.joblib", tmp_path / "shared" / "bandit.f64"
+    trained = LinTSBandit(ARMS, d=4)
+    trained.update("a", 1.0, np.ones(4))
+    trained.save(snap)
+
+    first = SharedLinTSBandit.open_or_create(path, snap, ARMS, 4)
+    assert np.allclose(first.A_stack, trained.A_stack)
+    # the region records the training run, so the next worker attaches to the live region
+    assert first.region_trained_id() == trained.trained_id is not None
+    first.update("c", 1.0, np.ones(4))
+    second = SharedLinTSBandit.open_or_create(path, snap, ARMS, 4)
+    assert np.allclose(second.A["c"], first.A["c"]) and second.source == first.source
+
+    # a newly trained snapshot replaces the region
+    LinTSBandit(ARMS, d=4).save(snap)
+    third = SharedLinTSBandit.open_or_create(path, snap, ARMS, 4)
+    assert np.allclose(third.A_stack, np.eye(4)) and third.source != first.source
+
+    # ...even when a service checkpoint overwrote the snapshot before any worker restarted
+    retrained = LinTSBandit(ARMS, d=4)
+    retrained.update("b", 1.0, np.ones(4))
+    retrained.save(snap)
+    LinTSBandit.write_snapshot(third.state_dict(), snap, log_generation=7)
+    fourth = SharedLinTSBandit.open_or_create(path, snap, ARMS, 4)
+    assert np.allclose(fourth.A_stack, retrained.A_stack)
+
+
+def test_own_updates_are_rank_one_and_match_exact_posterior(tmp_path: Path, monkeypatch):
+    w1 = SharedLinTSBandit.create(tmp_path / "bandit.f64", LinTSBandit(ARMS, d=4))
+    w2 = SharedLinTSBandit(tmp_path / "bandit.f64")
+    refreshed = []
+    refresh = w1.refresh_posterior
+    monkeypatch.setattr(w1, "refresh_posterior", lambda arm=None: (refreshed.append(arm), refresh(arm)))
+
+    rng = np.random.default_rng(7)
+    for i in range(30):
+        w1.update(ARMS[i % 3], 1.0, rng.normal(size=4))
+    assert refreshed == []  # no re-inversion while nobody else writes
+
+    w2.update("a", 0.0, rng.normal(size=4))  # another worker moved arm a
+    w1.update("a", 1.0, rng.normal(size=4))
+    assert refreshed == ["a"]
+    for i, a in enumerate(ARMS):
+        assert np.allclose(w1._A_inv[i], np.linalg.inv(w1.A[a]), atol=1e-10)
+        assert np.allclose(w1._mu[i], np.linalg.inv(w1.A[a]) @ w1.b[a], atol=1e-10)
+
+
+def test_snapshot_lock_serializes_workers(tmp_path: Path):
+    import threading
+    w1 = SharedLinTSBandit.create(tmp_path / "bandit.f64", LinTSBandit(ARMS, d=4))
+    w2 = SharedLinTSBandit(tmp_path / "bandit.f64")
+    entered = threading.Event()
+
+    def take():
+        with w2.snapshot_lock():
+            entered.set()
+
+    with w1.snapshot_lock():
+        t = threading.Thread(target=take)
+        t.start()
+        assert not entered.wait(0.2)  # w2 waits while w1 writes its snapshot
+    assert entered.wait(5)
+    t.join()
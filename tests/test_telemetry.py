@@ -0,0 +1,37 @@
+from src.service.telemetry import Registry, sample
+
+
+def test_histogram_buckets_are_cumulative():
+    reg = Registry()
+    h = reg.histogram("lat_seconds", "latency", ["stage"], buckets=(0.01, 0.1, 1.0))
+    for v in (0.005, 0.05, 0.05, 2.0):
+        h.observe(v, "persona")
+    with h.time("ltr"):
+        pass
+    text = reg.render()
+    assert '# TYPE lat_seconds histogram' in text
+    assert 'lat_seconds_bucket{stage="persona",le="0.01"} 1' in text
+    assert 'lat_seconds_bucket{stage="persona",le="0.1"} 3' in text
+    assert 'lat_seconds_bucket{stage="persona",le="1"} 3' in text
+    assert 'lat_seconds_bucket{stage="persona",le="+Inf"} 4' in text
+    assert 'lat_seconds_count{stage="persona"} 4' in text
+    assert 'lat_seconds_sum{stage="persona"} 2.105' in text
+    assert h.count("ltr") == 1
+
+
+def test_counters_gauges_collectors_and_escaping():
+    reg = Registry()
+    c = reg.counter("req_total", "requests", ["endpoint", "code"])
+    g = reg.gauge("in_flight", "in flight", ["endpoint"])
+    c.inc("feedback", "200")
+    c.inc("feedback", "200")
+    c.inc("feedback", "404")
+    g.inc('a"b')
+    g.inc('a"b')
+    g.dec('a"b')
+    reg.collector(lambda: sample("cache_size", "gauge", "entries", 7))
+    text = reg.render()
+    assert 'req_total{endpoint="feedback",code="200"} 2' in text
+    assert 'req_total{endpoint="feedback",code="404"} 1' in text
+    assert 'in_flight{endpoint="a\\"b"} 1' in text
+    assert text.endswith("cache_size 7\n")
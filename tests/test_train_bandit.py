@@ -82,6 +82,10 @@ def test_main_trains_and_saves(monkeypatch):
         def update(self, arm, reward, x):
             self.updates.append((arm, reward, x))
 
+        def update_batch(self, arms, rewards, X):
+            self.updates.extend(zip(arms, rewards, X))
+            FakeBandit.last = self
+
         def save(self, path):
             self.saved = True
             self.path = path
@@ -95,3 +99,8 @@ def test_main_trains_and_saves(monkeypatch):
     # Verify bandit was updated and saved
     bandit = tb.LinTSBandit("arms", d=10, alpha=0.5)
     assert isinstance(bandit, FakeBandit)
+    trained = FakeBandit.last
+    assert trained.saved and len(trained.updates) == 1
+    arm, reward, x = trained.updates[0]
+    assert arm == "A" and reward == 1.0
+    assert np.allclose(x, tb.make_x(users.loc[1], 2, "evening"))
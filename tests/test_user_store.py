@@ -0,0 +1,48 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+import scripts.train_bandit as tb
+from src.features.bandit_context import with_context
+from src.service.user_store import UserStore
+
+def _users():
+    return pd.DataFrame([
+        {"user_id":"u1","age":29,"gender":"female","work_pattern":"9-5","primary_goal":"stress",
+         "baseline_activity_min_per_day":12,"premium":False,"push_opt_in":True,"chronotype":"morning","language":"en"},
+        {"user_id":"u2","age":41,"gender":"male","work_pattern":"shift","primary_goal":"weight_loss",
+         "baseline_activity_min_per_day":3,"premium":True,"push_opt_in":False,"chronotype":"evening","language":"de"},
+    ])
+
+def test_lookup_and_context_match_training_features(tmp_path: Path):
+    users = _users()
+    users.to_csv(tmp_path / "users.csv", index=False)
+    store = UserStore.from_csv(tmp_path / "users.csv")
+
+    assert len(store) == 2 and "u2" in store and "nope" not in store
+    assert store.get("u2")["work_pattern"] == "shift"
+    assert store.get("nope") is None and store.user_context("nope") is None
+
+    for _, u in users.iterrows():
+        x = with_context(store.user_context(u.user_id), 4, "evening")[0]
+        assert np.allclose(x, tb.make_x(u, 4, "evening"))
+
+def test_upsert_inserts_and_overwrites(tmp_path: Path):
+    store = UserStore.from_csv(tmp_path / "missing.csv")
+    assert len(store) == 0
+
+    new = _users().iloc[0].to_dict()
+    for i in range(40):
+        store.upsert({**new, "user_id": f"n{i}"})
+    assert len(store) == 40 and store.get("n39")["age"] == 29
+
+    store.upsert({**new, "user_id": "n3", "age": 60})
+    assert len(store) == 40
+    assert store.get("n3")["age"] == 60
+    assert np.isclose(store.user_context("n3")[1], 1.0)
+
+def test_user_row_matches_user_block():
+    from src.features.bandit_context import user_block, user_row
+    users = _users()
+    rows = np.stack([user_row(u) for u in users.to_dict(orient="records")])
+    assert np.array_equal(rows, user_block(users))